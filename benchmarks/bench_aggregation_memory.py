@@ -0,0 +1,131 @@
+"""Пиковая память подсчета размеров директорий на синтетическом дереве.
+
+Дерево не создается на диске: функция чтения директории генерирует пути
+и stat_result на лету, поэтому можно проверить миллионы директорий.
+Каждый режим выполняется в отдельном процессе, пиковый RSS берется из
+resource.getrusage (Linux, macOS):
+- legacy  - прежний подсчет: словари путь -> размер для всех директорий;
+- compact - dir_totals.DirTotals: итоги освобождаются, когда их забрал родитель;
+- scan    - полный scan_disk с отчетом в os.devnull.
+
+Запуск: python benchmarks/bench_aggregation_memory.py --dirs 5000000
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from collections import defaultdict
+from contextlib import redirect_stdout
+
+from common import peak_rss_mb, timed
+
+import disk_scanner
+from dir_totals import DirTotals
+
+SYNTHETIC_ROOT = os.path.join(os.sep, 'synthetic')
+
+
+class SyntheticTree:
+    """Функция чтения директории с интерфейсом list_dir для дерева из dirs директорий"""
+
+    def __init__(self, dirs, fanout, files_per_dir):
+        self.remaining = dirs - 1
+        self.fanout = fanout
+        # Наименьшая глубина, на которой помещаются все директории (иначе обход
+        # в глубину вытянет дерево в цепочку)
+        self.depth = 0
+        capacity = 1
+        while capacity < dirs:
+            self.depth += 1
+            capacity += fanout ** self.depth
+        self._base_level = SYNTHETIC_ROOT.count(os.sep)
+        now = time.time()
+        # Файлы разного размера; stat_result общий для файлов с одним номером
+        self.files = [(f"file_{i}.dat", os.stat_result((0o100644, i, 0, 1, 0, 0, 4096 * (i + 1), now, now, now)))
+                      for i in range(files_per_dir)]
+
+    def __call__(self, root, **options):
+        if root.count(os.sep) - self._base_level >= self.depth:
+            return list(self.files), [], []
+        count = min(self.fanout, self.remaining)
+        self.remaining -= count
+        subdirs = [os.path.join(root, f"dir_{i}") for i in range(count)]
+        return list(self.files), subdirs, []
+
+
+def run_legacy(lister):
+    dir_sizes = defaultdict(int)
+    dir_disk_sizes = defaultdict(int)
+    for root, files, subdirs, errors in disk_scanner.scan_tree(SYNTHETIC_ROOT, lister):
+        size = sum(st.st_size for name, st in files)
+        disk_size = sum(disk_scanner.file_disk_size(st) for name, st in files)
+        for dir_path in subdirs:
+            size += dir_sizes.get(dir_path, 0)
+            disk_size += dir_disk_sizes.get(dir_path, 0)
+        dir_sizes[root] = size
+        dir_disk_sizes[root] = disk_size
+    return dir_sizes[SYNTHETIC_ROOT]
+
+
+def run_compact(lister):
+    totals = DirTotals()
+    for root, files, subdirs, errors in disk_scanner.scan_tree(SYNTHETIC_ROOT, lister):
+        size = sum(st.st_size for name, st in files)
+        disk_size = sum(disk_scanner.file_disk_size(st) for name, st in files)
+        files_count = len(files)
+        for dir_path in subdirs:
+            child = totals.pop(dir_path)
+            if child is not None:
+                size += child[0]
+                disk_size += child[1]
+                files_count += child[2]
+        totals.add(root, size, disk_size, files_count, 0)
+    return totals.get(SYNTHETIC_ROOT)[0]
+
+
+def run_scan(lister):
+    disk_scanner.list_dir = lister
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        # Топ и статистика по всем файлам отключены: замеряется только подсчет размеров,
+        # и рядом с os.devnull не создаются файлы <output>.top.json и .stats.json
+        disk_scanner.scan_disk(SYNTHETIC_ROOT, os.devnull, os.devnull, 1, 10 ** 9, 10 ** 9, 10000,
+                               checkpoint_interval=0, top_n=0, file_stats=False)
+    return None
+
+
+MODES = {'legacy': run_legacy, 'compact': run_compact, 'scan': run_scan}
+
+
+def child(mode, dirs, fanout, files_per_dir, results):
+    lister = SyntheticTree(dirs, fanout, files_per_dir)
+    total, elapsed = timed(MODES[mode], lister)
+    results.put((total, elapsed, peak_rss_mb()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк памяти подсчета размеров директорий')
+    parser.add_argument('--dirs', type=int, default=5_000_000, help='Число директорий синтетического дерева')
+    parser.add_argument('--fanout', type=int, default=10, help='Поддиректорий в каждой директории')
+    parser.add_argument('--files', type=int, default=2, help='Файлов в каждой директории')
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=list(MODES),
+                        help='Проверяемые режимы')
+    args = parser.parse_args()
+
+    print(f"Дерево: {args.dirs} директорий, {args.fanout} поддиректорий и {args.files} файлов в каждой")
+    context = multiprocessing.get_context('spawn')
+    for mode in args.modes:
+        results = context.Queue()
+        process = context.Process(target=child, args=(mode, args.dirs, args.fanout, args.files, results))
+        process.start()
+        process.join()
+        if process.exitcode != 0:
+            print(f"  {mode:<8} процесс завершился с кодом {process.exitcode}")
+            continue
+        total, elapsed, peak = results.get()
+        peak_text = f"{peak:.0f} МБ" if peak is not None else "нет данных"
+        total_text = f", размер корня: {total}" if total is not None else ""
+        print(f"  {mode:<8} время: {elapsed:6.1f} с, пиковый RSS: {peak_text}{total_text}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Асинхронный обход против однопоточного и многопоточного на медленной ФС.
+
+Сетевая файловая система имитируется слоем поверх os.scandir: каждое
+чтение директории и каждый stat ждут --latency мс (time.sleep отпускает
+GIL, как ожидание ответа сервера). Сервер обслуживает --capacity запросов
+одновременно без замедления; при большей нагрузке задержка растет
+пропорционально числу запросов в работе - так видно, как адаптивный
+предел асинхронного режима отступает от перегрузки.
+
+Запуск: python benchmarks/bench_async_scan.py --latency 2 --capacity 32 --concurrency 16 64 256
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from common import make_tree, timed
+
+import disk_scanner
+from scan_async import AdaptiveLimiter
+
+
+class SlowServer:
+    """Задержка запроса: latency, а сверх capacity одновременных - больше"""
+
+    def __init__(self, latency, capacity):
+        self.latency = latency
+        self.capacity = capacity
+        self.requests = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            self._in_flight += 1
+            self.requests += 1
+            load = self._in_flight
+        try:
+            time.sleep(self.latency * max(1.0, load / self.capacity))
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+
+class SlowEntry:
+    """DirEntry, у которого stat идет через SlowServer"""
+
+    def __init__(self, entry, server):
+        self._entry = entry
+        self._server = server
+        self.name = entry.name
+        self.path = entry.path
+
+    def is_dir(self):
+        return self._entry.is_dir()
+
+    def is_symlink(self):
+        return self._entry.is_symlink()
+
+    def stat(self):
+        self._server.wait()
+        return self._entry.stat()
+
+
+class SlowScandir:
+    def __init__(self, path, server, scandir):
+        server.wait()
+        self._iterator = scandir(path)
+        self._server = server
+
+    def __iter__(self):
+        return (SlowEntry(entry, self._server) for entry in self._iterator)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._iterator.close()
+        return False
+
+
+@contextmanager
+def slow_filesystem(server):
+    """Подменяет os.scandir на время замера"""
+    scandir = os.scandir
+    os.scandir = lambda path: SlowScandir(path, server, scandir)
+    try:
+        yield server
+    finally:
+        os.scandir = scandir
+
+
+def count_tree(tree):
+    files = 0
+    total_size = 0
+    for root, entries, subdirs, errors in tree:
+        files += len(entries)
+        total_size += sum(st.st_size for name, st in entries)
+    return files, total_size
+
+
+def benchmark(start_path, latency, capacity, workers, concurrency_values):
+    engines = [('однопоточный', lambda: disk_scanner.scan_tree(start_path), None)]
+    engines.append((f"потоки x{workers}", lambda: disk_scanner.scan_tree_parallel(start_path, workers), None))
+    for concurrency in concurrency_values:
+        limiter = AdaptiveLimiter(concurrency)
+        engines.append((f"async до {concurrency}",
+                        lambda c=concurrency, l=limiter: disk_scanner.scan_tree_async(start_path, c, limiter=l),
+                        limiter))
+
+    expected = None
+    baseline = None
+    for title, make_engine, limiter in engines:
+        with slow_filesystem(SlowServer(latency, capacity)) as server:
+            result, elapsed = timed(lambda: count_tree(make_engine()))
+        if expected is None:
+            expected = result
+        elif result != expected:
+            print(f"  ВНИМАНИЕ: результат '{title}' отличается: {result} != {expected}")
+        baseline = baseline or elapsed
+        line = (f"  {title:<16} время: {elapsed:7.2f} с, {server.requests / elapsed:8.0f} запр/сек, "
+                f"ускорение: {baseline / elapsed:6.1f}x")
+        if limiter is not None:
+            limits = limiter.summary()
+            line += (f", предел: {limits['limit']} (максимум {limits['peak_limit']}, "
+                     f"снижений {limits['decreases']})")
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк асинхронного обхода на ФС с задержкой')
+    parser.add_argument('--depth', type=int, default=3, help='Глубина синтетического дерева')
+    parser.add_argument('--fanout', type=int, default=4, help='Поддиректорий в каждой директории')
+    parser.add_argument('--files', type=int, default=40, help='Файлов в каждой директории')
+    parser.add_argument('--latency', type=float, default=2.0, help='Задержка одного запроса, мс')
+    parser.add_argument('--capacity', type=int, default=32,
+                        help='Сколько запросов сервер обслуживает одновременно без замедления')
+    parser.add_argument('--workers', type=int, default=8, help='Потоков для многопоточного обхода')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[16, 64, 256],
+                        help='Проверяемые пределы параллелизма асинхронного обхода')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dirs_count, files_count = make_tree(tmp, args.depth, args.fanout, args.files)
+        print(f"Дерево: {dirs_count} директорий, {files_count} файлов; "
+              f"задержка {args.latency} мс, сервер без замедления до {args.capacity} запросов")
+        benchmark(tmp, args.latency / 1000, args.capacity, args.workers, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
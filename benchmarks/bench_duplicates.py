@@ -0,0 +1,56 @@
+"""Сколько байт читает поиск дубликатов по сравнению с объемом кандидатов.
+
+Создает набор файлов одинакового размера: часть - точные копии, часть
+отличается в начале (отсеивается частичным хешем), часть - только в
+середине (нужен полный хеш).
+
+Запуск: python benchmarks/bench_duplicates.py --size-mb 8 --groups 20
+"""
+import argparse
+import os
+import tempfile
+
+from common import timed
+
+from duplicate_finder import DuplicateFinder, iter_tree_files
+
+
+def make_files(root, size, groups):
+    """Создает groups групп по 3 файла одинакового размера"""
+    block = os.urandom(size)
+    for group in range(groups):
+        kind = group % 3
+        for copy in range(3):
+            data = bytearray(block)
+            # Разные группы различаются последними байтами, чтобы не совпадать между собой
+            data[-8:] = group.to_bytes(8, 'little')
+            if kind == 1 and copy:
+                data[0] = copy  # отличие в начале
+            elif kind == 2 and copy:
+                data[size // 2] ^= copy  # отличие только в середине
+            with open(os.path.join(root, f"g{group}_{copy}.bin"), 'wb') as f:
+                f.write(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк поиска дубликатов')
+    parser.add_argument('--size-mb', type=float, default=8, help='Размер каждого файла в мегабайтах')
+    parser.add_argument('--groups', type=int, default=12, help='Число групп файлов')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8], help='Количества потоков')
+    args = parser.parse_args()
+
+    size = int(args.size_mb * 1024 * 1024)
+    with tempfile.TemporaryDirectory() as tmp:
+        make_files(tmp, size, args.groups)
+        for workers in args.workers:
+            finder = DuplicateFinder(workers=workers)
+            groups, elapsed = timed(finder.find, iter_tree_files(tmp), 1)
+            stats = finder.stats
+            print(f"потоков: {workers:>2}, время: {elapsed:.3f} с, групп: {len(groups)}, "
+                  f"прочитано {stats['bytes_read'] / 1024**2:.1f} МБ "
+                  f"из {stats['candidate_bytes'] / 1024**2:.1f} МБ кандидатов "
+                  f"({stats['bytes_read'] / stats['candidate_bytes']:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Масштабирование многопоточного обхода scan_tree_parallel по числу потоков.
+
+Запуск: python benchmarks/bench_parallel_scan.py --depth 4 --fanout 5 --files 30
+Для сетевых ФС укажите --path с заранее подготовленным деревом.
+"""
+import argparse
+import tempfile
+
+from common import make_tree, timed
+
+import disk_scanner
+
+
+def run_engine(start_path, workers):
+    """Полный обход с подсчетом файлов и суммарного размера"""
+    files = 0
+    total_size = 0
+    tree = (disk_scanner.scan_tree(start_path) if workers <= 1
+            else disk_scanner.scan_tree_parallel(start_path, workers))
+    for root, entries, subdirs, errors in tree:
+        files += len(entries)
+        total_size += sum(st.st_size for name, st in entries)
+    return files, total_size
+
+
+def benchmark(start_path, worker_counts, repeat):
+    baseline = None
+    expected = None
+    for workers in worker_counts:
+        best = None
+        for _ in range(repeat):
+            result, elapsed = timed(run_engine, start_path, workers)
+            best = elapsed if best is None else min(best, elapsed)
+        if expected is None:
+            expected = result
+        elif result != expected:
+            print(f"  ВНИМАНИЕ: результат для {workers} потоков отличается: {result} != {expected}")
+        files = result[0]
+        baseline = baseline or best
+        print(f"  потоков: {workers:>2}, время: {best:.3f} с, "
+              f"{files / best:.0f} файл/сек, ускорение: {baseline / best:.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк масштабирования многопоточного сканера')
+    parser.add_argument('--path', help='Готовое дерево для сканирования (по умолчанию - синтетическое)')
+    parser.add_argument('--depth', type=int, default=4, help='Глубина синтетического дерева')
+    parser.add_argument('--fanout', type=int, default=5, help='Поддиректорий в каждой директории')
+    parser.add_argument('--files', type=int, default=30, help='Файлов в каждой директории')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16],
+                        help='Проверяемые количества потоков')
+    parser.add_argument('--repeat', type=int, default=3, help='Число повторов замера')
+    args = parser.parse_args()
+
+    if args.path:
+        benchmark(args.path, args.workers, args.repeat)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dirs_count, files_count = make_tree(tmp, args.depth, args.fanout, args.files)
+        print(f"Дерево: {dirs_count} директорий, {files_count} файлов")
+        benchmark(tmp, args.workers, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Сравнение числа stat-вызовов на файл: os.walk + getsize/getctime/getmtime
+против движка scan_tree на os.scandir.
+
+Запуск: python benchmarks/bench_scan_syscalls.py --depth 3 --fanout 4 --files 50
+"""
+import argparse
+import os
+import tempfile
+
+from common import make_tree, timed
+
+import disk_scanner
+
+
+class _CountingEntry:
+    """Обертка над DirEntry, считающая stat-вызовы, которые уходят в ОС"""
+
+    def __init__(self, entry, counter):
+        self._entry = entry
+        self._counter = counter
+        self._stat_done = False
+
+    def __getattr__(self, name):
+        return getattr(self._entry, name)
+
+    def stat(self, *, follow_symlinks=True):
+        # DirEntry кэширует результат, поэтому считаем только первый вызов
+        if not self._stat_done:
+            self._counter['stat'] += 1
+            self._stat_done = True
+        return self._entry.stat(follow_symlinks=follow_symlinks)
+
+
+class _CountingScandir:
+    """Обертка над итератором os.scandir"""
+
+    def __init__(self, it, counter):
+        self._it = it
+        self._counter = counter
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._it.close()
+
+    def __iter__(self):
+        for entry in self._it:
+            yield _CountingEntry(entry, self._counter)
+
+
+def legacy_walk(start_path):
+    """Прежний алгоритм: os.walk и три отдельных вызова на файл"""
+    files = 0
+    for root, dirs, names in os.walk(start_path, topdown=False):
+        for name in names:
+            file_path = os.path.join(root, name)
+            os.path.getsize(file_path)
+            os.path.getctime(file_path)
+            os.path.getmtime(file_path)
+            files += 1
+    return files
+
+
+def scandir_walk(start_path):
+    """Новый движок: один DirEntry.stat() на файл"""
+    files = 0
+    for root, entries, subdirs, errors in disk_scanner.scan_tree(start_path):
+        for name, st in entries:
+            st.st_size, st.st_ctime, st.st_mtime
+            files += 1
+    return files
+
+
+def count_legacy(start_path):
+    counter = {'stat': 0}
+    original_stat = os.stat
+
+    def counting_stat(*args, **kwargs):
+        counter['stat'] += 1
+        return original_stat(*args, **kwargs)
+
+    os.stat = counting_stat
+    try:
+        files = legacy_walk(start_path)
+    finally:
+        os.stat = original_stat
+    return files, counter['stat']
+
+
+def count_scandir(start_path):
+    counter = {'stat': 0}
+    original_scandir = os.scandir
+
+    def counting_scandir(path):
+        return _CountingScandir(original_scandir(path), counter)
+
+    os.scandir = counting_scandir
+    try:
+        files = scandir_walk(start_path)
+    finally:
+        os.scandir = original_scandir
+    return files, counter['stat']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк stat-вызовов при обходе дерева')
+    parser.add_argument('--depth', type=int, default=3, help='Глубина дерева')
+    parser.add_argument('--fanout', type=int, default=4, help='Поддиректорий в каждой директории')
+    parser.add_argument('--files', type=int, default=50, help='Файлов в каждой директории')
+    parser.add_argument('--repeat', type=int, default=3, help='Число повторов замера времени')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dirs_count, files_count = make_tree(tmp, args.depth, args.fanout, args.files)
+        print(f"Дерево: {dirs_count} директорий, {files_count} файлов")
+
+        for title, walker, counter in (
+            ("os.walk + getsize/getctime/getmtime", legacy_walk, count_legacy),
+            ("scan_tree (os.scandir)", scandir_walk, count_scandir),
+        ):
+            files, stat_calls = counter(tmp)
+            best = min(timed(walker, tmp)[1] for _ in range(args.repeat))
+            print(f"{title}:")
+            print(f"  stat-вызовов на файл: {stat_calls / files:.2f}")
+            print(f"  время: {best:.3f} с, скорость: {files / best:.0f} файл/сек")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""Воспроизводимый набор замеров сканера и анализатора на синтетическом дереве.
+
+Дерево создается генератором synthetic_tree.py с заданным seed, поэтому
+результаты разных версий сравнимы. Каждый сценарий выполняется в отдельном
+процессе (пиковый RSS не смешивается между сценариями) --repeat раз;
+в результат идет лучшее время и наибольший пиковый RSS:
+- scan, scan_threads, scan_async - полный scan_disk с отчетом без порога
+  размера; время по фазам берется из файла метрик сканера (scan_metrics.py);
+- analyze - analyze_disk_data с загрузкой отчета в память: фазы load,
+  summarize, charts, report;
+- analyze_stream - то же с потоковым чтением порциями --chunk-size строк.
+Для каждого сценария считаются файлы/сек и строки отчета/сек.
+
+Результаты пишутся в JSON (--output); с --compare прежний файл
+результатов сравнивается с текущим, и замедление больше --threshold
+процентов отмечается как регрессия (код выхода 1).
+
+Запуск: python benchmarks/bench_suite.py --depth 4 --fanout 6 --files 50 --output results.json
+        python benchmarks/bench_suite.py --compare results.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+from common import PROJECT_DIR, peak_rss_mb, timed
+from synthetic_tree import add_spec_arguments, describe, spec_from_args, synthetic_tree
+
+import disk_analyzer
+import disk_scanner
+
+RESULTS_FORMAT_VERSION = 1
+
+
+def _scan(start_path, work_dir, options):
+    output_file = os.path.join(work_dir, 'scan.csv')
+    metrics_file = os.path.join(work_dir, 'scan.metrics.jsonl')
+    _, elapsed = timed(disk_scanner.scan_disk, start_path, output_file, os.path.join(work_dir, 'errors.log'),
+                       0, 10 ** 9, 10 ** 9, 10000, checkpoint_interval=0, metrics_file=metrics_file,
+                       metrics_interval=10 ** 9, **options)
+    with open(metrics_file, encoding='utf-8') as f:
+        final = [json.loads(line) for line in f][-1]
+    stats = final['stats']
+    return {
+        'seconds': elapsed,
+        'files': stats['files'],
+        'rows': stats['files_written'] + stats['dirs'],
+        'phases': final['phases'],
+    }
+
+
+def _analyze(start_path, work_dir, options):
+    input_file = os.path.join(work_dir, 'report.csv')
+    output_dir = os.path.join(work_dir, 'analysis')
+    os.makedirs(output_dir, exist_ok=True)
+    chunk_size = options.get('chunk_size', 0)
+    jobs = options.get('jobs')
+    phases = {}
+    started = time.perf_counter()
+    if chunk_size > 0:
+        # Чтение и агрегирование в потоковом режиме не разделяются
+        summary, phases['summarize'] = timed(disk_analyzer.summarize_stream, input_file, 20, chunk_size)
+    else:
+        df, phases['load'] = timed(disk_analyzer.load_scan_data, input_file)
+        summary, phases['summarize'] = timed(disk_analyzer.summarize_dataframe, df, 20)
+        del df
+    _, phases['charts'] = timed(disk_analyzer.render_charts, summary, output_dir, 20, None, jobs)
+    _, phases['report'] = timed(disk_analyzer.write_text_report, summary, output_dir, 20)
+    return {
+        'seconds': time.perf_counter() - started,
+        'files': summary['files_count'],
+        'rows': summary['files_count'] + summary['dirs_count'],
+        'phases': phases,
+    }
+
+
+def scenarios(args):
+    """Имя -> (функция, параметры)"""
+    return {
+        'scan': (_scan, {}),
+        'scan_threads': (_scan, {'workers': args.workers}),
+        'scan_async': (_scan, {'async_concurrency': args.async_concurrency}),
+        'analyze': (_analyze, {'jobs': args.jobs}),
+        'analyze_stream': (_analyze, {'chunk_size': args.chunk_size, 'jobs': args.jobs}),
+    }
+
+
+def _child(run, start_path, work_dir, options, results):
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        result = run(start_path, work_dir, options)
+    result['peak_rss_mb'] = peak_rss_mb()
+    results.put(result)
+
+
+def run_scenario(context, run, start_path, work_dir, options):
+    results = context.Queue()
+    process = context.Process(target=_child, args=(run, start_path, work_dir, options, results))
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        raise RuntimeError(f"процесс сценария завершился с кодом {process.exitcode}")
+    return results.get()
+
+
+def prepare_report(start_path, work_dir):
+    """Отчет сканера со всеми файлами - входные данные анализатора"""
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        disk_scanner.scan_disk(start_path, os.path.join(work_dir, 'report.csv'),
+                               os.path.join(work_dir, 'report_errors.log'), 0, 10 ** 9, 10 ** 9, 10000,
+                               checkpoint_interval=0)
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=PROJECT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def summarize_runs(runs):
+    """Лучшее время и наибольший пиковый RSS из повторов"""
+    best = min(runs, key=lambda run: run['seconds'])
+    peaks = [run['peak_rss_mb'] for run in runs if run['peak_rss_mb'] is not None]
+    seconds = best['seconds']
+    return {
+        'seconds': round(seconds, 4),
+        'runs': [round(run['seconds'], 4) for run in runs],
+        'files': best['files'],
+        'rows': best['rows'],
+        'files_per_second': round(best['files'] / seconds, 1) if seconds else None,
+        'rows_per_second': round(best['rows'] / seconds, 1) if seconds else None,
+        'peak_rss_mb': round(max(peaks), 1) if peaks else None,
+        'phases': {phase: round(value, 4) for phase, value in best['phases'].items()},
+    }
+
+
+def print_result(name, result):
+    rss = f"{result['peak_rss_mb']:.0f} МБ" if result['peak_rss_mb'] is not None else "нет данных"
+    print(f"  {name:<15} время: {result['seconds']:8.3f} с, {result['files_per_second'] or 0:>10,.0f} файл/сек, "
+          f"{result['rows_per_second'] or 0:>10,.0f} строк/сек, пиковый RSS: {rss}")
+    phases = ", ".join(f"{phase} {seconds:.3f}" for phase, seconds in result['phases'].items() if seconds)
+    if phases:
+        print(f"  {'':<15} фазы, с: {phases}")
+
+
+def compare(previous, current, threshold):
+    """Печатает сравнение с прежними результатами; возвращает число регрессий"""
+    print(f"Сравнение с {previous['environment'].get('revision') or 'прежними результатами'} "
+          f"({previous['created']}):")
+    if previous.get('tree', {}).get('spec') != current.get('tree', {}).get('spec'):
+        print("  ВНИМАНИЕ: параметры дерева отличаются, сравнение может быть некорректным")
+    regressions = 0
+    for name, result in current['results'].items():
+        old = previous['results'].get(name)
+        if old is None:
+            print(f"  {name:<15} нет в прежних результатах")
+            continue
+        time_change = (result['seconds'] / old['seconds'] - 1) * 100 if old['seconds'] else 0.0
+        line = f"  {name:<15} время: {old['seconds']:.3f} -> {result['seconds']:.3f} с ({time_change:+.1f}%)"
+        if old.get('peak_rss_mb') and result.get('peak_rss_mb'):
+            rss_change = (result['peak_rss_mb'] / old['peak_rss_mb'] - 1) * 100
+            line += f", RSS: {old['peak_rss_mb']:.0f} -> {result['peak_rss_mb']:.0f} МБ ({rss_change:+.1f}%)"
+        if time_change > threshold:
+            regressions += 1
+            line += "  РЕГРЕССИЯ"
+        print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Набор замеров сканера и анализатора на синтетическом дереве')
+    add_spec_arguments(parser)
+    parser.add_argument('--scenarios', nargs='+', help='Сценарии (по умолчанию - все)')
+    parser.add_argument('--repeat', type=int, default=3, help='Число повторов каждого сценария')
+    parser.add_argument('--workers', type=int, default=8, help='Потоков для сценария scan_threads')
+    parser.add_argument('--async-concurrency', type=int, default=64, help='Предел для сценария scan_async')
+    parser.add_argument('--chunk-size', type=int, default=100000, help='Размер порции для analyze_stream')
+    parser.add_argument('--jobs', type=int, default=1, help='Процессов построения графиков анализатора')
+    parser.add_argument('--tree-dir', help='Где создавать дерево (по умолчанию - временная директория)')
+    parser.add_argument('--output', help='JSON-файл для результатов')
+    parser.add_argument('--compare', help='JSON-файл прежних результатов для сравнения')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='Замедление в процентах, которое считается регрессией')
+    args = parser.parse_args()
+
+    available = scenarios(args)
+    selected = args.scenarios or list(available)
+    unknown = [name for name in selected if name not in available]
+    if unknown:
+        parser.error(f"неизвестные сценарии: {', '.join(unknown)}; доступны: {', '.join(available)}")
+
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    with synthetic_tree(spec_from_args(args), args.tree_dir) as tree, \
+            tempfile.TemporaryDirectory(prefix='bench_suite_') as work_dir:
+        print(f"Дерево: {describe(tree)}")
+        if any(available[name][0] is _analyze for name in selected):
+            _, elapsed = timed(prepare_report, tree['root'], work_dir)
+            print(f"Отчет для анализатора подготовлен за {elapsed:.1f} с")
+        for name in selected:
+            run, options = available[name]
+            runs = [run_scenario(context, run, tree['root'], work_dir, options) for _ in range(args.repeat)]
+            results[name] = summarize_runs(runs)
+            print_result(name, results[name])
+        tree_info = {key: value for key, value in tree.items() if key != 'root'}
+
+    current = {
+        'format_version': RESULTS_FORMAT_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': environment(),
+        'tree': tree_info,
+        'repeat': args.repeat,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"Результаты сохранены в: {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            previous = json.load(f)
+        if compare(previous, current, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Пропускная способность записи отчета.
+
+Сравнивает прежнюю запись (writerow + strftime на каждую строку и flush по
+счетчику строк) с пакетной записью фоновым потоком из scan_output. Для
+каждого варианта выводится время, которое write_row занимает в потоке
+сканера, и общее время до закрытия файла. Варианты со сжатием gzip и zstd
+показывают, во сколько раз уменьшается файл и замедляется фоновая запись.
+
+Запуск: python benchmarks/bench_writer.py --rows 500000
+"""
+import argparse
+import csv
+import os
+import tempfile
+import time
+
+from common import timed
+
+from scan_output import format_timestamp, open_output
+
+
+def make_rows(count):
+    """Строки, похожие на отчет: файлы в каталогах по 50, даты с повторами"""
+    base = time.time() - 86400 * 365
+    rows = []
+    for i in range(count):
+        ts = base + (i // 50) * 37 + i % 7
+        rows.append((f"/data/project_{i // 5000}/dir_{i // 50}", f"file_{i}.bin", 'file',
+                     i * 4096, 'bin', ts, ts + 60, i * 4096))
+    return rows
+
+
+class LegacyCsvOutput:
+    """Запись в том виде, в каком она была до пакетного вывода"""
+
+    def __init__(self, path, flush_interval):
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        self.flush_interval = flush_interval
+        self.written = 0
+
+    def write_row(self, path, name, item_type, size, extension="", creation_time=None, modification_time=None,
+                  disk_size=None):
+        self._writer.writerow([path, name, item_type, size, extension,
+                               format_timestamp(creation_time), format_timestamp(modification_time), disk_size])
+        self.written += 1
+        if self.written % self.flush_interval == 0:
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def run(output, rows):
+    write_row = output.write_row
+    _, write_time = timed(lambda: [write_row(*row) for row in rows])
+    _, close_time = timed(output.close)
+    return write_time, write_time + close_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк записи отчета')
+    parser.add_argument('--rows', type=int, default=500000, help='Число строк отчета')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Размер пакета записи')
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        variants = [
+            ('прежний CSV', lambda path: LegacyCsvOutput(path, args.batch_size), 'legacy.csv'),
+            ('CSV, даты текстом', lambda path: open_output(path, 'csv', batch_size=args.batch_size), 'text.csv'),
+            ('CSV, даты в секундах', lambda path: open_output(path, 'csv', batch_size=args.batch_size,
+                                                              timestamp_format='epoch'), 'epoch.csv'),
+            ('CSV, gzip', lambda path: open_output(path, 'csv', compression='gzip',
+                                                   batch_size=args.batch_size), 'report.csv.gz'),
+            ('CSV, zstd', lambda path: open_output(path, 'csv', compression='zstd',
+                                                   batch_size=args.batch_size), 'report.csv.zst'),
+            ('Parquet', lambda path: open_output(path, 'parquet'), 'report.parquet'),
+        ]
+        for title, factory, name in variants:
+            path = os.path.join(tmp, name)
+            try:
+                output = factory(path)
+            except ImportError as e:
+                print(f"{title:<22} пропущен: {e}")
+                continue
+            write_time, total_time = run(output, rows)
+            print(f"{title:<22} write_row: {args.rows / write_time:>10,.0f} строк/с, "
+                  f"всего: {args.rows / total_time:>10,.0f} строк/с, "
+                  f"файл: {os.path.getsize(path) / 1024**2:.1f} МБ")
+
+
+if __name__ == "__main__":
+    main()
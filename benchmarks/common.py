@@ -0,0 +1,53 @@
+"""Общие вспомогательные функции для бенчмарков сканера"""
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Модули проекта лежат уровнем выше каталога benchmarks
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_DIR)
+
+
+def make_tree(root, depth=3, fanout=4, files_per_dir=20, file_size=1024):
+    """Создает синтетическое дерево каталогов с разреженными файлами.
+
+    Возвращает кортеж (число директорий, число файлов).
+    """
+    dirs_count = 0
+    files_count = 0
+    stack = [(root, 0)]
+    while stack:
+        path, level = stack.pop()
+        os.makedirs(path, exist_ok=True)
+        dirs_count += 1
+        for i in range(files_per_dir):
+            # truncate создает разреженный файл: размер есть, место на диске - нет
+            with open(os.path.join(path, f"file_{i}.dat"), 'wb') as f:
+                f.truncate(file_size)
+            files_count += 1
+        if level < depth:
+            for i in range(fanout):
+                stack.append((os.path.join(path, f"dir_{i}"), level + 1))
+    return dirs_count, files_count
+
+
+def timed(func, *args, **kwargs):
+    """Выполняет функцию и возвращает пару (результат, время в секундах)"""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def peak_rss_mb():
+    """Пиковый RSS текущего процесса в МБ (None, если resource недоступен)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux - килобайты, macOS - байты
+    return peak / 1024 ** 2 if os.uname().sysname == 'Darwin' else peak / 1024
@@ -0,0 +1,238 @@
+"""Генератор синтетических деревьев файлов для воспроизводимых замеров.
+
+Форма дерева задается параметрами SyntheticTreeSpec: глубина, число
+поддиректорий и файлов в каждой директории, распределение размеров,
+доля жестких ссылок, частично заполненных файлов и недоступных директорий,
+разброс времени изменения. Все случайные величины берутся из генератора
+с заданным seed, поэтому одинаковые параметры дают одинаковое дерево.
+
+Файлы создаются разреженными (ftruncate): размер может быть любым, а
+место на диске не расходуется. Доля dense_ratio файлов получает настоящие
+данные в начале (до dense_bytes байт) - у таких файлов место на диске
+отличается от видимого размера, как у настоящих разреженных файлов.
+Недоступные директории получают права 000 после заполнения; для root
+права не действуют, и такие директории читаются как обычные.
+
+Запуск: python benchmarks/synthetic_tree.py /tmp/tree --depth 4 --fanout 6 --files 50
+"""
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import stat
+import tempfile
+import time
+from contextlib import contextmanager
+
+SIZE_DISTRIBUTIONS = ('fixed', 'uniform', 'lognormal', 'pareto')
+
+
+class SyntheticTreeSpec:
+    """Параметры синтетического дерева.
+
+    size_distribution: fixed - все файлы median_size; uniform - от 0 до
+    max_size; lognormal - медиана median_size, разброс size_sigma;
+    pareto - тяжелый хвост от median_size. Размеры ограничены max_size.
+    """
+
+    def __init__(self, depth=3, fanout=4, files_per_dir=20, size_distribution='lognormal',
+                 median_size=16 * 1024, max_size=64 * 1024 ** 3, size_sigma=2.5, hardlink_ratio=0.0,
+                 dense_ratio=0.0, dense_bytes=64 * 1024, unreadable_ratio=0.0, max_age_days=3650, seed=1):
+        self.depth = depth
+        self.fanout = fanout
+        self.files_per_dir = files_per_dir
+        self.size_distribution = size_distribution
+        self.median_size = median_size
+        self.max_size = max_size
+        self.size_sigma = size_sigma
+        self.hardlink_ratio = hardlink_ratio
+        self.dense_ratio = dense_ratio
+        self.dense_bytes = dense_bytes
+        self.unreadable_ratio = unreadable_ratio
+        self.max_age_days = max_age_days
+        self.seed = seed
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+class _SizeSampler:
+    def __init__(self, spec, rng):
+        if spec.size_distribution not in SIZE_DISTRIBUTIONS:
+            raise ValueError(f"Неизвестное распределение размеров: {spec.size_distribution}")
+        self.spec = spec
+        self.rng = rng
+        self._mu = math.log(max(spec.median_size, 1))
+
+    def __call__(self):
+        spec = self.spec
+        distribution = spec.size_distribution
+        if distribution == 'fixed':
+            size = spec.median_size
+        elif distribution == 'uniform':
+            size = self.rng.randint(0, spec.max_size)
+        elif distribution == 'lognormal':
+            size = int(self.rng.lognormvariate(self._mu, spec.size_sigma))
+        else:
+            size = int(spec.median_size * self.rng.paretovariate(1.2))
+        return min(size, spec.max_size)
+
+
+def generate_tree(root, spec):
+    """Создает дерево в root по spec и возвращает описание созданного (словарь).
+
+    В описании - параметры, число директорий, файлов, жестких ссылок и
+    недоступных директорий, суммарный видимый размер и объем записанных
+    данных. Размер считается по одному разу на inode, как в du.
+    """
+    rng = random.Random(spec.seed)
+    sample_size = _SizeSampler(spec, rng)
+    now = time.time()
+    max_age = spec.max_age_days * 86400
+
+    counts = {'dirs': 0, 'files': 0, 'hardlinks': 0, 'dense_files': 0, 'unreadable_dirs': 0,
+              'apparent_bytes': 0, 'written_bytes': 0}
+    # Последние созданные файлы - цели для жестких ссылок (из разных директорий)
+    link_targets = []
+    unreadable = []
+    stack = [(root, 0)]
+    while stack:
+        path, level = stack.pop()
+        os.makedirs(path, exist_ok=True)
+        counts['dirs'] += 1
+        for i in range(spec.files_per_dir):
+            file_path = os.path.join(path, f"file_{i}.{('dat', 'log', 'txt', 'bin', 'jpg')[i % 5]}")
+            if link_targets and rng.random() < spec.hardlink_ratio:
+                os.link(rng.choice(link_targets), file_path)
+                counts['hardlinks'] += 1
+                continue
+            size = sample_size()
+            fd = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                if spec.dense_ratio and rng.random() < spec.dense_ratio:
+                    data_size = min(size, spec.dense_bytes)
+                    os.write(fd, b'\xa5' * data_size)
+                    counts['dense_files'] += 1
+                    counts['written_bytes'] += data_size
+                os.ftruncate(fd, size)
+            finally:
+                os.close(fd)
+            if max_age:
+                mtime = now - rng.random() * max_age
+                os.utime(file_path, (mtime, mtime))
+            counts['files'] += 1
+            counts['apparent_bytes'] += size
+            if spec.hardlink_ratio:
+                link_targets.append(file_path)
+                if len(link_targets) > 1000:
+                    del link_targets[:500]
+        if level < spec.depth:
+            for i in range(spec.fanout):
+                stack.append((os.path.join(path, f"dir_{i}"), level + 1))
+        if level and rng.random() < spec.unreadable_ratio:
+            unreadable.append(path)
+
+    # Права снимаются в конце: в недоступную директорию уже не создать файлы
+    for path in unreadable:
+        os.chmod(path, 0)
+    counts['unreadable_dirs'] = len(unreadable)
+    return {'root': root, 'spec': spec.to_dict(), **counts}
+
+
+def restore_permissions(root):
+    """Возвращает права недоступным директориям, чтобы дерево можно было удалить"""
+    for current, dirs, files in os.walk(root, onerror=lambda error: None):
+        for name in dirs:
+            path = os.path.join(current, name)
+            if not stat.S_IMODE(os.lstat(path).st_mode) & stat.S_IRWXU:
+                # walk спускается в поддиректории после yield, поэтому увидит и ее содержимое
+                os.chmod(path, 0o755)
+
+
+def remove_tree(root):
+    restore_permissions(root)
+    shutil.rmtree(root, ignore_errors=True)
+
+
+@contextmanager
+def synthetic_tree(spec, path=None):
+    """Создает дерево во временной директории (или в path) и удаляет его по выходу"""
+    root = path or tempfile.mkdtemp(prefix='synthetic_tree_')
+    try:
+        yield generate_tree(os.path.join(root, 'tree'), spec)
+    finally:
+        remove_tree(os.path.join(root, 'tree'))
+        if path is None:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+def add_spec_arguments(parser):
+    """Добавляет в argparse параметры SyntheticTreeSpec"""
+    defaults = SyntheticTreeSpec()
+    parser.add_argument('--depth', type=int, default=defaults.depth, help='Глубина дерева')
+    parser.add_argument('--fanout', type=int, default=defaults.fanout, help='Поддиректорий в каждой директории')
+    parser.add_argument('--files', type=int, default=defaults.files_per_dir, help='Файлов в каждой директории')
+    parser.add_argument('--size-distribution', choices=SIZE_DISTRIBUTIONS, default=defaults.size_distribution,
+                        help='Распределение размеров файлов')
+    parser.add_argument('--median-size', type=int, default=defaults.median_size,
+                        help='Медианный (для fixed - точный) размер файла в байтах')
+    parser.add_argument('--max-size', type=int, default=defaults.max_size, help='Наибольший размер файла в байтах')
+    parser.add_argument('--size-sigma', type=float, default=defaults.size_sigma,
+                        help='Разброс логнормального распределения')
+    parser.add_argument('--hardlink-ratio', type=float, default=defaults.hardlink_ratio,
+                        help='Доля файлов - жестких ссылок на уже созданные')
+    parser.add_argument('--dense-ratio', type=float, default=defaults.dense_ratio,
+                        help='Доля файлов с настоящими данными в начале')
+    parser.add_argument('--dense-bytes', type=int, default=defaults.dense_bytes,
+                        help='Сколько байт данных записывать в такие файлы')
+    parser.add_argument('--unreadable-ratio', type=float, default=defaults.unreadable_ratio,
+                        help='Доля директорий без прав на чтение')
+    parser.add_argument('--max-age-days', type=int, default=defaults.max_age_days,
+                        help='Наибольший возраст файлов в днях (0 - время создания)')
+    parser.add_argument('--seed', type=int, default=defaults.seed, help='Начальное значение генератора')
+
+
+def spec_from_args(args):
+    return SyntheticTreeSpec(
+        depth=args.depth, fanout=args.fanout, files_per_dir=args.files,
+        size_distribution=args.size_distribution, median_size=args.median_size, max_size=args.max_size,
+        size_sigma=args.size_sigma, hardlink_ratio=args.hardlink_ratio, dense_ratio=args.dense_ratio,
+        dense_bytes=args.dense_bytes, unreadable_ratio=args.unreadable_ratio,
+        max_age_days=args.max_age_days, seed=args.seed)
+
+
+def describe(info):
+    return (f"{info['dirs']} директорий, {info['files']} файлов, {info['hardlinks']} жестких ссылок, "
+            f"{info['unreadable_dirs']} недоступных директорий, "
+            f"видимый размер {info['apparent_bytes'] / 1024**3:.1f} ГБ, "
+            f"записано данных {info['written_bytes'] / 1024**2:.1f} МБ")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Генератор синтетического дерева файлов')
+    parser.add_argument('path', help='Директория, в которой создается дерево')
+    parser.add_argument('--manifest', help='JSON-файл с параметрами и итогами созданного дерева')
+    parser.add_argument('--remove', action='store_true',
+                        help='Удалить ранее созданное дерево (с восстановлением прав)')
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+
+    if args.remove:
+        remove_tree(args.path)
+        print(f"Дерево удалено: {args.path}")
+        return
+
+    if hasattr(os, 'geteuid') and os.geteuid() == 0 and args.unreadable_ratio:
+        print("ВНИМАНИЕ: для root права 000 не действуют, недоступные директории будут прочитаны")
+    start = time.perf_counter()
+    info = generate_tree(args.path, spec_from_args(args))
+    print(f"Создано за {time.perf_counter() - start:.1f} с: {describe(info)}")
+    if args.manifest:
+        with open(args.manifest, 'w', encoding='utf-8') as f:
+            json.dump(info, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
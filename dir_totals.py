@@ -0,0 +1,87 @@
+"""Компактное хранение итогов директорий при обходе снизу вверх.
+
+Итог поддиректории нужен только до тех пор, пока его не заберет родитель,
+поэтому DirTotals хранит лишь завершенные директории, родитель которых
+еще не обработан, и освобождает запись в pop(). При обходе в глубину это
+порядка глубина * ширина записей, а не все директории диска.
+
+Счетчики лежат в массивах array('q') по номерам слотов (8 байт на
+счетчик вместо объекта int и записи словаря на каждый), освобожденные
+слоты переиспользуются. Путь в словаре слотов - тот же объект строки,
+что и в списке поддиректорий родителя, поэтому строки не копируются.
+"""
+from array import array
+
+# Итоги поддерева: видимый размер, место на диске, файлы, файлы не меньше порога отчета
+FIELDS = ('size', 'disk_size', 'files', 'large_files')
+
+
+class DirTotals:
+    """Итоги завершенных директорий, ожидающих родителя: путь -> FIELDS"""
+
+    def __init__(self):
+        self._slots = {}
+        self._free = []
+        self.size = array('q')
+        self.disk_size = array('q')
+        self.files = array('q')
+        self.large_files = array('q')
+        # Наибольшее число одновременно хранимых директорий
+        self.peak = 0
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, path):
+        return path in self._slots
+
+    def add(self, path, size, disk_size, files, large_files):
+        """Сохраняет итоги директории до обработки ее родителя"""
+        slot = self._slots.get(path)
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+            else:
+                slot = len(self.size)
+                self.size.append(0)
+                self.disk_size.append(0)
+                self.files.append(0)
+                self.large_files.append(0)
+            self._slots[path] = slot
+            if len(self._slots) > self.peak:
+                self.peak = len(self._slots)
+        self.size[slot] = size
+        self.disk_size[slot] = disk_size
+        self.files[slot] = files
+        self.large_files[slot] = large_files
+
+    def _values(self, slot):
+        return self.size[slot], self.disk_size[slot], self.files[slot], self.large_files[slot]
+
+    def get(self, path):
+        """Итоги директории без освобождения или None"""
+        slot = self._slots.get(path)
+        if slot is None:
+            return None
+        return self._values(slot)
+
+    def pop(self, path):
+        """Забирает итоги директории и освобождает ее слот; None, если ее нет"""
+        slot = self._slots.pop(path, None)
+        if slot is None:
+            return None
+        self._free.append(slot)
+        return self._values(slot)
+
+    def to_state(self, paths):
+        """Состояние для JSON (контрольные точки): итоги директорий из paths, которые хранятся"""
+        return {path: list(totals) for path, totals in ((path, self.get(path)) for path in paths)
+                if totals is not None}
+
+    @classmethod
+    def from_state(cls, state):
+        """Восстанавливает итоги из результата to_state()"""
+        totals = cls()
+        for path, values in state.items():
+            totals.add(path, *values)
+        return totals
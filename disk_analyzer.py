@@ -1,62 +1,294 @@
 #python disk_analyzer.py --input "scan_results.csv" --output-dir "analysis_results" --top-n 15
-import pandas as pd
-import matplotlib.pyplot as plt
-import numpy as np
+# pandas, numpy и matplotlib импортируются внутри функций: запуск с --help
+# и построение только части графиков не загружают лишние библиотеки
 import os
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-import matplotlib
 
-# Используем библиотеку для улучшения визуализации
-matplotlib.rcParams['font.family'] = 'DejaVu Sans'
-plt.style.use('ggplot')
+from scan_output import is_parquet, open_report
 
-def analyze_disk_data(input_file, output_dir, top_n=20):
-    """Анализирует данные сканирования диска и создает визуализации"""
-    # Создаем директорию для результатов, если ее нет
-    os.makedirs(output_dir, exist_ok=True)
+MB = 1024 * 1024
+
+# Количество расширений на тепловой карте и размер выборки на одно расширение
+HEATMAP_EXTENSIONS = 30
+HEATMAP_SAMPLE_PER_EXTENSION = 500
+
+# Число корзин на удвоение размера в приближенном кумулятивном распределении
+CUMULATIVE_BUCKETS_PER_OCTAVE = 8
+
+# Максимальное число точек кумулятивной кривой, передаваемых в график
+CUMULATIVE_MAX_POINTS = 4096
+
+def _normalize_parquet_frame(df):
+    """Приводит данные из Parquet к виду, в котором их читает pd.read_csv"""
+    # Колонки со словарным кодированием приходят как category
+    for column in ('Type', 'Extension'):
+        df[column] = df[column].astype(object)
+    local_tz = datetime.now().astimezone().tzinfo
+    for column in ('DateTimeCreate', 'DateTimeLastModification'):
+        df[column] = df[column].dt.tz_convert(local_tz).dt.tz_localize(None)
+    return df
+
+def load_scan_data(input_file):
+    """Загружает результаты сканирования из CSV или Parquet.
     
-    # Загрузка данных
-    print(f"Загрузка данных из {input_file}...")
-    df = pd.read_csv(input_file)
+    Формат и сжатие CSV (gzip, zstd) определяются по сигнатуре файла.
+    В Parquet размеры уже int64, а даты - timestamp в UTC; они приводятся
+    к локальному времени, как в CSV.
+    """
+    import pandas as pd
+    
+    if not is_parquet(input_file):
+        with open_report(input_file) as f:
+            return pd.read_csv(f)
+    return _normalize_parquet_frame(pd.read_parquet(input_file))
+
+def iter_scan_chunks(input_file, chunk_size):
+    """Читает результаты сканирования порциями по chunk_size строк"""
+    import pandas as pd
+    
+    if not is_parquet(input_file):
+        with open_report(input_file) as f:
+            yield from pd.read_csv(f, chunksize=chunk_size)
+        return
+    
+    import pyarrow.parquet as pq
+    for batch in pq.ParquetFile(input_file).iter_batches(batch_size=chunk_size):
+        yield _normalize_parquet_frame(batch.to_pandas())
+
+def _parse_dates(column):
+    """Преобразует колонку дат из CSV: текст или секунды эпохи (--timestamp-format epoch)"""
+    import pandas as pd
+    
+    if pd.api.types.is_numeric_dtype(column):
+        local_tz = datetime.now().astimezone().tzinfo
+        dates = pd.to_datetime(column, unit='s', utc=True, errors='coerce')
+        return dates.dt.tz_convert(local_tz).dt.tz_localize(None)
+    return pd.to_datetime(column, errors='coerce')
+
+def _monthly_creation(files_df):
+    """Суммарный размер файлов (МБ) по месяцам создания"""
+    created = _parse_dates(files_df['DateTimeCreate'])
+    valid = created.notna()
+    months = created[valid].dt.to_period('M').astype(str)
+    return (files_df.loc[valid, 'Size'] / MB).groupby(months.values).sum()
+
+def _empty_summary():
+    import numpy as np
+    import pandas as pd
     
-    # Преобразование размеров в МБ
-    df['размер_МБ'] = df['Size'] / (1024 * 1024)
+    return {
+        'total_size': 0,
+        'files_count': 0,
+        'dirs_count': 0,
+        'files_size': 0,
+        'dirs_size': 0,
+        'max_file_size': 0,
+        'files_disk_size': None,
+        'top_files': pd.DataFrame(columns=['Path', 'Name', 'Extension', 'Size']),
+        'top_dirs': pd.DataFrame(columns=['Path', 'Name', 'Size']),
+        'ext_stats': pd.DataFrame(columns=['count', 'total_size']),
+        'monthly': pd.Series(dtype=float),
+        'cumulative': (np.zeros(0), np.zeros(0)),
+        'size_samples': pd.DataFrame(columns=['Extension', 'Size']),
+    }
+
+def summarize_dataframe(df, top_n=20):
+    """Считает все агрегаты для графиков и отчета по полностью загруженным данным"""
+    import numpy as np
     
-    # Фильтрация данных
     files_df = df[df['Type'] == 'file']
     dirs_df = df[df['Type'] == 'dir']
     
-    print(f"Загружено {len(df)} записей")
-    print(f"Файлов: {len(files_df)}, Директорий: {len(dirs_df)}")
+    summary = _empty_summary()
+    summary['total_size'] = df['Size'].sum()
+    summary['files_count'] = len(files_df)
+    summary['dirs_count'] = len(dirs_df)
+    summary['files_size'] = files_df['Size'].sum()
+    summary['dirs_size'] = dirs_df['Size'].sum()
+    summary['max_file_size'] = files_df['Size'].max() if len(files_df) else 0
+    if 'DiskSize' in files_df.columns:
+        summary['files_disk_size'] = files_df['DiskSize'].sum()
+    summary['top_files'] = files_df.nlargest(top_n, 'Size')[['Path', 'Name', 'Extension', 'Size']]
+    summary['top_dirs'] = dirs_df.nlargest(top_n, 'Size')[['Path', 'Name', 'Size']]
+    summary['ext_stats'] = files_df.groupby('Extension').agg(
+        count=('Size', 'size'),
+        total_size=('Size', 'sum')
+    )
+    
+    # Точное кумулятивное распределение: все файлы по убыванию размера
+    sorted_sizes = np.sort(files_df['Size'].to_numpy())[::-1]
+    summary['cumulative'] = (np.arange(len(sorted_sizes)), np.cumsum(sorted_sizes) / MB)
     
-    # 1. Топ файлов по размеру
+    if 'DateTimeCreate' in files_df.columns:
+        try:
+            summary['monthly'] = _monthly_creation(files_df)
+        except Exception as e:
+            print(f"Ошибка при обработке дат: {str(e)}")
+    
+    # Для тепловой карты - случайная выборка, как в потоковом режиме:
+    # точка на каждый файл строится минутами и не меняет картину
+    top_extensions = files_df['Extension'].value_counts().nlargest(HEATMAP_EXTENSIONS).index
+    samples = files_df[files_df['Extension'].isin(top_extensions)][['Extension', 'Size']]
+    samples = samples.assign(key=np.random.default_rng(0).random(len(samples))).sort_values('key')
+    summary['size_samples'] = samples.groupby('Extension').head(HEATMAP_SAMPLE_PER_EXTENSION)[['Extension', 'Size']]
+    return summary
+
+class StreamingSummary:
+    """Накопитель агрегатов для потокового анализа.
+    
+    Данные подаются порциями через update(); память не зависит от размера
+    входного файла: хранятся только топ-N файлов и директорий, суммы по
+    расширениям и месяцам, гистограмма размеров с логарифмическими корзинами
+    и ограниченная случайная выборка размеров по каждому расширению.
+    """
+    
+    def __init__(self, top_n=20, seed=0):
+        import numpy as np
+        import pandas as pd
+        
+        self.top_n = top_n
+        self.summary = _empty_summary()
+        self._ext_count = pd.Series(dtype='int64')
+        self._ext_size = pd.Series(dtype='int64')
+        self._monthly = pd.Series(dtype=float)
+        self._bucket_count = pd.Series(dtype='int64')
+        self._bucket_size = pd.Series(dtype='int64')
+        self._samples = pd.DataFrame(columns=['Extension', 'Size', 'key'])
+        self._rng = np.random.default_rng(seed)
+    
+    @staticmethod
+    def _add(total, part):
+        return total.add(part, fill_value=0)
+    
+    def _merge_top(self, current, part):
+        import pandas as pd
+        
+        # Объединяем текущий топ с топом порции
+        if len(current):
+            part = pd.concat([current, part])
+        return part.nlargest(self.top_n, 'Size')
+    
+    def update(self, chunk):
+        """Учитывает очередную порцию строк отчета"""
+        import numpy as np
+        import pandas as pd
+        
+        summary = self.summary
+        files_df = chunk[chunk['Type'] == 'file']
+        dirs_df = chunk[chunk['Type'] == 'dir']
+        
+        summary['total_size'] += int(chunk['Size'].sum())
+        summary['files_count'] += len(files_df)
+        summary['dirs_count'] += len(dirs_df)
+        summary['files_size'] += int(files_df['Size'].sum())
+        summary['dirs_size'] += int(dirs_df['Size'].sum())
+        if len(files_df):
+            summary['max_file_size'] = max(summary['max_file_size'], int(files_df['Size'].max()))
+        if 'DiskSize' in files_df.columns:
+            summary['files_disk_size'] = (summary['files_disk_size'] or 0) + int(files_df['DiskSize'].sum())
+        
+        summary['top_files'] = self._merge_top(summary['top_files'], files_df[['Path', 'Name', 'Extension', 'Size']])
+        summary['top_dirs'] = self._merge_top(summary['top_dirs'], dirs_df[['Path', 'Name', 'Size']])
+        
+        by_ext = files_df.groupby('Extension')['Size']
+        self._ext_count = self._add(self._ext_count, by_ext.size())
+        self._ext_size = self._add(self._ext_size, by_ext.sum())
+        
+        if 'DateTimeCreate' in files_df.columns:
+            try:
+                self._monthly = self._add(self._monthly, _monthly_creation(files_df))
+            except Exception as e:
+                print(f"Ошибка при обработке дат: {str(e)}")
+        
+        # Гистограмма размеров для кумулятивного графика
+        sizes = files_df['Size'].to_numpy()
+        buckets = np.floor(np.log2(np.maximum(sizes, 1)) * CUMULATIVE_BUCKETS_PER_OCTAVE).astype(np.int64)
+        by_bucket = pd.Series(sizes).groupby(buckets)
+        self._bucket_count = self._add(self._bucket_count, by_bucket.size())
+        self._bucket_size = self._add(self._bucket_size, by_bucket.sum())
+        
+        # Равномерная выборка по каждому расширению: оставляем строки
+        # с наименьшими случайными ключами (bottom-k sampling)
+        sample = files_df[['Extension', 'Size']].assign(key=self._rng.random(len(files_df)))
+        merged = pd.concat([self._samples, sample]) if len(self._samples) else sample
+        self._samples = merged.sort_values('key').groupby('Extension').head(HEATMAP_SAMPLE_PER_EXTENSION)
+    
+    def result(self):
+        """Возвращает агрегаты в том же виде, что и summarize_dataframe"""
+        import numpy as np
+        import pandas as pd
+        
+        summary = dict(self.summary)
+        summary['ext_stats'] = pd.DataFrame({
+            'count': self._ext_count.astype('int64'),
+            'total_size': self._ext_size.astype('int64'),
+        })
+        summary['monthly'] = self._monthly.sort_index()
+        
+        # Кумулятивная кривая по корзинам от крупных файлов к мелким;
+        # внутри корзины файлы считаются одинаковыми по размеру
+        counts = self._bucket_count.sort_index(ascending=False)
+        sizes = self._bucket_size.reindex(counts.index)
+        summary['cumulative'] = (
+            np.concatenate([[0], np.cumsum(counts.to_numpy())]),
+            np.concatenate([[0], np.cumsum(sizes.to_numpy()) / MB])
+        )
+        
+        top_extensions = self._ext_count.nlargest(HEATMAP_EXTENSIONS).index
+        samples = self._samples
+        summary['size_samples'] = samples[samples['Extension'].isin(top_extensions)][['Extension', 'Size']]
+        return summary
+
+def summarize_stream(input_file, top_n=20, chunk_size=100000):
+    """Считает агрегаты за один проход по файлу, читая его порциями"""
+    aggregator = StreamingSummary(top_n)
+    rows = 0
+    for chunk in iter_scan_chunks(input_file, chunk_size):
+        aggregator.update(chunk)
+        rows += len(chunk)
+        print(f"\rОбработано строк: {rows}", end='', flush=True)
+    print()
+    return aggregator.result()
+
+def _chart_top_files(summary, top_n):
+    top_files = summary['top_files']
+    # В отчете без строк файлов (--no-file-rows) строить нечего
+    if top_files.empty:
+        return None
+    return {
+        'labels': list(top_files['Name'] + " (" + top_files['Extension'].fillna('').astype(str) + ")"),
+        'sizes_mb': list(top_files['Size'] / MB),
+        'top_n': top_n,
+    }
+
+def _plot_top_files(plt, data, path):
     plt.figure(figsize=(14, 10))
-    top_files = files_df.nlargest(top_n, 'размер_МБ')
-    plt.barh(
-        top_files['Name'] + " (" + top_files['Extension'] + ")",
-        top_files['размер_МБ'],
-        color='royalblue'
-    )
+    plt.barh(data['labels'], data['sizes_mb'], color='royalblue')
     plt.xlabel('Размер (МБ)')
-    plt.title(f'Топ-{top_n} файлов по размеру')
+    plt.title(f"Топ-{data['top_n']} файлов по размеру")
     plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, 'top_files.png'), dpi=150)
+    plt.savefig(path, dpi=150)
     plt.close()
-    
-    # 2. Топ директорий по размеру
+
+def _chart_top_dirs(summary, top_n):
+    top_dirs = summary['top_dirs']
+    return {'labels': list(top_dirs['Name']), 'sizes_mb': list(top_dirs['Size'] / MB), 'top_n': top_n}
+
+def _plot_top_dirs(plt, data, path):
     plt.figure(figsize=(14, 10))
-    top_dirs = dirs_df.nlargest(top_n, 'размер_МБ')
-    plt.barh(top_dirs['Name'], top_dirs['размер_МБ'], color='forestgreen')
+    plt.barh(data['labels'], data['sizes_mb'], color='forestgreen')
     plt.xlabel('Размер (МБ)')
-    plt.title(f'Топ-{top_n} директорий по размеру')
+    plt.title(f"Топ-{data['top_n']} директорий по размеру")
     plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, 'top_dirs.png'), dpi=150)
+    plt.savefig(path, dpi=150)
     plt.close()
-    
-    # 3. Распределение по типам файлов (расширениям) с легендой
-    plt.figure(figsize=(14, 10))
-    ext_size = files_df.groupby('Extension')['размер_МБ'].sum()
+
+def _chart_file_types(summary, top_n):
+    if summary['ext_stats'].empty:
+        return None
+    ext_size = summary['ext_stats']['total_size'] / MB
     
     # Фильтрация мелких категорий и объединение в "Другие"
     threshold = ext_size.quantile(0.9)  # Порог для объединения мелких категорий
@@ -69,10 +301,11 @@ def analyze_disk_data(input_file, output_dir, top_n=20):
     
     # Сортируем по размеру
     main_exts = main_exts.sort_values(ascending=False)
-    
-    # Создаем данные для диаграммы
-    sizes = main_exts.values
-    labels = main_exts.index
+    return {'labels': list(main_exts.index), 'sizes_mb': list(main_exts.values)}
+
+def _plot_file_types(plt, data, path):
+    plt.figure(figsize=(14, 10))
+    sizes = data['sizes_mb']
     
     # Создаем круговую диаграмму с легендой
     patches, texts, autotexts = plt.pie(
@@ -86,7 +319,7 @@ def analyze_disk_data(input_file, output_dir, top_n=20):
     # Добавляем легенду снаружи диаграммы
     plt.legend(
         patches,
-        [f"{l} ({s:.1f} ГБ)" for l, s in zip(labels, sizes/1024)],
+        [f"{l} ({s / 1024:.1f} ГБ)" for l, s in zip(data['labels'], sizes)],
         title="Типы файлов",
         loc="center left",
         bbox_to_anchor=(1, 0, 0.5, 1),
@@ -95,69 +328,78 @@ def analyze_disk_data(input_file, output_dir, top_n=20):
     
     plt.title('Распределение места по типам файлов')
     plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, 'file_types.png'), dpi=150, bbox_inches='tight')
+    plt.savefig(path, dpi=150, bbox_inches='tight')
     plt.close()
+
+def _chart_cumulative_size(summary, top_n):
+    import numpy as np
     
-    # 4. Кумулятивный объем файлов
+    if not summary['files_count']:
+        return None
+    cumulative_x, cumulative_y = summary['cumulative']
+    # Точная кривая содержит точку на каждый файл; для линии достаточно
+    # равномерно прореженных точек (последняя сохраняется)
+    if len(cumulative_x) > CUMULATIVE_MAX_POINTS:
+        index = np.unique(np.linspace(0, len(cumulative_x) - 1, CUMULATIVE_MAX_POINTS).astype(np.int64))
+        cumulative_x, cumulative_y = cumulative_x[index], cumulative_y[index]
+    return {'x': cumulative_x, 'y': cumulative_y}
+
+def _plot_cumulative_size(plt, data, path):
     plt.figure(figsize=(12, 8))
-    sorted_files = files_df.sort_values('Size', ascending=False)
-    sorted_files['cumulative'] = sorted_files['размер_МБ'].cumsum()
-    plt.plot(np.arange(len(sorted_files)), sorted_files['cumulative'], 'b-')
+    plt.plot(data['x'], data['y'], 'b-')
     plt.xlabel('Количество файлов (отсортировано по размеру)')
     plt.ylabel('Накопленный объем (МБ)')
     plt.title('Кумулятивное распределение объема файлов')
     plt.grid(True, alpha=0.3)
-    plt.savefig(os.path.join(output_dir, 'cumulative_size.png'), dpi=150)
+    plt.savefig(path, dpi=150)
     plt.close()
-    
-    # 5. Динамика создания файлов (если есть данные)
-    if 'DateTimeCreate' in files_df.columns:
-        try:
-            # Преобразуем даты и фильтруем корректные
-            files_df['дата_создания'] = pd.to_datetime(
-                files_df['DateTimeCreate'], 
-                errors='coerce'
-            )
-            valid_dates = files_df.dropna(subset=['дата_создания'])
-            
-            # Группировка по году и месяцу
-            valid_dates['год_месяц'] = valid_dates['дата_создания'].dt.to_period('M')
-            monthly = valid_dates.groupby('год_месяц')['размер_МБ'].sum().reset_index()
-            monthly['год_месяц'] = monthly['год_месяц'].astype(str)
-            
-            plt.figure(figsize=(14, 7))
-            plt.bar(monthly['год_месяц'], monthly['размер_МБ'], color='purple')
-            plt.xlabel('Год-месяц')
-            plt.ylabel('Общий размер созданных файлов (МБ)')
-            plt.title('Динамика создания файлов по времени')
-            plt.xticks(rotation=45, ha='right')
-            plt.tight_layout()
-            plt.savefig(os.path.join(output_dir, 'creation_timeline.png'), dpi=150)
-            plt.close()
-        except Exception as e:
-            print(f"Ошибка при обработке дат: {str(e)}")
-    
-    # 6. Соотношение файлов и директорий
+
+def _chart_creation_timeline(summary, top_n):
+    monthly = summary['monthly']
+    # График строится, только если есть даты
+    if not len(monthly):
+        return None
+    return {'months': list(monthly.index.astype(str)), 'sizes_mb': list(monthly.values)}
+
+def _plot_creation_timeline(plt, data, path):
+    plt.figure(figsize=(14, 7))
+    plt.bar(data['months'], data['sizes_mb'], color='purple')
+    plt.xlabel('Год-месяц')
+    plt.ylabel('Общий размер созданных файлов (МБ)')
+    plt.title('Динамика создания файлов по времени')
+    plt.xticks(rotation=45, ha='right')
+    plt.tight_layout()
+    plt.savefig(path, dpi=150)
+    plt.close()
+
+def _chart_files_vs_dirs(summary, top_n):
+    return {'sizes_mb': [summary['files_size'] / MB, summary['dirs_size'] / MB]}
+
+def _plot_files_vs_dirs(plt, data, path):
     plt.figure(figsize=(8, 6))
-    sizes = [files_df['размер_МБ'].sum(), dirs_df['размер_МБ'].sum()]
     labels = ['Файлы', 'Директории']
-    plt.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=90, colors=['lightblue', 'lightgreen'])
+    plt.pie(data['sizes_mb'], labels=labels, autopct='%1.1f%%', startangle=90, colors=['lightblue', 'lightgreen'])
     plt.title('Распределение места между файлами и директориями')
-    plt.savefig(os.path.join(output_dir, 'files_vs_dirs.png'), dpi=150)
+    plt.savefig(path, dpi=150)
     plt.close()
+
+def _chart_size_heatmap(summary, top_n):
+    samples = summary['size_samples']
+    if samples.empty:
+        return None
+    return {'extensions': list(samples['Extension']), 'sizes_mb': (samples['Size'] / MB).to_numpy()}
+
+def _plot_size_heatmap(plt, data, path):
+    import numpy as np
     
-    # 7. Тепловая карта расширений и размеров
     plt.figure(figsize=(12, 8))
-    top_extensions = files_df['Extension'].value_counts().nlargest(30).index
-    filtered_files = files_df[files_df['Extension'].isin(top_extensions)]
+    sample_mb = data['sizes_mb']
     
     # Логарифмируем размеры для лучшей визуализации
-    filtered_files['log_size'] = np.log10(filtered_files['размер_МБ'] + 1)
-    
     plt.scatter(
-        filtered_files['Extension'],
-        filtered_files['размер_МБ'],
-        c=filtered_files['log_size'],
+        data['extensions'],
+        sample_mb,
+        c=np.log10(sample_mb + 1),
         cmap='viridis',
         alpha=0.6,
         s=30
@@ -169,21 +411,276 @@ def analyze_disk_data(input_file, output_dir, top_n=20):
     plt.title('Распределение размеров файлов по расширениям')
     plt.xticks(rotation=45, ha='right')
     plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, 'size_heatmap.png'), dpi=150)
+    plt.savefig(path, dpi=150)
     plt.close()
+
+def _plot_duplicates(plt, data, path):
+    plt.figure(figsize=(14, 10))
+    plt.barh(data['labels'], data['wasted_mb'], color='darkorange')
+    plt.xlabel('Лишнее место (МБ)')
+    plt.title(f"Топ-{data['top_n']} групп дубликатов (всего лишнего места: {data['total_wasted_gb']:.2f} ГБ)")
+    plt.gca().invert_yaxis()
+    plt.tight_layout()
+    plt.savefig(path, dpi=150)
+    plt.close()
+
+def _plot_growth(plt, data, path):
+    plt.figure(figsize=(14, 10))
+    colors = ['seagreen' if status == 'added' else 'indianred' for status in data['statuses']]
+    plt.barh(data['labels'], data['delta_mb'], color=colors)
+    plt.xlabel('Прирост (МБ)')
+    plt.title(f"Топ-{data['top_n']} директорий по росту (всего: {data['total_delta_gb']:+.2f} ГБ)")
+    plt.gca().invert_yaxis()
+    plt.tight_layout()
+    plt.savefig(path, dpi=150)
+    plt.close()
+
+def _format_bytes(size):
+    """Короткая подпись размера для осей: 0 Б, 4 КБ, 16 МБ, 2 ГБ..."""
+    for unit in ('Б', 'КБ', 'МБ', 'ГБ', 'ТБ', 'ПБ'):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.0f} ЭБ"
+
+def _plot_population_types(plt, data, path):
+    fig, (ax_size, ax_count) = plt.subplots(1, 2, figsize=(16, 10))
+    ax_size.barh(data['labels'], data['sizes_gb'], color='royalblue')
+    ax_size.set_xlabel('Размер (ГБ)')
+    ax_size.set_title('По объему')
+    ax_size.invert_yaxis()
+    ax_count.barh(data['labels'], data['files'], color='darkorange')
+    ax_count.set_xlabel('Количество файлов')
+    ax_count.set_title('По количеству')
+    ax_count.invert_yaxis()
+    fig.suptitle(f"Топ-{data['top_n']} расширений по всем файлам ({data['total_files']} файлов)")
+    plt.tight_layout()
+    plt.savefig(path, dpi=150)
+    plt.close()
+
+def _plot_population_sizes(plt, data, path):
+    fig, ax_count = plt.subplots(figsize=(14, 8))
+    positions = range(len(data['labels']))
+    ax_count.bar(positions, data['files'], color='steelblue', label='Файлов')
+    ax_count.set_ylabel('Количество файлов')
+    ax_count.set_xticks(list(positions))
+    ax_count.set_xticklabels(data['labels'], rotation=45, ha='right')
+    ax_count.set_xlabel('Размер файла (от)')
+    ax_bytes = ax_count.twinx()
+    ax_bytes.plot(list(positions), data['sizes_gb'], 'o-', color='indianred', label='Объем, ГБ')
+    ax_bytes.set_ylabel('Объем (ГБ)')
+    ax_bytes.grid(False)
+    plt.title('Распределение всех файлов по размеру (корзины по степеням двойки)')
+    fig.legend(loc='upper left', bbox_to_anchor=(0.08, 0.92))
+    plt.tight_layout()
+    plt.savefig(path, dpi=150)
+    plt.close()
+
+def _plot_population_age(plt, data, path):
+    fig, (ax_count, ax_size) = plt.subplots(1, 2, figsize=(16, 7))
+    ax_count.bar(data['labels'], data['files'], color='seagreen')
+    ax_count.set_ylabel('Количество файлов')
+    ax_size.bar(data['labels'], data['sizes_gb'], color='purple')
+    ax_size.set_ylabel('Объем (ГБ)')
+    for ax in (ax_count, ax_size):
+        ax.tick_params(axis='x', rotation=45)
+    fig.suptitle('Возраст всех файлов по времени последнего изменения')
+    plt.tight_layout()
+    plt.savefig(path, dpi=150)
+    plt.close()
+
+# Графики анализа: имя (оно же имя файла .png) -> (подготовка данных, построение).
+# Подготовка выполняется в основном процессе и возвращает только то, что
+# нужно графику (None - график не строится), построение - в пуле процессов
+CHARTS = {
+    'top_files': (_chart_top_files, _plot_top_files),
+    'top_dirs': (_chart_top_dirs, _plot_top_dirs),
+    'file_types': (_chart_file_types, _plot_file_types),
+    'cumulative_size': (_chart_cumulative_size, _plot_cumulative_size),
+    'creation_timeline': (_chart_creation_timeline, _plot_creation_timeline),
+    'files_vs_dirs': (_chart_files_vs_dirs, _plot_files_vs_dirs),
+    'size_heatmap': (_chart_size_heatmap, _plot_size_heatmap),
+}
+
+_PLOTTERS = {name: plot for name, (prepare, plot) in CHARTS.items()}
+_PLOTTERS['duplicates'] = _plot_duplicates
+_PLOTTERS['growth'] = _plot_growth
+_PLOTTERS['population_types'] = _plot_population_types
+_PLOTTERS['population_sizes'] = _plot_population_sizes
+_PLOTTERS['population_age'] = _plot_population_age
+
+def _pyplot():
+    """Импортирует matplotlib с неинтерактивным бэкендом Agg"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    
+    # Используем библиотеку для улучшения визуализации
+    matplotlib.rcParams['font.family'] = 'DejaVu Sans'
+    plt.style.use('ggplot')
+    return plt
+
+def _render_chart(task):
+    """Строит один график; выполняется в процессе пула"""
+    name, data, path = task
+    _PLOTTERS[name](_pyplot(), data, path)
+    return path
+
+def render_charts(summary, output_dir, top_n=20, charts=None, jobs=None):
+    """Строит графики по заранее посчитанным агрегатам.
+    
+    charts - имена графиков из CHARTS (None - все); jobs - число процессов
+    для построения (None - по числу процессоров, 1 - в текущем процессе).
+    """
+    tasks = []
+    for name, (prepare, plot) in CHARTS.items():
+        if charts is not None and name not in charts:
+            continue
+        data = prepare(summary, top_n)
+        if data is not None:
+            tasks.append((name, data, os.path.join(output_dir, f"{name}.png")))
+    
+    _render_tasks(tasks, jobs)
+    return [name for name, data, path in tasks]
+
+def _render_tasks(tasks, jobs=None):
+    """Строит графики (имя, данные, путь) в пуле из jobs процессов"""
+    jobs = min(jobs or os.cpu_count() or 1, len(tasks))
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            list(executor.map(_render_chart, tasks))
+    else:
+        for task in tasks:
+            _render_chart(task)
+
+def analyze_disk_data(input_file, output_dir, top_n=20, chunk_size=0, charts=None, jobs=None):
+    """Анализирует данные сканирования диска и создает визуализации
+    
+    При chunk_size > 0 файл читается порциями по chunk_size строк и все
+    агрегаты считаются за один проход без загрузки данных целиком.
+    charts и jobs - выбор графиков и число процессов (см. render_charts).
+    """
+    # Создаем директорию для результатов, если ее нет
+    os.makedirs(output_dir, exist_ok=True)
+    
+    # Загрузка данных
+    print(f"Загрузка данных из {input_file}...")
+    if chunk_size > 0:
+        summary = summarize_stream(input_file, top_n, chunk_size)
+    else:
+        summary = summarize_dataframe(load_scan_data(input_file), top_n)
+    
+    print(f"Загружено {summary['files_count'] + summary['dirs_count']} записей")
+    print(f"Файлов: {summary['files_count']}, Директорий: {summary['dirs_count']}")
+    
+    rendered = render_charts(summary, output_dir, top_n, charts, jobs)
+    print(f"Построено графиков: {len(rendered)}")
     
     # Генерация отчета
-    generate_text_report(df, output_dir, top_n)
+    write_text_report(summary, output_dir, top_n)
     
     print(f"Анализ завершен. Результаты сохранены в: {output_dir}")
 
+def analyze_duplicates(duplicates_file, output_dir, top_n=20):
+    """Строит график групп дубликатов из отчета duplicate_finder.py"""
+    import pandas as pd
+    
+    os.makedirs(output_dir, exist_ok=True)
+    
+    dups = pd.read_csv(duplicates_file)
+    groups = dups.groupby('GroupId').agg(
+        name=('Name', 'first'),
+        size=('Size', 'first'),
+        count=('Count', 'first'),
+        wasted=('WastedBytes', 'first')
+    )
+    total_wasted_gb = groups['wasted'].sum() / (1024 ** 3)
+    print(f"Групп дубликатов: {len(groups)}, лишнее место: {total_wasted_gb:.2f} ГБ")
+    
+    top_groups = groups.nlargest(top_n, 'wasted')
+    data = {
+        'labels': list(top_groups['name'] + " (x" + top_groups['count'].astype(str) + ")"),
+        'wasted_mb': list(top_groups['wasted'] / MB),
+        'top_n': top_n,
+        'total_wasted_gb': total_wasted_gb,
+    }
+    _render_chart(('duplicates', data, os.path.join(output_dir, 'duplicates.png')))
+
+def analyze_diff(diff_file, output_dir, top_n=20):
+    """Строит график роста директорий из отчета scan_diff.py"""
+    import pandas as pd
+    
+    os.makedirs(output_dir, exist_ok=True)
+    
+    diff = pd.read_csv(diff_file, keep_default_na=False)
+    dirs = diff[diff['Type'] == 'dir']
+    # Строка корня (пустой Path) содержит общий прирост
+    root = dirs[dirs['Path'] == '']
+    total_delta_gb = root['Delta'].sum() / (1024 ** 3)
+    print(f"Изменений: {len(diff)}, общий прирост: {total_delta_gb:+.2f} ГБ")
+    
+    top_dirs = dirs[(dirs['Path'] != '') & (dirs['Delta'] > 0)].nlargest(top_n, 'Delta')
+    data = {
+        'labels': [os.path.join(path, name) for path, name in zip(top_dirs['Path'], top_dirs['Name'])],
+        'delta_mb': list(top_dirs['Delta'] / MB),
+        'statuses': list(top_dirs['Status']),
+        'top_n': top_n,
+        'total_delta_gb': total_delta_gb,
+    }
+    _render_chart(('growth', data, os.path.join(output_dir, 'growth.png')))
+
+def analyze_file_stats(stats_file, output_dir, top_n=20, jobs=None):
+    """Строит графики по статистике всех файлов (<output>.stats.json сканера с --file-stats).
+    
+    В отличие от графиков по отчету, здесь учтены и файлы меньше --min-size.
+    """
+    import json
+    
+    os.makedirs(output_dir, exist_ok=True)
+    
+    with open(stats_file, encoding='utf-8') as f:
+        stats = json.load(f)
+    print(f"Статистика по всем файлам: {stats['files']} файлов, {stats['bytes'] / 1024**3:.2f} ГБ "
+          f"(сканирование {stats['scan_time']})")
+    
+    extensions = stats['extensions'][:top_n]
+    size_buckets = stats['size_buckets']
+    age_buckets = stats['age_buckets']
+    tasks = [
+        ('population_types', {
+            'labels': [item['extension'] or 'без расширения' for item in extensions],
+            'sizes_gb': [item['bytes'] / 1024**3 for item in extensions],
+            'files': [item['files'] for item in extensions],
+            'top_n': top_n,
+            'total_files': stats['files'],
+        }),
+        ('population_sizes', {
+            'labels': [_format_bytes(bucket['min']) for bucket in size_buckets],
+            'files': [bucket['files'] for bucket in size_buckets],
+            'sizes_gb': [bucket['bytes'] / 1024**3 for bucket in size_buckets],
+        }),
+        ('population_age', {
+            'labels': [bucket['label'] for bucket in age_buckets],
+            'files': [bucket['files'] for bucket in age_buckets],
+            'sizes_gb': [bucket['bytes'] / 1024**3 for bucket in age_buckets],
+        }),
+    ]
+    _render_tasks([(name, data, os.path.join(output_dir, f"{name}.png")) for name, data in tasks], jobs)
+    print(f"Построено графиков по всем файлам: {len(tasks)}")
+    
+    if stats['extensions']:
+        top_by_count = max(stats['extensions'], key=lambda item: item['files'])
+        print(f"Больше всего файлов с расширением '{top_by_count['extension'] or 'без расширения'}': "
+              f"{top_by_count['files']}")
+
 def generate_text_report(df, output_dir, top_n=10):
     """Генерирует текстовый отчет с основной статистикой"""
+    write_text_report(summarize_dataframe(df, top_n), output_dir, top_n)
+
+def write_text_report(summary, output_dir, top_n=10):
+    """Записывает текстовый отчет по заранее посчитанным агрегатам"""
     report_path = os.path.join(output_dir, 'disk_report.txt')
     
-    files_df = df[df['Type'] == 'file']
-    dirs_df = df[df['Type'] == 'dir']
-    
     with open(report_path, 'w', encoding='utf-8') as report:
         report.write("="*80 + "\n")
         report.write(f"АНАЛИТИЧЕСКИЙ ОТЧЕТ ПО ИСПОЛЬЗОВАНИЮ ДИСКОВОГО ПРОСТРАНСТВА\n")
@@ -191,13 +688,17 @@ def generate_text_report(df, output_dir, top_n=10):
         report.write("="*80 + "\n\n")
         
         # Общая статистика
-        total_size_gb = df['Size'].sum() / (1024 ** 3)
-        avg_file_size_mb = files_df['Size'].mean() / (1024 ** 2)
-        max_file_size_mb = files_df['Size'].max() / (1024 ** 2)
+        total_size_gb = summary['total_size'] / (1024 ** 3)
+        files_count = summary['files_count']
+        avg_file_size_mb = summary['files_size'] / files_count / (1024 ** 2) if files_count else float('nan')
+        max_file_size_mb = summary['max_file_size'] / (1024 ** 2) if files_count else float('nan')
         
         report.write(f"Общий размер просканированных данных: {total_size_gb:.2f} ГБ\n")
-        report.write(f"Количество файлов: {len(files_df)}\n")
-        report.write(f"Количество директорий: {len(dirs_df)}\n")
+        if summary['files_disk_size'] is not None:
+            files_disk_size_gb = summary['files_disk_size'] / (1024 ** 3)
+            report.write(f"Занято файлами на диске: {files_disk_size_gb:.2f} ГБ\n")
+        report.write(f"Количество файлов: {files_count}\n")
+        report.write(f"Количество директорий: {summary['dirs_count']}\n")
         report.write(f"Средний размер файла: {avg_file_size_mb:.2f} МБ\n")
         report.write(f"Максимальный размер файла: {max_file_size_mb:.2f} МБ\n\n")
         
@@ -205,7 +706,7 @@ def generate_text_report(df, output_dir, top_n=10):
         report.write("="*80 + "\n")
         report.write(f"ТОП-{top_n} ФАЙЛОВ ПО РАЗМЕРУ:\n")
         report.write("="*80 + "\n")
-        top_files = files_df.nlargest(top_n, 'Size')
+        top_files = summary['top_files'].head(top_n)
         for i, (_, row) in enumerate(top_files.iterrows(), 1):
             size_mb = row['Size'] / (1024 ** 2)
             report.write(f"{i}. {row['Path']}/{row['Name']} - {size_mb:.2f} МБ\n")
@@ -214,7 +715,7 @@ def generate_text_report(df, output_dir, top_n=10):
         report.write("\n" + "="*80 + "\n")
         report.write(f"ТОП-{top_n} ДИРЕКТОРИЙ ПО РАЗМЕРУ:\n")
         report.write("="*80 + "\n")
-        top_dirs = dirs_df.nlargest(top_n, 'Size')
+        top_dirs = summary['top_dirs'].head(top_n)
         for i, (_, row) in enumerate(top_dirs.iterrows(), 1):
             size_mb = row['Size'] / (1024 ** 2)
             report.write(f"{i}. {row['Path']}/{row['Name']} - {size_mb:.2f} МБ\n")
@@ -223,11 +724,8 @@ def generate_text_report(df, output_dir, top_n=10):
         report.write("\n" + "="*80 + "\n")
         report.write("РАСПРЕДЕЛЕНИЕ ПО ТИПАМ ФАЙЛОВ:\n")
         report.write("="*80 + "\n")
-        ext_stats = files_df.groupby('Extension').agg(
-            count=('Size', 'size'),
-            total_size=('Size', 'sum'),
-            avg_size=('Size', 'mean')
-        ).sort_values('total_size', ascending=False).head(15)
+        ext_stats = summary['ext_stats'].sort_values('total_size', ascending=False).head(15).copy()
+        ext_stats['avg_size'] = ext_stats['total_size'] / ext_stats['count']
         
         ext_stats['total_size_gb'] = ext_stats['total_size'] / (1024 ** 3)
         ext_stats['avg_size_mb'] = ext_stats['avg_size'] / (1024 ** 2)
@@ -238,16 +736,38 @@ def generate_text_report(df, output_dir, top_n=10):
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Анализ данных сканирования дискового пространства')
-    parser.add_argument('--input', required=True, help='Входной CSV-файл с результатами сканирования')
+    parser.add_argument('--input',
+                        help='Входной файл с результатами сканирования (CSV, CSV.gz, CSV.zst или Parquet)')
+    parser.add_argument('--duplicates', help='Отчет duplicate_finder.py для построения графика дубликатов')
+    parser.add_argument('--diff', help='Отчет scan_diff.py для построения графика роста директорий')
+    parser.add_argument('--file-stats',
+                        help='Статистика по всем файлам (<output>.stats.json сканера с --file-stats) для графиков population_*')
     parser.add_argument('--output-dir', default='disk_analysis', help='Директория для сохранения результатов')
     parser.add_argument('--top-n', type=int, default=20, help='Количество элементов в топах')
+    parser.add_argument('--chunk-size', type=int, default=0,
+                        help='Потоковый режим: читать файл порциями по N строк (0 - загрузить целиком)')
+    parser.add_argument('--charts', nargs='*', choices=list(CHARTS), default=None,
+                        help='Строить только указанные графики (без значений - ни одного)')
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='Число процессов для построения графиков (по умолчанию - по числу процессоров)')
     
     args = parser.parse_args()
+    if not args.input and not args.duplicates and not args.diff and not args.file_stats:
+        parser.error("укажите --input, --duplicates, --diff и/или --file-stats")
     
     print(f"Запуск анализа данных диска")
     print(f"Входной файл: {args.input}")
     print(f"Выходная директория: {args.output_dir}")
     print(f"Количество элементов в топах: {args.top_n}")
+    if args.chunk_size > 0:
+        print(f"Потоковый режим, размер порции: {args.chunk_size} строк")
     print("="*80)
     
-    analyze_disk_data(args.input, args.output_dir, args.top_n)
\ No newline at end of file
+    if args.input:
+        analyze_disk_data(args.input, args.output_dir, args.top_n, args.chunk_size, args.charts, args.jobs)
+    if args.duplicates:
+        analyze_duplicates(args.duplicates, args.output_dir, args.top_n)
+    if args.diff:
+        analyze_diff(args.diff, args.output_dir, args.top_n)
+    if args.file_stats:
+        analyze_file_stats(args.file_stats, args.output_dir, args.top_n, args.jobs)
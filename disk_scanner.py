@@ -1,14 +1,36 @@
 import os
-import csv
+import cProfile
+import pstats
 import time
 import argparse
 import traceback
 import json
-from collections import defaultdict
+import queue
+import threading
+from collections import deque
+from contextlib import nullcontext
+from functools import partial
+
+from dir_totals import DirTotals
+from file_stats import FileStats
+from inode_set import InodeSet
+from scan_filter import ScanFilter
+from scan_metrics import MetricsWriter, ScanMetrics
+from scan_async import AdaptiveLimiter, AsyncTreeReader
+from scan_checkpoint import CheckpointJournal, decode_record, encode_record, load_checkpoint, save_checkpoint
+from scan_errors import ERROR_LOG_MODES, ErrorLog
+from scan_output import COMPRESSIONS, OUTPUT_FORMATS, detect_compression, open_output
+from scan_snapshot import ScanSnapshot
+from scan_top import ScanTop
+from tree_index import TreeIndexBuilder
 
 # Путь к файлу конфигурации по умолчанию
 DEFAULT_CONFIG_PATH = "disk_scanner_config.json"
 
+# Ключи конфигурации с правилами исключения (см. scan_filter)
+EXCLUDE_RULE_KEYS = ('exclude', 'exclude_regex', 'one_file_system', 'max_depth',
+                     'include_extensions', 'exclude_extensions')
+
 def load_config(config_path):
     """Загружает конфигурацию из JSON-файла"""
     default_config = {
@@ -18,7 +40,39 @@ def load_config(config_path):
         "min_size": 50,
         "log_interval_files": 500,
         "log_interval_dirs": 50,
-        "flush_interval": 1000
+        "flush_interval": 1000,
+        "flush_bytes": 8 * 1024 * 1024,
+        "flush_seconds": 5,
+        "timestamp_format": "text",
+        "workers": 1,
+        "async_concurrency": 0,
+        "incremental": False,
+        "snapshot": "",
+        "metrics_file": "",
+        "metrics_interval": 10,
+        "tree_index": False,
+        "tree_index_file": "",
+        "top_n": 0,
+        "top_file": "",
+        "top_interval": 60,
+        "report_files": True,
+        "file_stats": False,
+        "file_stats_file": "",
+        "output_format": "auto",
+        "compression": "auto",
+        "compression_level": 0,
+        "error_log_mode": "full",
+        "error_log_samples": 3,
+        "error_log_sample_interval": 60,
+        "dedupe_hardlinks": False,
+        "checkpoint": "",
+        "checkpoint_interval": 60,
+        "exclude": [],
+        "exclude_regex": [],
+        "one_file_system": False,
+        "max_depth": None,
+        "include_extensions": [],
+        "exclude_extensions": []
     }
     
     if os.path.exists(config_path):
@@ -42,11 +96,420 @@ def save_config(config_path, config):
     except Exception as e:
         print(f"Ошибка сохранения конфигурации: {str(e)}")
 
-def scan_disk(start_path, output_file, error_log_file, min_size_mb, log_interval_files, log_interval_dirs, flush_interval):
-    """Рекурсивно сканирует дисковое пространство с фильтрацией по размеру"""
+def list_dir(root, scan_filter=None, metrics=None, stat_entries=None):
+    """Читает одну директорию через os.scandir.
+
+    Возвращает кортеж (files, subdirs, errors):
+    files   - список пар (имя, os.stat_result) для файлов директории;
+    subdirs - полные пути поддиректорий, в которые нужно спускаться;
+    errors  - список пар (путь, исключение) для ошибок листинга и stat.
+
+    Каждый файл stat'ится ровно один раз через DirEntry.stat(), размер и
+    даты берутся из одного результата. Символические ссылки на директории,
+    как и в os.walk(followlinks=False), не обходятся.
+    scan_filter - правила исключения (scan_filter.ScanFilter): исключенные
+    поддиректории не попадают в subdirs, и их поддеревья не читаются.
+    metrics - накопитель scan_metrics.ScanMetrics: время листинга, stat и
+    фильтрации и задержка каждого stat (без него время не измеряется).
+    stat_entries - функция, которая stat'ит список DirEntry файлов разом
+    (например, параллельно) и возвращает пары (stat_result или OSError,
+    задержка в секундах); без нее файлы stat'ятся по одному при листинге.
+    """
+    files = []
+    subdirs = []
+    errors = []
+    clock = time.perf_counter
+    if metrics is not None:
+        started = clock()
+        stat_latencies = []
+        filter_seconds = 0.0
+    file_entries = []
+    try:
+        with os.scandir(root) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                
+                if is_dir:
+                    try:
+                        is_symlink = entry.is_symlink()
+                    except OSError:
+                        is_symlink = False
+                    if is_symlink:
+                        continue
+                    if scan_filter is not None:
+                        if metrics is not None:
+                            filter_started = clock()
+                            excluded = scan_filter.exclude_dir(entry.path, entry.name)
+                            filter_seconds += clock() - filter_started
+                        else:
+                            excluded = scan_filter.exclude_dir(entry.path, entry.name)
+                        if excluded:
+                            continue
+                    subdirs.append(entry.path)
+                    continue
+                
+                if stat_entries is not None:
+                    file_entries.append(entry)
+                    continue
+                try:
+                    if metrics is not None:
+                        stat_started = clock()
+                        st = entry.stat()
+                        stat_latencies.append(clock() - stat_started)
+                    else:
+                        st = entry.stat()
+                except OSError as e:
+                    errors.append((entry.path, e))
+                    continue
+                if scan_filter is not None:
+                    if metrics is not None:
+                        filter_started = clock()
+                        excluded = scan_filter.exclude_file(root, entry.name, st)
+                        filter_seconds += clock() - filter_started
+                    else:
+                        excluded = scan_filter.exclude_file(root, entry.name, st)
+                    if excluded:
+                        continue
+                files.append((entry.name, st))
+    except OSError as e:
+        errors.append((root, e))
+    
+    stat_seconds = None
+    if file_entries:
+        if metrics is not None:
+            # stat'ы идут параллельно: в фазу stat идет время ожидания, а не сумма задержек
+            stat_started = clock()
+            stat_results = stat_entries(file_entries)
+            stat_seconds = clock() - stat_started
+        else:
+            stat_results = stat_entries(file_entries)
+        for entry, (st, latency) in zip(file_entries, stat_results):
+            if metrics is not None:
+                stat_latencies.append(latency)
+            if isinstance(st, OSError):
+                errors.append((entry.path, st))
+                continue
+            if scan_filter is not None:
+                if metrics is not None:
+                    filter_started = clock()
+                    excluded = scan_filter.exclude_file(root, entry.name, st)
+                    filter_seconds += clock() - filter_started
+                else:
+                    excluded = scan_filter.exclude_file(root, entry.name, st)
+                if excluded:
+                    continue
+            files.append((entry.name, st))
+    if metrics is not None:
+        metrics.record_listing(root, clock() - started, stat_latencies, filter_seconds, stat_seconds)
+    return files, subdirs, errors
+
+def list_dir_incremental(root, snapshot, scan_filter=None, metrics=None, stat_entries=None):
+    """Вариант list_dir для инкрементального режима.
+
+    Если inode и mtime директории совпадают со снимком, файлы и поддиректории
+    берутся из снимка без листинга и stat. Успешно прочитанные директории
+    запоминаются для нового снимка. В снимке хранится полный листинг, а
+    правила исключения применяются после, поэтому их можно менять между
+    запусками.
+    """
+    try:
+        dir_stat = os.stat(root)
+    except OSError:
+        return list_dir(root, scan_filter, metrics, stat_entries)
+    
+    cached = snapshot.lookup(root, dir_stat)
+    if cached is not None:
+        files, subdirs = cached
+        errors = []
+    else:
+        files, subdirs, errors = list_dir(root, metrics=metrics, stat_entries=stat_entries)
+        if not errors:
+            snapshot.remember(root, dir_stat, files, subdirs)
+    if scan_filter is not None:
+        files, subdirs = scan_filter.apply(root, files, subdirs)
+    return files, subdirs, errors
+
+def scan_tree(start_path, lister=list_dir, pending=None, resume=None):
+    """Обходит дерево каталогов через os.scandir снизу вверх (дети раньше родителя).
+
+    Для каждой директории возвращает кортеж (root, files, subdirs, errors),
+    где files, subdirs и errors имеют тот же смысл, что и в list_dir.
+    lister - функция чтения одной директории с интерфейсом list_dir.
+    pending - словарь, в котором обход поддерживает прочитанные, но еще не
+    возвращенные директории (путь -> запись); нужен для контрольных точек.
+    resume - пара (records, done) из контрольной точки: прочитанные, но не
+    возвращенные записи в порядке чтения и множество уже обработанных
+    поддиректорий. Порядок возврата совпадает с непрерывным обходом.
+    """
+    if pending is None:
+        pending = {}
+    
+    # Стек: (путь, запись директории или None, если она еще не прочитана)
+    if resume is None:
+        stack = [(start_path, None)]
+    else:
+        records, done = resume
+        listed = {record[0] for record in records}
+        stack = []
+        for record in records:
+            pending[record[0]] = record
+            stack.append((record[0], record))
+            for dir_path in reversed(record[2]):
+                if dir_path not in done and dir_path not in listed:
+                    stack.append((dir_path, None))
+    
+    while stack:
+        root, record = stack.pop()
+        if record is not None:
+            del pending[root]
+            yield record
+            continue
+        
+        files, subdirs, errors = lister(root)
+        
+        # Директория возвращается после всех своих поддиректорий
+        record = (root, files, subdirs, errors)
+        pending[root] = record
+        stack.append((root, record))
+        for dir_path in reversed(subdirs):
+            stack.append((dir_path, None))
+
+def _scan_tree_ordered(start_path, start_reading, pending=None, resume=None):
+    """Упорядочивает снизу вверх директории, которые читаются параллельно.
+
+    start_reading(frontier, results) запускает чтение директорий frontier и
+    их поддеревьев: запись (root, files, subdirs, errors) каждой прочитанной
+    директории кладется в очередь results до того, как ее поддиректории
+    поступают в чтение. Возвращает функцию stop(wait), останавливающую чтение.
+    Директория возвращается только после того, как возвращены все ее
+    поддиректории. pending и resume - как в scan_tree; директории,
+    прочитанные, но еще не принятые вызывающим потоком, после возобновления
+    читаются заново.
+    """
+    if pending is None:
+        pending = {}
+    
+    # Директории, ожидающие завершения поддиректорий: путь -> [осталось, запись]
+    waiting = {}
+    parent_of = {}
+    
+    def complete(root):
+        # Директория завершена: поднимаемся к родителям, которые тоже завершились
+        parent = parent_of.pop(root, None)
+        while parent is not None:
+            entry = waiting[parent]
+            entry[0] -= 1
+            if entry[0]:
+                break
+            del waiting[parent]
+            del pending[parent]
+            yield entry[1]
+            parent = parent_of.pop(parent, None)
+    
+    def add_waiting(record, subdirs):
+        waiting[record[0]] = [len(subdirs), record]
+        pending[record[0]] = record
+        for dir_path in subdirs:
+            parent_of[dir_path] = record[0]
+    
+    frontier = [start_path]
+    ready = []
+    if resume is not None:
+        records, done = resume
+        listed = {record[0] for record in records}
+        frontier = []
+        for record in records:
+            remaining = [dir_path for dir_path in record[2] if dir_path not in done]
+            add_waiting(record, remaining)
+            frontier.extend(dir_path for dir_path in remaining if dir_path not in listed)
+        # Записи, у которых все поддиректории уже обработаны (сначала дети)
+        for record in reversed(records):
+            if waiting.get(record[0], [None])[0] == 0:
+                ready.append(record[0])
+    
+    results = queue.Queue()
+    stop = start_reading(frontier, results)
+    
+    outstanding = len(frontier)
+    finished = False
+    try:
+        for root in ready:
+            if root in waiting:
+                entry = waiting.pop(root)
+                del pending[root]
+                yield entry[1]
+                yield from complete(root)
+        
+        while outstanding:
+            record = results.get()
+            root, files, subdirs, errors = record
+            outstanding += len(subdirs) - 1
+            
+            if subdirs:
+                add_waiting(record, subdirs)
+                continue
+            
+            yield record
+            yield from complete(root)
+        finished = True
+    finally:
+        # При прерванном обходе не ждем потоки, занятые чтением
+        stop(finished)
+
+def scan_tree_parallel(start_path, workers, lister=list_dir, pending=None, resume=None):
+    """Многопоточный вариант scan_tree.
+
+    Пул потоков читает и stat'ит директории параллельно. У каждого потока своя
+    очередь (deque): новые поддиректории он кладет к себе и забирает с того же
+    конца (обход в глубину), а простаивающий поток крадет работу с противоположного
+    конца чужих очередей. Результаты через общую очередь приходят в вызывающий
+    поток, который упорядочивает их снизу вверх (_scan_tree_ordered).
+    pending и resume - как в scan_tree.
+    """
+    
+    def start_reading(frontier, results):
+        deques = [deque() for _ in range(workers)]
+        deques[0].extend(reversed(frontier))
+        work_ready = threading.Condition()
+        stopped = threading.Event()
+        
+        def take_work(index):
+            # Сначала своя очередь (LIFO), затем кража у соседей (FIFO)
+            try:
+                return deques[index].pop()
+            except IndexError:
+                pass
+            for offset in range(1, workers):
+                try:
+                    return deques[(index + offset) % workers].popleft()
+                except IndexError:
+                    continue
+            return None
+        
+        def worker(index):
+            while not stopped.is_set():
+                root = take_work(index)
+                if root is None:
+                    with work_ready:
+                        while not stopped.is_set() and not any(deques):
+                            work_ready.wait()
+                    continue
+                
+                try:
+                    files, subdirs, errors = lister(root)
+                except Exception as e:
+                    files, subdirs, errors = [], [], [(root, e)]
+                # Результат отправляется до публикации поддиректорий: иначе другой
+                # поток может украсть и вернуть поддиректорию раньше родителя
+                results.put((root, files, subdirs, errors))
+                if subdirs:
+                    deques[index].extend(subdirs)
+                    with work_ready:
+                        work_ready.notify_all()
+        
+        threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(workers)]
+        for thread in threads:
+            thread.start()
+        
+        def stop(wait):
+            stopped.set()
+            with work_ready:
+                work_ready.notify_all()
+            if wait:
+                for thread in threads:
+                    thread.join()
+        return stop
+    
+    return _scan_tree_ordered(start_path, start_reading, pending, resume)
+
+def scan_tree_async(start_path, concurrency, lister=list_dir, pending=None, resume=None, limiter=None):
+    """Вариант scan_tree для сетевых файловых систем с большой задержкой.
+
+    Директории читаются в цикле событий asyncio (scan_async.AsyncTreeReader):
+    до concurrency директорий одновременно, а stat файлов отправляются
+    параллельно с адаптивным пределом, который снижается при росте задержки.
+    lister должен принимать stat_entries (как list_dir). limiter -
+    scan_async.AdaptiveLimiter, если вызывающему нужна его статистика.
+    pending и resume - как в scan_tree.
+    """
+    reader = AsyncTreeReader(lister, concurrency, limiter)
+    return _scan_tree_ordered(start_path, reader.start, pending, resume)
+
+def file_disk_size(st):
+    """Место, занятое файлом на диске (st_blocks * 512); без st_blocks - видимый размер"""
+    blocks = getattr(st, 'st_blocks', None)
+    if blocks is None:
+        return st.st_size
+    return blocks * 512
+
+def scan_disk(start_path, output_file, error_log_file, min_size_mb, log_interval_files, log_interval_dirs, flush_interval,
+              workers=1, incremental=False, snapshot_file=None, output_format='auto', dedupe_hardlinks=False,
+              checkpoint_file=None, checkpoint_interval=60, resume=False, flush_bytes=8 * 1024 * 1024,
+              flush_seconds=5, timestamp_format='text', exclude_rules=None, tree_index=False,
+              tree_index_file=None, metrics_file=None, metrics_interval=10, async_concurrency=0,
+              top_n=0, top_file=None, top_interval=60, report_files=True, file_stats=False,
+              file_stats_file=None, compression='auto', compression_level=None, error_log_mode='full',
+              error_log_samples=3, error_log_sample_interval=60):
+    """Рекурсивно сканирует дисковое пространство с фильтрацией по размеру
+
+    При workers > 1 директории читаются пулом потоков (scan_tree_parallel),
+    а запись отчета и подсчет размеров остаются в вызывающем потоке.
+    При async_concurrency > 0 (вместо workers) директории читаются в цикле
+    событий asyncio (scan_tree_async): для сетевых ФС с большой задержкой
+    stat'ы отправляются параллельно с адаптивным пределом не выше
+    async_concurrency.
+    При incremental=True неизмененные директории берутся из снимка
+    snapshot_file (по умолчанию - рядом с output_file), а по окончании
+    сканирования снимок обновляется.
+    output_format - формат отчета из scan_output.OUTPUT_FORMATS или 'auto'
+    (по расширению output_file).
+    При dedupe_hardlinks=True файл с несколькими жесткими ссылками учитывается
+    и попадает в отчет один раз - по первой найденной ссылке, как в du.
+    Каждые checkpoint_interval секунд (0 - отключено) состояние сохраняется
+    в checkpoint_file (по умолчанию <output_file>.checkpoint); при resume=True
+    сканирование продолжается с последней контрольной точки, и отчет
+    получается таким же, как при непрерывном сканировании.
+    Учтенные inode и индекс дерева дописываются в <checkpoint_file>.journal
+    только изменениями за интервал, поэтому контрольная точка не дорожает
+    с объемом просканированного.
+    Строки отчета пишутся фоновым потоком пакетами по flush_interval строк;
+    файл сбрасывается на диск после flush_bytes байт или flush_seconds секунд
+    (flush_seconds <= 0 - только по объему).
+    timestamp_format - 'text' (локальное время) или 'epoch' (секунды, только CSV).
+    exclude_rules - словарь правил исключения с ключами конфигурации
+    (см. scan_filter): исключенные поддеревья не читаются.
+    При tree_index=True по ходу обхода строится индекс дерева директорий
+    (tree_index.py) и сохраняется в tree_index_file (по умолчанию
+    <output_file>.tree).
+    Если задан metrics_file, время по фазам, задержки stat и скорость по
+    директориям верхнего уровня (scan_metrics.py) каждые metrics_interval
+    секунд дописываются в этот файл строкой JSON.
+    При top_n > 0 (по умолчанию выключено) во время обхода ведется топ-N самых больших файлов и
+    директорий (scan_top.py) по всем файлам, независимо от min_size_mb:
+    крупнейший файл виден в прогрессе, а топы каждые top_interval секунд
+    (0 - только в конце) записываются в top_file (по умолчанию
+    <output_file>.top.json). При report_files=False строки файлов в отчет
+    не пишутся - только директории.
+    При file_stats=True (по умолчанию выключено) по всем файлам (file_stats.py) собирается статистика
+    по расширениям, размерам и возрасту и сохраняется в file_stats_file (по
+    умолчанию <output_file>.stats.json) для disk_analyzer.py --file-stats.
+    compression - потоковое сжатие CSV-отчета фоновым потоком записи
+    (scan_output.COMPRESSIONS или 'auto' - по расширению output_file:
+    .gz, .zst) с уровнем compression_level (None - по умолчанию).
+    error_log_mode - запись ошибок (scan_errors.py): 'full' (по умолчанию) -
+    каждая ошибка с traceback, 'aggregate' - счетчики по директориям и типам ошибок,
+    traceback только для первых error_log_samples ошибок каждого типа и
+    затем не чаще раза в error_log_sample_interval секунд.
+    """
     # Конвертируем МБ в байты
     min_size_bytes = min_size_mb * 1024 * 1024
     
+    if compression == 'auto':
+        compression = detect_compression(output_file)
+    
     # Статистика для прогресса
     stats = {
         'files': 0, 
@@ -55,51 +518,192 @@ def scan_disk(start_path, output_file, error_log_file, min_size_mb, log_interval
         'dirs': 0, 
         'scan_errors': 0, 
         'write_errors': 0,
+        'hardlinks_skipped': 0,
         'start_time': time.time()
     }
     
-    # Словарь для размеров директорий (полный путь -> размер)
-    dir_sizes = defaultdict(int)
+    # Итоги обработанных директорий, которые еще не забрал родитель
+    dir_totals = DirTotals()
+    
+    # Правила исключения, скомпилированные один раз на все сканирование
+    scan_filter = ScanFilter.from_config(start_path, exclude_rules or {})
+    filter_rules = scan_filter.rules if scan_filter is not None else None
+    
+    # Метрики по фазам сканирования
+    metrics = ScanMetrics(start_path) if metrics_file else None
+    clock = time.perf_counter
+    
+    # Адаптивный предел параллельных stat для асинхронного режима
+    async_limiter = AdaptiveLimiter(async_concurrency) if async_concurrency > 0 else None
+    
+    # Топ-N файлов и директорий, который ведется во время обхода
+    scan_top = ScanTop(top_n) if top_n > 0 else None
+    top_path = top_file or output_file + ".top.json"
+    
+    # Статистика по всем файлам, включая не попавшие в отчет
+    all_files_stats = FileStats() if file_stats else None
+    
+    # Индекс дерева директорий для быстрых запросов
+    tree_builder = TreeIndexBuilder() if tree_index else None
+    
+    # Уже учтенные inode файлов с несколькими жесткими ссылками
+    seen_inodes = InodeSet() if dedupe_hardlinks else None
+    
+    # Прочитанные, но еще не записанные в отчет директории (для контрольных точек)
+    pending = {}
+    checkpoint_path = checkpoint_file or output_file + ".checkpoint"
+    # Журнал растущих структур (inode, индекс дерева) и смещение, до которого он согласован
+    journal_path = checkpoint_path + ".journal"
+    journal_offset = 0
+    resume_state = None
+    resume_offset = None
+    error_log_state = None
+    error_log_offset = None
+    if resume and not os.path.exists(checkpoint_path):
+        print(f"Контрольная точка {checkpoint_path} не найдена, сканирование начинается заново")
+        resume = False
+    if not resume:
+        # Отчет перезаписывается с начала: старая контрольная точка к нему не относится
+        for path in (checkpoint_path, journal_path):
+            if os.path.exists(path):
+                os.remove(path)
+    if resume:
+        state = load_checkpoint(checkpoint_path)
+        if (state['start_path'], state['min_size_mb'], state['dedupe_hardlinks'],
+                state.get('timestamp_format', 'text'), state.get('filter_rules'),
+                state.get('tree_index') is not None, state.get('compression', 'none'),
+                state.get('report_files', True), state.get('incremental', False)) != \
+                (start_path, min_size_mb, dedupe_hardlinks, timestamp_format, filter_rules, tree_index,
+                 compression, report_files, incremental):
+            raise ValueError(f"Контрольная точка {checkpoint_path} создана с другими параметрами сканирования")
+        stats.update(state['stats'])
+        stats['start_time'] = time.time() - state['elapsed']
+        dir_totals = DirTotals.from_state(state['dir_totals'])
+        journal_offset = state['journal_offset']
+        journal = CheckpointJournal.read(journal_path, journal_offset)
+        if seen_inodes is not None:
+            seen_inodes = InodeSet.from_journal(journal.get(InodeSet.JOURNAL_NAME, b''))
+        if scan_filter is not None:
+            scan_filter.stats.update(state['filter_stats'])
+        if tree_builder is not None:
+            tree_builder = TreeIndexBuilder.from_state(state['tree_index'], journal)
+        del journal
+        if all_files_stats is not None and state.get('file_stats') is not None:
+            all_files_stats = FileStats.from_state(state['file_stats'])
+        if scan_top is not None and state.get('top') is not None:
+            scan_top = ScanTop.from_state(state['top'], top_n)
+        resume_state = ([decode_record(record) for record in state['pending']], set(state['dir_totals']))
+        resume_offset = state['output_offset']
+        error_log_state = state.get('error_log')
+        error_log_offset = state.get('error_log_offset')
+    
+    if error_log_offset is not None and os.path.exists(error_log_file):
+        # Ошибки после контрольной точки будут записаны снова при повторном чтении директорий
+        with open(error_log_file, 'r+b') as f:
+            f.truncate(error_log_offset)
+    
+    # Снимок для инкрементального режима
+    snapshot = None
+    lister = list_dir
+    if scan_filter is not None or metrics is not None:
+        lister = partial(list_dir, scan_filter=scan_filter, metrics=metrics)
+    if incremental:
+        snapshot = ScanSnapshot(snapshot_file or output_file + ".snapshot", resume=resume)
+        lister = partial(list_dir_incremental, snapshot=snapshot, scan_filter=scan_filter, metrics=metrics)
     
     # Открываем файлы для непрерывной записи
-    with open(output_file, 'w', newline='', encoding='utf-8') as csv_f, \
-         open(error_log_file, 'w', encoding='utf-8') as err_f:
-        
-        # Инициализируем CSV writer
-        csv_writer = csv.writer(csv_f)
-        csv_writer.writerow(['Path', 'Name', 'Type', 'Size', 'Extension', 'DateTimeCreate','DateTimeLastModification'])
+    with open_output(output_file, output_format, resume_offset, compression=compression,
+                     compression_level=compression_level, batch_size=flush_interval,
+                     flush_bytes=flush_bytes, flush_seconds=flush_seconds,
+                     timestamp_format=timestamp_format) as output, \
+         open(error_log_file, 'a' if resume else 'w', encoding='utf-8', errors='backslashreplace') as err_f, \
+         (snapshot if snapshot is not None else nullcontext()), \
+         (MetricsWriter(metrics_file, metrics, metrics_interval, append=resume)
+          if metrics is not None else nullcontext()) as metrics_writer:
         
         # Записываем заголовок в лог ошибок
+        if resume:
+            err_f.write(f"\nResumed from checkpoint: {checkpoint_path}\n")
         err_f.write(f"Disk Scan Report - {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
         err_f.write(f"Scan path: {start_path}\n")
         err_f.write(f"Minimum file size: {min_size_mb} MB\n")
         err_f.write("="*80 + "\n\n")
         err_f.flush()
         
-        # Функция для записи строки в CSV
-        def write_csv_row(path, name, item_type, size, extension="", creation_date="", last_modification_time=""):
+        # Ошибки пишутся полностью или группами; файл сбрасывается по времени
+        error_log = ErrorLog(err_f, error_log_mode, error_log_samples, error_log_sample_interval, flush_seconds)
+        if error_log_state is not None:
+            error_log.restore_state(error_log_state)
+        
+        # Функция для записи строки в отчет (даты - в секундах эпохи)
+        def write_row(path, name, item_type, size, extension="", creation_time=None, modification_time=None,
+                      disk_size=None):
             try:
-                csv_writer.writerow([path, name, item_type, size, extension, creation_date, last_modification_time])
-                # Периодически сбрасываем буфер
-                if stats['files_written'] % flush_interval == 0 or stats['dirs'] % 100 == 0:
-                    csv_f.flush()
+                # Сброс буфера выполняет поток записи по объему и времени
+                if metrics is None:
+                    output.write_row(path, name, item_type, size, extension, creation_time, modification_time,
+                                     disk_size)
+                    return True
+                started = clock()
+                output.write_row(path, name, item_type, size, extension, creation_time, modification_time, disk_size)
+                metrics.add_time('write', clock() - started)
                 return True
             except Exception as e:
                 stats['write_errors'] += 1
-                log_error(f"Ошибка записи в CSV: {path}/{name}", e)
+                log_error("Ошибка записи в отчет", os.path.join(path, name), e)
                 return False
         
         # Функция для записи ошибок
-        def log_error(message, exception=None):
-            timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
-            err_f.write(f"[{timestamp}] {message}\n")
-            if exception:
-                err_f.write(f"Error type: {type(exception).__name__}\n")
-                err_f.write(f"Message: {str(exception)}\n")
-                err_f.write("Traceback:\n")
-                err_f.write(traceback.format_exc())
-            err_f.write("\n" + "-"*80 + "\n\n")
-            err_f.flush()
+        def log_error(kind, path, exception=None):
+            started = clock()
+            error_log.log(kind, path, exception)
+            if metrics is not None:
+                metrics.add_time('error_log', clock() - started)
+        
+        # Контрольная точка: состояние согласовано с отчетом между директориями
+        checkpointing = checkpoint_interval > 0 and output.supports_resume
+        last_checkpoint = time.time()
+        if checkpointing and seen_inodes is not None:
+            seen_inodes.track_changes()
+        
+        def write_checkpoint():
+            nonlocal journal_offset
+            error_log.flush()
+            if seen_inodes is not None or tree_builder is not None:
+                # В журнал дописывается только добавленное с прошлой контрольной точки
+                with CheckpointJournal(journal_path, journal_offset) as journal:
+                    if seen_inodes is not None:
+                        journal.append(InodeSet.JOURNAL_NAME, seen_inodes.journal_changes())
+                    if tree_builder is not None:
+                        for name, data in tree_builder.journal_changes():
+                            journal.append(name, data)
+                    journal_offset = journal.sync()
+            if snapshot is not None:
+                snapshot.checkpoint()
+            save_checkpoint(checkpoint_path, {
+                'start_path': start_path,
+                'min_size_mb': min_size_mb,
+                'dedupe_hardlinks': dedupe_hardlinks,
+                'timestamp_format': timestamp_format,
+                'report_files': report_files,
+                'incremental': incremental,
+                'output_offset': output.tell(),
+                'elapsed': time.time() - stats['start_time'],
+                'stats': {key: value for key, value in stats.items() if key != 'start_time'},
+                'pending': [encode_record(record) for record in pending.values()],
+                # Обработанные поддиректории ожидающих директорий
+                'dir_totals': dir_totals.to_state(
+                    dir_path for record in pending.values() for dir_path in record[2]),
+                'journal_offset': journal_offset,
+                'filter_rules': filter_rules,
+                'filter_stats': scan_filter.stats if scan_filter is not None else None,
+                'tree_index': tree_builder.to_state() if tree_builder is not None else None,
+                'top': scan_top.to_state() if scan_top is not None else None,
+                'file_stats': all_files_stats.to_state() if all_files_stats is not None else None,
+                'compression': compression,
+                'error_log': error_log.to_state(),
+                'error_log_offset': err_f.tell(),
+            })
         
         # Информация о прогрессе
         def log_progress():
@@ -108,26 +712,74 @@ def scan_disk(start_path, output_file, error_log_file, min_size_mb, log_interval
             print(f"\rОбработано: {stats['dirs']} директорий, {stats['files']} файлов, "
                   f"записано: {stats['files_written']}, пропущено: {stats['files_skipped']}, "
                   f"скорость: {speed:.1f} файл/сек, "
-                  f"ошибок: {stats['scan_errors'] + stats['write_errors']}", 
+                  f"ошибок: {stats['scan_errors'] + stats['write_errors']}"
+                  f"{largest_file_text()}", 
                   end='', flush=True)
         
-        # Рекурсивный обход с использованием os.walk (снизу вверх)
-        for root, dirs, files in os.walk(start_path, topdown=False):
+        def largest_file_text():
+            largest = scan_top.largest_file() if scan_top is not None else None
+            if largest is None:
+                return ""
+            size, path, name = largest[:3]
+            return f", крупнейший файл: {name} ({size / 1024**2:.1f} МБ)"
+        
+        last_top_write = time.time()
+        
+        # Рекурсивный обход через os.scandir (снизу вверх)
+        if async_concurrency > 0:
+            tree = scan_tree_async(start_path, async_concurrency, lister, pending, resume_state, async_limiter)
+        elif workers > 1:
+            tree = scan_tree_parallel(start_path, workers, lister, pending, resume_state)
+        else:
+            tree = scan_tree(start_path, lister, pending, resume_state)
+        if metrics is not None:
+            # Время ожидания следующей директории: в однопоточном режиме сюда
+            # входит и ее чтение
+            tree = metrics.timed(tree, 'wait')
+        
+        for root, files, subdirs, errors in tree:
             current_dir_size = 0
+            current_dir_disk_size = 0
+            current_dir_files = 0
+            current_dir_large_files = 0
+            current_dir_mtime = 0.0
+            
+            # Ошибки листинга директории и получения атрибутов файлов
+            for error_path, error in errors:
+                stats['scan_errors'] += 1
+                if error_path == root:
+                    log_error("Ошибка доступа к директории", error_path, error)
+                else:
+                    stats['files'] += 1
+                    log_error("Ошибка доступа к файлу", error_path, error)
             
             # Обработка файлов
-            for name in files:
+            for name, st in files:
                 stats['files'] += 1
-                file_path = os.path.join(root, name)
-                try:
-                    file_size = os.path.getsize(file_path)
-                    current_dir_size += file_size
-                    
-                    # Пропускаем файлы меньше порога
-                    if file_size < min_size_bytes:
-                        stats['files_skipped'] += 1
-                        continue
-                    
+                file_size = st.st_size
+                disk_size = file_disk_size(st)
+                
+                # Повторные жесткие ссылки на уже учтенный inode пропускаем
+                if seen_inodes is not None and st.st_nlink > 1 and not seen_inodes.add(st.st_dev, st.st_ino):
+                    stats['hardlinks_skipped'] += 1
+                    continue
+                
+                current_dir_size += file_size
+                current_dir_disk_size += disk_size
+                current_dir_files += 1
+                if st.st_mtime > current_dir_mtime:
+                    current_dir_mtime = st.st_mtime
+                if scan_top is not None:
+                    scan_top.add_file(file_size, root, name, disk_size, st.st_mtime)
+                if all_files_stats is not None:
+                    all_files_stats.add(name, file_size, disk_size, st.st_mtime)
+                
+                # Пропускаем файлы меньше порога
+                if file_size < min_size_bytes:
+                    stats['files_skipped'] += 1
+                elif not report_files:
+                    current_dir_large_files += 1
+                else:
                     # Получаем расширение файла
                     file_ext = os.path.splitext(name)[1]
                     if file_ext:
@@ -135,61 +787,135 @@ def scan_disk(start_path, output_file, error_log_file, min_size_mb, log_interval
                     else:
                         file_ext = "без расширения"
                     
-                    # Получаем дату создания файла
-                    try:
-                        creation_time = os.path.getctime(file_path)
-                        creation_date = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(creation_time))
-                    except Exception:
-                        creation_date = "ошибка даты создания файла"
-                    
-                     # Получаем дату последней модификации файла
-                    try:
-                        last_modification_time = os.path.getmtime(file_path)
-                        last_modification_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(last_modification_time))
-                    except Exception:
-                        last_modification_time = "ошибка даты последней модификации файла"
-
-
-                    
-                    # Записываем файл в CSV
-                    parent_path = os.path.dirname(file_path)
-                    write_csv_row(parent_path, name, 'file', file_size, file_ext, creation_date, last_modification_time)
+                    # Записываем файл в отчет (даты создания и модификации из того же stat)
+                    write_row(root, name, 'file', file_size, file_ext, st.st_ctime, st.st_mtime, disk_size)
                     stats['files_written'] += 1
-                except Exception as e:
-                    stats['scan_errors'] += 1
-                    log_error(f"Ошибка доступа к файлу: {file_path}", e)
-                    continue
+                    current_dir_large_files += 1
                 
                 # Вывод прогресса с заданным интервалом
                 if stats['files'] % log_interval_files == 0:
                     log_progress()
             
-            # Обработка поддиректорий
-            for name in dirs:
-                dir_path = os.path.join(root, name)
-                if dir_path in dir_sizes:
-                    current_dir_size += dir_sizes[dir_path]
+            if metrics is not None:
+                metrics.record_dir(root, current_dir_files, current_dir_size)
+            
+            # Итоги поддиректорий уже посчитаны (обход снизу вверх); после
+            # этого они больше не нужны и освобождаются
+            subtree_files = current_dir_files
+            subtree_large_files = current_dir_large_files
+            for dir_path in subdirs:
+                child = dir_totals.pop(dir_path)
+                if child is not None:
+                    current_dir_size += child[0]
+                    current_dir_disk_size += child[1]
+                    subtree_files += child[2]
+                    subtree_large_files += child[3]
             
-            # Записываем директорию в CSV
-            dir_sizes[root] = current_dir_size
+            # Записываем директорию в отчет
+            dir_totals.add(root, current_dir_size, current_dir_disk_size, subtree_files, subtree_large_files)
             dir_name = os.path.basename(root) if root != start_path else start_path
             parent_path = os.path.dirname(root) if root != start_path else ""
-            write_csv_row(parent_path, dir_name, 'dir', current_dir_size)
+            write_row(parent_path, dir_name, 'dir', current_dir_size, disk_size=current_dir_disk_size)
             stats['dirs'] += 1
+            if snapshot is not None:
+                snapshot.record(root)
+            if scan_top is not None:
+                scan_top.add_dir(current_dir_size, parent_path, dir_name, current_dir_disk_size)
+            if tree_builder is not None:
+                tree_builder.add(root, dir_name, current_dir_size, current_dir_disk_size,
+                                 current_dir_files, current_dir_mtime, subdirs)
             
             # Вывод прогресса с заданным интервалом
             if stats['dirs'] % log_interval_dirs == 0:
                 log_progress()
+            
+            if metrics is not None:
+                metrics.set_time('write_background', output.write_seconds)
+                metrics_writer.maybe_write(stats)
+            
+            if scan_top is not None and top_interval > 0 and time.time() - last_top_write >= top_interval:
+                scan_top.write_summary(top_path, start_path, stats)
+                last_top_write = time.time()
+            
+            if checkpointing and time.time() - last_checkpoint >= checkpoint_interval:
+                write_checkpoint()
+                last_checkpoint = time.time()
+        
+        if metrics is not None:
+            output.flush()
+            metrics.set_time('write_background', output.write_seconds)
+            metrics_writer.write(stats, final=True)
+        
+        error_log.write_summary()
+    
+    if tree_builder is not None:
+        tree_index_path = tree_index_file or output_file + ".tree"
+        tree_builder.write(tree_index_path)
+    if scan_top is not None:
+        scan_top.write_summary(top_path, start_path, stats, final=True)
+    if all_files_stats is not None:
+        file_stats_path = file_stats_file or output_file + ".stats.json"
+        all_files_stats.write(file_stats_path, start_path)
+    
+    # Сканирование завершено: контрольная точка больше не нужна
+    for path in (checkpoint_path, journal_path):
+        if os.path.exists(path):
+            os.remove(path)
     
     # Финальный отчет
     elapsed = time.time() - stats['start_time']
     print(f"\n\n{'='*80}")
     print(f"Сканирование завершено за {elapsed:.1f} секунд")
     print(f"Всего обработано: {stats['dirs']} директорий, {stats['files']} файлов")
-    print(f"Файлов записано в отчет: {stats['files_written']} (размер > {min_size_mb} МБ)")
+    root_totals = dir_totals.get(start_path)
+    if root_totals is not None:
+        size, disk_size, files_count, large_files = root_totals
+        print(f"Итого в {start_path}: {size / 1024**3:.2f} ГБ (на диске {disk_size / 1024**3:.2f} ГБ), "
+              f"{files_count} файлов, из них не меньше {min_size_mb} МБ: {large_files}")
+    if report_files:
+        print(f"Файлов записано в отчет: {stats['files_written']} (размер > {min_size_mb} МБ)")
+    else:
+        print("Строки файлов в отчет не записывались (только директории)")
     print(f"Файлов пропущено: {stats['files_skipped']} (размер < {min_size_mb} МБ)")
+    if seen_inodes is not None:
+        print(f"Повторных жестких ссылок пропущено: {stats['hardlinks_skipped']}")
+    if scan_filter is not None:
+        print(f"Директорий исключено без чтения: {scan_filter.stats['pruned_dirs']}")
+        print(f"Файлов исключено правилами: {scan_filter.stats['excluded_files']} "
+              f"({scan_filter.stats['excluded_bytes'] / 1024**3:.2f} ГБ)")
     print(f"Ошибок сканирования: {stats['scan_errors']}")
     print(f"Ошибок записи: {stats['write_errors']}")
+    if error_log.mode == 'aggregate' and error_log.groups:
+        print(f"Групп ошибок: {len(error_log.groups)}, без traceback в журнале: {error_log.suppressed}")
+        for count, kind, directory, type_name, path, message in error_log.top_groups(5):
+            print(f"  {count}: {kind} в {directory} ({type_name})")
+    if snapshot is not None:
+        print(f"Директорий взято из снимка без повторного чтения: {snapshot.reused_dirs}")
+        print(f"Снимок сохранен в: {snapshot.path}")
+    if async_limiter is not None:
+        limits = async_limiter.summary()
+        print(f"Асинхронный режим: {limits['operations']} stat, предел параллелизма {limits['limit']} "
+              f"(максимум {limits['peak_limit']}, снижений {limits['decreases']}), "
+              f"базовая задержка {limits['baseline_ms']} мс")
+    if all_files_stats is not None:
+        print(f"Статистика по всем файлам ({len(all_files_stats.extensions)} расширений) "
+              f"сохранена в: {file_stats_path}")
+    if tree_builder is not None:
+        print(f"Индекс дерева ({len(tree_builder)} директорий) сохранен в: {tree_index_path}")
+    if metrics is not None:
+        phases = ", ".join(f"{phase} {seconds:.2f} с" for phase, seconds in metrics.phases.items())
+        print(f"Время по фазам: {phases}")
+        for top, entry in metrics.slowest_top_dirs():
+            print(f"  {top}: чтение {entry['seconds']:.2f} с, {entry['dirs']} директорий, {entry['files']} файлов")
+        print(f"Метрики записаны в: {metrics_file}")
+    if scan_top is not None:
+        for title, items in (('ФАЙЛОВ', scan_top.top_files()), ('ДИРЕКТОРИЙ', scan_top.top_dirs())):
+            print(f"{'-'*80}")
+            print(f"ТОП-{top_n} {title} ПО РАЗМЕРУ:")
+            for i, (size, path, name) in enumerate((item[:3] for item in items), 1):
+                print(f"{i}. {os.path.join(path, name)} - {size / 1024**2:.2f} МБ")
+        print(f"{'-'*80}")
+        print(f"Топы сохранены в: {top_path}")
     print(f"Результаты сохранены в: {output_file}")
     print(f"Ошибки записаны в: {error_log_file}")
     print(f"{'='*80}")
@@ -206,11 +932,74 @@ def main():
     parser.add_argument('--path', default=config['path'], 
                         help='Путь для сканирования')
     parser.add_argument('--output', default=config['output'], 
-                        help='Выходной CSV-файл')
+                        help='Выходной файл отчета (CSV или Parquet)')
+    parser.add_argument('--output-format', default=config['output_format'],
+                        choices=['auto'] + sorted(OUTPUT_FORMATS),
+                        help='Формат отчета (auto - по расширению выходного файла)')
+    parser.add_argument('--compression', default=config['compression'], choices=['auto'] + list(COMPRESSIONS),
+                        help='Сжатие отчета (auto - по расширению: .gz, .zst; для Parquet - сжатие колонок)')
+    parser.add_argument('--compression-level', type=int, default=config['compression_level'],
+                        help='Уровень сжатия (0 - по умолчанию для выбранного сжатия)')
+    parser.add_argument('--timestamp-format', default=config['timestamp_format'], choices=['text', 'epoch'],
+                        help='Даты в CSV: text - локальное время, epoch - секунды эпохи (быстрее)')
     parser.add_argument('--error-log', default=config['error_log'], 
                         help='Файл для записи ошибок')
+    parser.add_argument('--error-log-mode', default=config['error_log_mode'], choices=ERROR_LOG_MODES,
+                        help='full - каждая ошибка с traceback, aggregate - счетчики по директориям и типам '
+                             '(быстрее при массовых отказах в доступе)')
+    parser.add_argument('--error-log-samples', type=int, default=config['error_log_samples'],
+                        help='Сколько ошибок каждого типа записывать с traceback в режиме aggregate')
     parser.add_argument('--min-size', type=float, default=config['min_size'], 
                         help='Минимальный размер файлов для включения в отчет (в мегабайтах)')
+    parser.add_argument('--workers', type=int, default=config['workers'],
+                        help='Количество потоков сканирования (1 - однопоточный обход)')
+    parser.add_argument('--async-concurrency', type=int, default=config['async_concurrency'],
+                        help='Асинхронный обход для сетевых ФС: максимум параллельных stat (0 - отключен)')
+    parser.add_argument('--incremental', action='store_true', default=config['incremental'],
+                        help='Не перечитывать директории, не изменившиеся с прошлого сканирования')
+    parser.add_argument('--snapshot', default=config['snapshot'],
+                        help='Файл снимка для инкрементального режима (по умолчанию <output>.snapshot)')
+    parser.add_argument('--metrics-file', default=config['metrics_file'],
+                        help='Файл JSON Lines для периодических метрик по фазам сканирования')
+    parser.add_argument('--metrics-interval', type=float, default=config['metrics_interval'],
+                        help='Интервал записи метрик в секундах')
+    parser.add_argument('--profile', default='',
+                        help='Сохранить профиль cProfile потока сканирования в этот файл')
+    parser.add_argument('--tree-index', action='store_true', default=config['tree_index'],
+                        help='Построить индекс дерева директорий для tree_index.py')
+    parser.add_argument('--tree-index-file', default=config['tree_index_file'],
+                        help='Файл индекса дерева (по умолчанию <output>.tree)')
+    parser.add_argument('--top-n', type=int, default=config['top_n'],
+                        help='Вести топ-N самых больших файлов и директорий и сохранять его в JSON '
+                             '(0 - не вести)')
+    parser.add_argument('--top-file', default=config['top_file'],
+                        help='JSON-файл с топами (по умолчанию <output>.top.json)')
+    parser.add_argument('--no-file-rows', dest='report_files', action='store_false', default=config['report_files'],
+                        help='Не писать строки файлов в отчет (только директории и топы)')
+    parser.add_argument('--file-stats', action='store_true', default=config['file_stats'],
+                        help='Собирать статистику по расширениям, размерам и возрасту всех файлов')
+    parser.add_argument('--file-stats-file', default=config['file_stats_file'],
+                        help='JSON-файл статистики по всем файлам (по умолчанию <output>.stats.json)')
+    parser.add_argument('--dedupe-hardlinks', action='store_true', default=config['dedupe_hardlinks'],
+                        help='Учитывать файл с несколькими жесткими ссылками один раз (как du)')
+    parser.add_argument('--exclude', nargs='*', default=config['exclude'],
+                        help='Glob-шаблоны исключаемых имен или путей (поддеревья не читаются)')
+    parser.add_argument('--exclude-regex', nargs='*', default=config['exclude_regex'],
+                        help='Регулярные выражения для исключаемых путей')
+    parser.add_argument('--one-file-system', action='store_true', default=config['one_file_system'],
+                        help='Не переходить на другие файловые системы')
+    parser.add_argument('--max-depth', type=int, default=config['max_depth'],
+                        help='Максимальная глубина обхода (0 - только начальная директория)')
+    parser.add_argument('--include-ext', nargs='*', default=config['include_extensions'],
+                        help='Учитывать только файлы с этими расширениями')
+    parser.add_argument('--exclude-ext', nargs='*', default=config['exclude_extensions'],
+                        help='Не учитывать файлы с этими расширениями')
+    parser.add_argument('--checkpoint', default=config['checkpoint'],
+                        help='Файл контрольной точки (по умолчанию <output>.checkpoint)')
+    parser.add_argument('--checkpoint-interval', type=float, default=config['checkpoint_interval'],
+                        help='Интервал сохранения контрольной точки в секундах (0 - отключить)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Продолжить прерванное сканирование с последней контрольной точки')
     parser.add_argument('--config', default=DEFAULT_CONFIG_PATH,
                         help='Путь к файлу конфигурации JSON')
     parser.add_argument('--save-config', action='store_true',
@@ -226,11 +1015,43 @@ def main():
     final_config = {
         'path': args.path,
         'output': args.output,
+        'output_format': args.output_format,
+        'compression': args.compression,
+        'compression_level': args.compression_level,
         'error_log': args.error_log,
+        'error_log_mode': args.error_log_mode,
+        'error_log_samples': args.error_log_samples,
+        'error_log_sample_interval': config.get('error_log_sample_interval', 60),
         'min_size': args.min_size,
         'log_interval_files': config.get('log_interval_files', 500),
         'log_interval_dirs': config.get('log_interval_dirs', 50),
-        'flush_interval': config.get('flush_interval', 1000)
+        'flush_interval': config.get('flush_interval', 1000),
+        'flush_bytes': config.get('flush_bytes', 8 * 1024 * 1024),
+        'flush_seconds': config.get('flush_seconds', 5),
+        'timestamp_format': args.timestamp_format,
+        'exclude': args.exclude,
+        'exclude_regex': args.exclude_regex,
+        'one_file_system': args.one_file_system,
+        'max_depth': args.max_depth,
+        'include_extensions': args.include_ext,
+        'exclude_extensions': args.exclude_ext,
+        'workers': args.workers,
+        'async_concurrency': args.async_concurrency,
+        'incremental': args.incremental,
+        'snapshot': args.snapshot,
+        'metrics_file': args.metrics_file,
+        'metrics_interval': args.metrics_interval,
+        'tree_index': args.tree_index,
+        'tree_index_file': args.tree_index_file,
+        'top_n': args.top_n,
+        'top_file': args.top_file,
+        'top_interval': config.get('top_interval', 60),
+        'report_files': args.report_files,
+        'file_stats': args.file_stats,
+        'file_stats_file': args.file_stats_file,
+        'dedupe_hardlinks': args.dedupe_hardlinks,
+        'checkpoint': args.checkpoint,
+        'checkpoint_interval': args.checkpoint_interval
     }
     
     # Сохраняем конфигурацию если нужно
@@ -242,17 +1063,41 @@ def main():
     print(f"Конфигурация: {args.config}")
     print(f"Путь: {final_config['path']}")
     print(f"Минимальный размер файлов: {final_config['min_size']} МБ")
-    print(f"Отчет будет сохранен в: {final_config['output']}")
-    print(f"Ошибки будут записываться в: {final_config['error_log']}")
+    print(f"Отчет будет сохранен в: {final_config['output']} (формат: {final_config['output_format']})")
+    if final_config['compression'] != 'none':
+        print(f"Сжатие отчета: {final_config['compression']}")
+    print(f"Ошибки будут записываться в: {final_config['error_log']} (режим: {final_config['error_log_mode']})")
     print(f"Интервал лога файлов: {final_config['log_interval_files']}")
     print(f"Интервал лога директорий: {final_config['log_interval_dirs']}")
-    print(f"Интервал сброса буфера: {final_config['flush_interval']}")
+    print(f"Размер пакета записи: {final_config['flush_interval']} строк, сброс буфера: "
+          f"{final_config['flush_bytes'] / 1024**2:.0f} МБ или {final_config['flush_seconds']} с")
+    if final_config['async_concurrency'] > 0:
+        print(f"Асинхронный обход: до {final_config['async_concurrency']} параллельных stat")
+    else:
+        print(f"Потоков сканирования: {final_config['workers']}")
+    print(f"Инкрементальный режим: {'да' if final_config['incremental'] else 'нет'}")
+    print(f"Учет жестких ссылок один раз: {'да' if final_config['dedupe_hardlinks'] else 'нет'}")
+    if final_config['exclude'] or final_config['exclude_regex']:
+        print(f"Исключения: {', '.join(final_config['exclude'] + final_config['exclude_regex'])}")
+    if final_config['one_file_system']:
+        print("Обход в пределах одной файловой системы")
+    if final_config['max_depth'] is not None:
+        print(f"Максимальная глубина: {final_config['max_depth']}")
+    if final_config['include_extensions'] or final_config['exclude_extensions']:
+        print(f"Расширения: только {final_config['include_extensions'] or 'все'}, "
+              f"кроме {final_config['exclude_extensions'] or 'нет'}")
     print(f"{'='*80}")
+    if args.resume:
+        print("Продолжение сканирования с контрольной точки")
     print("Сканирование начато... Это может занять значительное время")
     print("Для прерывания нажмите Ctrl+C (данные сохранятся частично)")
     print(f"{'-'*80}")
     
+    # Профилируется поток сканирования; потоки обхода в профиль не попадают
+    profiler = cProfile.Profile() if args.profile else None
     try:
+        if profiler is not None:
+            profiler.enable()
         scan_disk(
             start_path=final_config['path'],
             output_file=final_config['output'],
@@ -260,14 +1105,50 @@ def main():
             min_size_mb=final_config['min_size'],
             log_interval_files=final_config['log_interval_files'],
             log_interval_dirs=final_config['log_interval_dirs'],
-            flush_interval=final_config['flush_interval']
+            flush_interval=final_config['flush_interval'],
+            workers=final_config['workers'],
+            incremental=final_config['incremental'],
+            snapshot_file=final_config['snapshot'] or None,
+            output_format=final_config['output_format'],
+            dedupe_hardlinks=final_config['dedupe_hardlinks'],
+            checkpoint_file=final_config['checkpoint'] or None,
+            checkpoint_interval=final_config['checkpoint_interval'],
+            resume=args.resume,
+            flush_bytes=final_config['flush_bytes'],
+            flush_seconds=final_config['flush_seconds'],
+            timestamp_format=final_config['timestamp_format'],
+            exclude_rules={key: final_config[key] for key in EXCLUDE_RULE_KEYS},
+            tree_index=final_config['tree_index'],
+            tree_index_file=final_config['tree_index_file'] or None,
+            metrics_file=final_config['metrics_file'] or None,
+            metrics_interval=final_config['metrics_interval'],
+            async_concurrency=final_config['async_concurrency'],
+            top_n=final_config['top_n'],
+            top_file=final_config['top_file'] or None,
+            top_interval=final_config['top_interval'],
+            report_files=final_config['report_files'],
+            file_stats=final_config['file_stats'],
+            file_stats_file=final_config['file_stats_file'] or None,
+            compression=final_config['compression'],
+            compression_level=final_config['compression_level'] or None,
+            error_log_mode=final_config['error_log_mode'],
+            error_log_samples=final_config['error_log_samples'],
+            error_log_sample_interval=final_config['error_log_sample_interval']
         )
     except KeyboardInterrupt:
         print("\n\nСканирование прервано пользователем!")
         print("Частичные результаты сохранены в выходных файлах")
+        if final_config['checkpoint_interval'] > 0:
+            print("Для продолжения с последней контрольной точки запустите с --resume")
     except Exception as e:
         print(f"\n\nКритическая ошибка: {str(e)}")
         traceback.print_exc()
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            print(f"\nПрофиль сохранен в: {args.profile} (самые затратные функции):")
+            pstats.Stats(profiler).sort_stats('cumulative').print_stats(15)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
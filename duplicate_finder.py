@@ -0,0 +1,243 @@
+#python duplicate_finder.py --input "large_files_report.csv" --output "duplicates.csv" --min-size 1
+"""Поиск файлов-дубликатов по содержимому.
+
+Кандидаты отсеиваются в три этапа, чтобы читать как можно меньше данных:
+1. группировка по размеру (из отчета сканера или обхода --path);
+2. хеш первых и последних PARTIAL_BLOCK байт файла;
+3. потоковый хеш остальной части файла - только для файлов, совпавших
+   на этапе 2; начало и конец повторно не читаются, поэтому каждый байт
+   кандидата читается не больше одного раза.
+Чтение файлов выполняется пулом потоков: hashlib отпускает GIL на
+больших блоках, поэтому хеширование идет параллельно.
+"""
+import argparse
+import csv
+import hashlib
+import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from scan_output import is_parquet, open_report_text
+
+# Размер блоков для частичного хеша (начало и конец файла)
+PARTIAL_BLOCK = 16 * 1024
+
+# Размер буфера для полного хеширования
+READ_BUFFER = 1024 * 1024
+
+DUPLICATES_COLUMNS = ['GroupId', 'Hash', 'Size', 'Count', 'WastedBytes', 'Path', 'Name']
+
+
+def iter_report_files(input_file):
+    """Возвращает (путь к директории, имя, размер) для файлов из отчета сканера"""
+    if is_parquet(input_file):
+        import pyarrow.parquet as pq
+        columns = ['Path', 'Name', 'Type', 'Size']
+        for batch in pq.ParquetFile(input_file).iter_batches(columns=columns):
+            for path, name, item_type, size in zip(*(batch.column(c).to_pylist() for c in columns)):
+                if item_type == 'file':
+                    yield path, name, size
+        return
+
+    with open_report_text(input_file) as f:
+        for row in csv.DictReader(f):
+            if row['Type'] == 'file':
+                yield row['Path'], row['Name'], int(row['Size'])
+
+
+def iter_tree_files(start_path):
+    """Возвращает (путь к директории, имя, размер) для файлов дерева"""
+    # Импорт здесь, чтобы модуль не зависел от сканера при работе с отчетом
+    from disk_scanner import scan_tree
+
+    for root, files, subdirs, errors in scan_tree(start_path):
+        for name, st in files:
+            yield root, name, st.st_size
+
+
+class DuplicateFinder:
+    """Трехэтапный поиск дубликатов со статистикой прочитанных байт"""
+
+    def __init__(self, workers=4, partial_block=PARTIAL_BLOCK):
+        self.workers = workers
+        self.partial_block = partial_block
+        self.stats = {
+            'files': 0,
+            'candidate_files': 0,
+            'candidate_bytes': 0,
+            'partial_hashed': 0,
+            'full_hashed': 0,
+            'bytes_read': 0,
+            'errors': 0,
+        }
+        self._stats_lock = threading.Lock()
+
+    def _count_read(self, size):
+        with self._stats_lock:
+            self.stats['bytes_read'] += size
+
+    def _partial_hash(self, file_path, key):
+        """Хеш начала и конца файла; для маленьких файлов это полный хеш"""
+        size = key[0]
+        digest = hashlib.blake2b(digest_size=16)
+        with open(file_path, 'rb') as f:
+            head = f.read(self.partial_block)
+            digest.update(head)
+            read = len(head)
+            if size > 2 * self.partial_block:
+                f.seek(-self.partial_block, os.SEEK_END)
+                tail = f.read(self.partial_block)
+                digest.update(tail)
+                read += len(tail)
+            elif size > self.partial_block:
+                rest = f.read()
+                digest.update(rest)
+                read += len(rest)
+        self._count_read(read)
+        return digest.hexdigest()
+
+    def _full_hash(self, file_path, key):
+        """Хеш файла между блоками частичного хеша, продолжающий частичный хеш.
+
+        Начало и конец уже прочитаны на этапе 2 и вошли в ключ группы
+        (size, частичный хеш); читается только середина, большими блоками
+        в один буфер.
+        """
+        size, partial = key
+        digest = hashlib.blake2b(partial.encode('ascii'), digest_size=32)
+        buffer = bytearray(READ_BUFFER)
+        view = memoryview(buffer)
+        remaining = size - 2 * self.partial_block
+        read = 0
+        with open(file_path, 'rb', buffering=0) as f:
+            f.seek(self.partial_block)
+            while remaining > 0:
+                n = f.readinto(view[:min(remaining, READ_BUFFER)])
+                if not n:
+                    break
+                digest.update(view[:n])
+                read += n
+                remaining -= n
+        self._count_read(read)
+        return digest.hexdigest()
+
+    def _hash_groups(self, groups, hash_func):
+        """Перегруппировывает файлы внутри каждой группы по значению хеша.
+
+        Ключ группы начинается с размера файла; hash_func(путь, ключ группы).
+        """
+        tasks = [(key, item) for key, items in groups.items() for item in items]
+
+        def run(task):
+            key, item = task
+            try:
+                return key, item, hash_func(item, key)
+            except OSError:
+                with self._stats_lock:
+                    self.stats['errors'] += 1
+                return key, item, None
+
+        regrouped = defaultdict(list)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for key, item, value in executor.map(run, tasks):
+                if value is not None:
+                    regrouped[key + (value,)].append(item)
+        return {key: items for key, items in regrouped.items() if len(items) > 1}
+
+    def find(self, files, min_size=1):
+        """Находит дубликаты среди (директория, имя, размер).
+
+        Возвращает список групп (хеш, размер, [пути файлов]), отсортированный
+        по убыванию занятого дубликатами места.
+        """
+        by_size = defaultdict(list)
+        for dir_path, name, size in files:
+            self.stats['files'] += 1
+            if size >= min_size:
+                by_size[size].append(os.path.join(dir_path, name))
+
+        # Этап 1: одинаковый размер. Жесткие ссылки на один inode - не дубликаты
+        candidates = {}
+        for size, paths in by_size.items():
+            if len(paths) < 2:
+                continue
+            unique = {}
+            for file_path in paths:
+                try:
+                    st = os.stat(file_path)
+                except OSError:
+                    self.stats['errors'] += 1
+                    continue
+                unique.setdefault((st.st_dev, st.st_ino), file_path)
+            if len(unique) > 1:
+                candidates[(size,)] = list(unique.values())
+                self.stats['candidate_files'] += len(unique)
+                self.stats['candidate_bytes'] += size * len(unique)
+
+        # Этап 2: начало и конец файла
+        partial = self._hash_groups(candidates, self._partial_hash)
+        self.stats['partial_hashed'] = sum(len(items) for items in candidates.values())
+
+        # Этап 3: середина файла - только там, где частичный хеш не покрыл весь файл
+        small = {key: items for key, items in partial.items() if key[0] <= 2 * self.partial_block}
+        large = {key: items for key, items in partial.items() if key[0] > 2 * self.partial_block}
+        full = self._hash_groups(large, self._full_hash)
+        self.stats['full_hashed'] = sum(len(items) for items in large.values())
+
+        groups = [(key[-1], key[0], sorted(items)) for key, items in list(small.items()) + list(full.items())]
+        groups.sort(key=lambda group: group[1] * (len(group[2]) - 1), reverse=True)
+        return groups
+
+
+def write_duplicates_report(groups, output_file):
+    """Записывает группы дубликатов в CSV (одна строка на файл)"""
+    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(DUPLICATES_COLUMNS)
+        for group_id, (digest, size, paths) in enumerate(groups, 1):
+            wasted = size * (len(paths) - 1)
+            for file_path in paths:
+                writer.writerow([group_id, digest, size, len(paths), wasted,
+                                 os.path.dirname(file_path), os.path.basename(file_path)])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Поиск файлов-дубликатов по содержимому',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--input', help='Отчет сканера (CSV, CSV.gz, CSV.zst или Parquet) со списком файлов')
+    source.add_argument('--path', help='Директория для обхода вместо отчета')
+    parser.add_argument('--output', default='duplicates.csv', help='Выходной CSV с группами дубликатов')
+    parser.add_argument('--min-size', type=float, default=1,
+                        help='Минимальный размер файла (в мегабайтах)')
+    parser.add_argument('--workers', type=int, default=8, help='Количество потоков чтения')
+    args = parser.parse_args()
+
+    files = iter_report_files(args.input) if args.input else iter_tree_files(args.path)
+    finder = DuplicateFinder(workers=args.workers)
+
+    start_time = time.time()
+    groups = finder.find(files, min_size=int(args.min_size * 1024 * 1024))
+    write_duplicates_report(groups, args.output)
+    elapsed = time.time() - start_time
+
+    stats = finder.stats
+    wasted = sum(size * (len(paths) - 1) for digest, size, paths in groups)
+    print(f"{'='*80}")
+    print(f"Поиск завершен за {elapsed:.1f} секунд")
+    print(f"Файлов рассмотрено: {stats['files']}, кандидатов по размеру: {stats['candidate_files']}")
+    print(f"Частичных хешей: {stats['partial_hashed']}, полных хешей: {stats['full_hashed']}")
+    print(f"Прочитано: {stats['bytes_read'] / 1024**2:.1f} МБ "
+          f"из {stats['candidate_bytes'] / 1024**2:.1f} МБ у кандидатов")
+    print(f"Групп дубликатов: {len(groups)}, лишнее место: {wasted / 1024**3:.2f} ГБ")
+    print(f"Ошибок чтения: {stats['errors']}")
+    print(f"Результаты сохранены в: {args.output}")
+    print(f"{'='*80}")
+
+
+if __name__ == "__main__":
+    main()
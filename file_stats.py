@@ -0,0 +1,145 @@
+"""Статистика по всем файлам сканирования, а не только по попавшим в отчет.
+
+В отчет попадают только файлы не меньше --min-size, а мелких файлов
+обычно в тысячи раз больше: именно они расходуют inode и время резервного
+копирования. FileStats накапливает в памяти компактные агрегаты по
+каждому учтенному файлу:
+- по расширениям: число файлов, видимый размер и место на диске;
+- гистограмму размеров по степеням двойки (корзина i: 2**(i-1) <= размер < 2**i,
+  корзина 0 - пустые файлы);
+- распределение по возрасту (времени последнего изменения) относительно
+  начала сканирования.
+Итог пишется в небольшой JSON-файл (по умолчанию <output>.stats.json),
+по которому disk_analyzer.py --file-stats строит графики.
+"""
+import json
+import time
+from bisect import bisect_right
+
+from scan_checkpoint import atomic_write
+from scan_filter import file_extension
+
+SIZE_BUCKETS = 65
+
+# Границы корзин возраста в днях (возраст меньше границы) и подписи; последняя - без границы
+AGE_BUCKETS = (
+    (1, 'до суток'),
+    (7, 'до недели'),
+    (30, 'до месяца'),
+    (91, 'до 3 месяцев'),
+    (365, 'до года'),
+    (730, 'до 2 лет'),
+    (1826, 'до 5 лет'),
+    (None, 'старше 5 лет'),
+)
+_AGE_LIMITS = [days * 86400 for days, label in AGE_BUCKETS if days is not None]
+
+# Больше расширений не храним: остальные попадают в одну строку
+MAX_EXTENSIONS = 10000
+OTHER_EXTENSIONS = '*'
+
+
+class FileStats:
+    """Агрегаты по расширениям, размерам и возрасту файлов"""
+
+    def __init__(self, now=None):
+        # Возраст считается от начала сканирования, чтобы не зависеть от его длительности
+        self.now = time.time() if now is None else now
+        # Расширение -> [файлов, байт, байт на диске]
+        self.extensions = {}
+        # Расширение в исходном регистре -> строка extensions
+        self._entries = {}
+        self.size_files = [0] * SIZE_BUCKETS
+        self.size_bytes = [0] * SIZE_BUCKETS
+        self.age_files = [0] * len(AGE_BUCKETS)
+        self.age_bytes = [0] * len(AGE_BUCKETS)
+
+    def add(self, name, size, disk_size, mtime):
+        # Расширение как в file_extension, но без splitext и lower для каждого файла:
+        # строки по расширению в исходном регистре кэшируются
+        dot = name.rfind('.')
+        if dot > 0 and name[0] != '.':
+            raw = name[dot + 1:]
+        elif dot < 0:
+            raw = ''
+        else:
+            raw = file_extension(name)
+        entry = self._entries.get(raw)
+        if entry is None:
+            entry = self._entry(raw)
+        entry[0] += 1
+        entry[1] += size
+        entry[2] += disk_size
+
+        bucket = size.bit_length()
+        if bucket >= SIZE_BUCKETS:
+            bucket = SIZE_BUCKETS - 1
+        self.size_files[bucket] += 1
+        self.size_bytes[bucket] += size
+
+        # Файлы из будущего (неверные часы) попадают в первую корзину
+        age = bisect_right(_AGE_LIMITS, self.now - mtime)
+        self.age_files[age] += 1
+        self.age_bytes[age] += size
+
+    def _entry(self, raw):
+        extension = raw.lower()
+        entry = self.extensions.get(extension)
+        if entry is None:
+            if len(self.extensions) >= MAX_EXTENSIONS:
+                extension = OTHER_EXTENSIONS
+                entry = self.extensions.get(extension)
+            if entry is None:
+                entry = self.extensions[extension] = [0, 0, 0]
+        if len(self._entries) >= 4 * MAX_EXTENSIONS:
+            self._entries.clear()
+        self._entries[raw] = entry
+        return entry
+
+    def to_state(self):
+        """Состояние для сохранения в JSON (контрольные точки)"""
+        return {
+            'now': self.now,
+            'extensions': self.extensions,
+            'size_files': self.size_files,
+            'size_bytes': self.size_bytes,
+            'age_files': self.age_files,
+            'age_bytes': self.age_bytes,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        stats = cls(state['now'])
+        for key in ('extensions', 'size_files', 'size_bytes', 'age_files', 'age_bytes'):
+            setattr(stats, key, state[key])
+        return stats
+
+    def summary(self, start_path):
+        """Словарь для JSON-файла статистики"""
+        used = [i for i, count in enumerate(self.size_files) if count]
+        last_bucket = used[-1] if used else 0
+        return {
+            'start_path': start_path,
+            'scan_time': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.now)),
+            'files': sum(self.size_files),
+            'bytes': sum(self.size_bytes),
+            'extensions': sorted(
+                ({'extension': extension, 'files': files, 'bytes': size, 'disk_bytes': disk_size}
+                 for extension, (files, size, disk_size) in self.extensions.items()),
+                key=lambda item: item['bytes'], reverse=True),
+            'size_buckets': [
+                {'min': 0 if i == 0 else 2 ** (i - 1), 'max': 0 if i == 0 else 2 ** i - 1,
+                 'files': self.size_files[i], 'bytes': self.size_bytes[i]}
+                for i in range(last_bucket + 1)
+            ],
+            'age_buckets': [
+                {'max_days': days, 'label': label, 'files': files, 'bytes': size}
+                for (days, label), files, size in zip(AGE_BUCKETS, self.age_files, self.age_bytes)
+            ],
+        }
+
+    def write(self, path, start_path):
+        """Атомарно записывает статистику в JSON-файл"""
+        # Недекодируемые расширения (суррогаты) записываются как экранирование JSON
+        with atomic_write(path, encoding='utf-8', errors='backslashreplace') as f:
+            json.dump(self.summary(start_path), f, ensure_ascii=False, indent=2)
@@ -0,0 +1,111 @@
+"""Компактное множество просмотренных inode для учета жестких ссылок.
+
+Для каждого устройства inode хранятся в хеш-таблице с открытой адресацией
+поверх array('Q'): 8 байт на ячейку вместо ~100 байт на кортеж
+(st_dev, st_ino) в обычном set. Таблица расширяется вдвое при заполнении
+больше чем наполовину.
+
+Для контрольных точек множество может запоминать добавленные пары
+(track_changes): в журнал пишутся только они, а не таблицы целиком.
+"""
+from array import array
+
+_INITIAL_CAPACITY = 1024
+# Множитель Фибоначчи для перемешивания битов номера inode
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+
+
+class _InodeTable:
+    """Хеш-таблица номеров inode одного устройства (0 - пустая ячейка)"""
+
+    def __init__(self):
+        self.slots = array('Q', bytes(8 * _INITIAL_CAPACITY))
+        self.mask = _INITIAL_CAPACITY - 1
+        self.count = 0
+        self.has_zero = False
+
+    def add(self, ino):
+        if ino == 0:
+            # Ноль занят под маркер пустой ячейки
+            if self.has_zero:
+                return False
+            self.has_zero = True
+            return True
+
+        slots = self.slots
+        mask = self.mask
+        index = ((ino * _HASH_MULTIPLIER) & _MASK64) >> 20 & mask
+        while True:
+            value = slots[index]
+            if value == 0:
+                break
+            if value == ino:
+                return False
+            index = (index + 1) & mask
+
+        slots[index] = ino
+        self.count += 1
+        if self.count * 2 > len(slots):
+            self._grow()
+        return True
+
+    def _grow(self):
+        old_slots = self.slots
+        capacity = len(old_slots) * 2
+        self.slots = array('Q', bytes(8 * capacity))
+        self.mask = capacity - 1
+        self.count = 0
+        for ino in old_slots:
+            if ino:
+                self.add(ino)
+
+
+class InodeSet:
+    """Множество пар (st_dev, st_ino)"""
+
+    JOURNAL_NAME = 'inodes'
+
+    def __init__(self):
+        self._tables = {}
+        # Пары (dev, ino), добавленные после прошлой контрольной точки
+        self._added = None
+
+    def add(self, dev, ino):
+        """Добавляет inode; возвращает False, если он уже встречался"""
+        table = self._tables.get(dev)
+        if table is None:
+            table = self._tables[dev] = _InodeTable()
+        ino &= _MASK64
+        if not table.add(ino):
+            return False
+        if self._added is not None:
+            self._added.append(dev & _MASK64)
+            self._added.append(ino)
+        return True
+
+    def __len__(self):
+        return sum(table.count + table.has_zero for table in self._tables.values())
+
+    def track_changes(self):
+        """Начинает запоминать добавленные пары для journal_changes()"""
+        self._added = array('Q')
+
+    def journal_changes(self):
+        """Пары, добавленные с прошлого вызова, в байтах для журнала контрольных точек"""
+        data = self._added.tobytes()
+        self._added = array('Q')
+        return data
+
+    @classmethod
+    def from_journal(cls, data):
+        """Восстанавливает множество из склеенных результатов journal_changes()"""
+        inode_set = cls()
+        pairs = array('Q', data)
+        for index in range(0, len(pairs), 2):
+            inode_set.add(pairs[index], pairs[index + 1])
+        return inode_set
+
+    def memory_bytes(self):
+        """Размер хеш-таблиц в байтах"""
+        return sum(table.slots.itemsize * len(table.slots) for table in self._tables.values())
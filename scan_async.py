@@ -0,0 +1,265 @@
+"""Асинхронное чтение директорий для сетевых файловых систем с большой задержкой.
+
+На NFS и SMB каждый stat и каждое чтение директории - обращение к серверу,
+и почти все время сканирования уходит на ожидание ответов. В асинхронном
+режиме цикл событий asyncio держит в работе много таких обращений сразу:
+- директории читают max_concurrency корутин, которые берут работу из
+  общего стека (обход в глубину);
+- stat файлов одной директории отправляются все вместе, а не по одному;
+- число одновременных stat ограничивает AdaptiveLimiter: предел растет,
+  пока задержка держится у базового уровня, и уменьшается, когда задержка
+  растет (сервер не успевает), - по схеме AIMD, как окно TCP.
+Системные вызовы блокирующие, поэтому выполняются в пулах потоков, а
+asyncio только планирует их и ограничивает параллелизм.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+
+class AdaptiveLimiter:
+    """Ограничитель одновременных операций с адаптивным пределом (AIMD).
+
+    Задержки усредняются по окнам из max(limit, MIN_WINDOW) операций.
+    Наименьшее среднее считается базовой задержкой (она медленно растет,
+    чтобы пережить смену условий в сети). Если среднее окна больше базовой
+    в tolerance раз, предел умножается на backoff, иначе увеличивается:
+    вдвое до первого снижения (медленный старт), затем на 1.
+    Все методы вызываются из потока цикла событий.
+    """
+
+    MIN_WINDOW = 16
+    # Рост базовой задержки за окно
+    BASELINE_DRIFT = 1.01
+
+    def __init__(self, maximum, minimum=1, tolerance=2.0, backoff=0.7):
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.limit = self.minimum
+        self.in_flight = 0
+        self.baseline = None
+        self.operations = 0
+        self.peak_limit = self.limit
+        self.increases = 0
+        self.decreases = 0
+        self._slow_start = True
+        self._window_count = 0
+        self._window_seconds = 0.0
+        self._waiters = deque()
+
+    async def __aenter__(self):
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return self
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            # Место занимает тот, кто разбудил (см. _wake)
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+    def release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self.in_flight < self.limit:
+            future = self._waiters.popleft()
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+    def observe(self, latency):
+        """Учитывает задержку завершенной операции и при необходимости меняет предел"""
+        self.operations += 1
+        self._window_count += 1
+        self._window_seconds += latency
+        if self._window_count < max(self.limit, self.MIN_WINDOW):
+            return
+
+        average = self._window_seconds / self._window_count
+        self._window_count = 0
+        self._window_seconds = 0.0
+        if self.baseline is None or average < self.baseline:
+            self.baseline = average
+        else:
+            self.baseline *= self.BASELINE_DRIFT
+
+        if average > self.baseline * self.tolerance:
+            self._slow_start = False
+            limit = max(self.minimum, int(self.limit * self.backoff))
+            if limit < self.limit:
+                self.decreases += 1
+        else:
+            limit = min(self.maximum, self.limit * 2 if self._slow_start else self.limit + 1)
+            if limit > self.limit:
+                self.increases += 1
+        self.limit = limit
+        self.peak_limit = max(self.peak_limit, limit)
+        self._wake()
+
+    def summary(self):
+        return {
+            'limit': self.limit,
+            'peak_limit': self.peak_limit,
+            'operations': self.operations,
+            'increases': self.increases,
+            'decreases': self.decreases,
+            'baseline_ms': None if self.baseline is None else round(self.baseline * 1000, 3),
+        }
+
+
+class AsyncTreeReader:
+    """Читает поддеревья директорий в цикле событий в отдельном потоке.
+
+    lister - функция чтения директории с интерфейсом disk_scanner.list_dir,
+    принимающая stat_entries. Запись каждой прочитанной директории
+    (root, files, subdirs, errors) кладется в очередь results до того, как
+    ее поддиректории поступают в чтение, - как у потоков scan_tree_parallel.
+    """
+
+    def __init__(self, lister, max_concurrency, limiter=None):
+        self.lister = lister
+        self.max_concurrency = max(1, max_concurrency)
+        self.limiter = limiter if limiter is not None else AdaptiveLimiter(self.max_concurrency)
+        self._loop = None
+        self._thread = None
+        # Ожидаемые потоками листинга stat'ы: при остановке они отменяются
+        self._stat_futures = set()
+        self._stat_lock = threading.Lock()
+        self._stopped = False
+
+    def start(self, frontier, results):
+        """Запускает чтение frontier и поддеревьев; возвращает функцию stop(wait)"""
+        self._loop = asyncio.new_event_loop()
+        self._list_pool = ThreadPoolExecutor(self.max_concurrency, thread_name_prefix='scan-list')
+        self._stat_pool = ThreadPoolExecutor(self.limiter.maximum, thread_name_prefix='scan-stat')
+        self._main = self._loop.create_task(self._read_tree(frontier, results))
+        self._thread = threading.Thread(target=self._run, name='scan-async', daemon=True)
+        self._thread.start()
+        return self.stop
+
+    def stop(self, wait=True):
+        if self._thread.is_alive():
+            try:
+                self._loop.call_soon_threadsafe(self._main.cancel)
+            except RuntimeError:
+                # Цикл событий уже закрыт
+                pass
+        if wait:
+            self._thread.join()
+
+    def _run(self):
+        loop = self._loop
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(self._main)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            tasks = asyncio.all_tasks(loop)
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            # stat'ы, отправленные в цикл во время остановки, уже не выполнятся
+            with self._stat_lock:
+                self._stopped = True
+                for future in self._stat_futures:
+                    future.cancel()
+            self._list_pool.shutdown(wait=False, cancel_futures=True)
+            self._stat_pool.shutdown(wait=False, cancel_futures=True)
+            loop.close()
+
+    async def _read_tree(self, frontier, results):
+        loop = asyncio.get_running_loop()
+        work = asyncio.LifoQueue()
+        for root in reversed(frontier):
+            work.put_nowait(root)
+
+        async def reader():
+            while True:
+                root = await work.get()
+                record = await loop.run_in_executor(self._list_pool, self._list, root)
+                results.put(record)
+                for dir_path in reversed(record[2]):
+                    work.put_nowait(dir_path)
+                work.task_done()
+
+        readers = [loop.create_task(reader()) for _ in range(self.max_concurrency)]
+        try:
+            await work.join()
+        finally:
+            for task in readers:
+                task.cancel()
+
+    def _list(self, root):
+        # Выполняется в потоке пула листинга
+        try:
+            files, subdirs, errors = self.lister(root, stat_entries=self._stat_entries)
+        except Exception as e:
+            files, subdirs, errors = [], [], [(root, e)]
+        return root, files, subdirs, errors
+
+    def _stat_entries(self, entries):
+        # Вызывается из потока листинга: stat'ы выполняются в цикле событий, поток ждет их все
+        with self._stat_lock:
+            if self._stopped:
+                return [_stat(entry) for entry in entries]
+            future = asyncio.run_coroutine_threadsafe(self._stat_all(entries), self._loop)
+            self._stat_futures.add(future)
+        try:
+            return future.result()
+        except CancelledError:
+            # Сканирование остановлено до выполнения stat'ов
+            return [_stat(entry) for entry in entries]
+        finally:
+            with self._stat_lock:
+                self._stat_futures.discard(future)
+
+    async def _stat_all(self, entries):
+        # Задач не больше максимального предела: директория с миллионами
+        # файлов не создает корутину и future на каждый файл заранее
+        results = [None] * len(entries)
+        indexes = iter(range(len(entries)))
+
+        async def worker():
+            for i in indexes:
+                results[i] = await self._stat(entries[i])
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(min(self.limiter.maximum, len(entries)))]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+        return results
+
+    async def _stat(self, entry):
+        loop = asyncio.get_running_loop()
+        async with self.limiter:
+            st, latency = await loop.run_in_executor(self._stat_pool, _stat, entry)
+        self.limiter.observe(latency)
+        return st, latency
+
+
+def _stat(entry):
+    """stat одного DirEntry: (stat_result или OSError, задержка в секундах)"""
+    started = time.perf_counter()
+    try:
+        st = entry.stat()
+    except OSError as e:
+        st = e
+    return st, time.perf_counter() - started
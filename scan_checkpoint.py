@@ -0,0 +1,136 @@
+"""Контрольные точки сканирования для продолжения после прерывания.
+
+Контрольная точка - JSON-файл рядом с отчетом. В нем хранятся:
+- прочитанные, но еще не записанные в отчет директории (их записи обхода);
+- итоги уже обработанных поддиректорий этих директорий (dir_totals.FIELDS);
+- счетчики статистики и время работы;
+- смещения в байтах, до которых отчет и журнал ошибок согласованы с
+  состоянием обхода (при продолжении файлы обрезаются до них).
+Директории, которые еще не читались, не хранятся: это поддиректории
+сохраненных записей, которых нет среди обработанных.
+
+Файл пишется во временный файл и атомарно заменяет предыдущий, поэтому
+прерывание во время записи не портит последнюю контрольную точку.
+
+Структуры, которые растут со всем просканированным (учтенные inode,
+индекс дерева), в JSON не переписываются: в журнал CheckpointJournal
+дописывается только добавленное с прошлой контрольной точки, а JSON
+хранит смещение, до которого журнал с ним согласован. Поэтому стоимость
+контрольной точки зависит от изменений за интервал, а не от объема
+уже просканированного.
+"""
+import json
+import os
+import struct
+from contextlib import contextmanager
+
+from scan_snapshot import decode_files, encode_files
+
+CHECKPOINT_FORMAT_VERSION = 3
+
+
+def encode_record(record):
+    """Упаковывает запись обхода (root, files, subdirs, errors) для JSON"""
+    root, files, subdirs, errors = record
+    return {
+        'root': root,
+        'files': encode_files(files),
+        'subdirs': subdirs,
+        'errors': [[path, getattr(e, 'errno', None), getattr(e, 'strerror', None) or str(e)]
+                   for path, e in errors],
+    }
+
+
+def decode_record(data):
+    """Восстанавливает запись обхода из JSON"""
+    errors = [(path, OSError(errno, message, path)) for path, errno, message in data['errors']]
+    return data['root'], decode_files(data['files']), data['subdirs'], errors
+
+
+@contextmanager
+def atomic_write(path, mode='w', fsync=False, **options):
+    """Открывает временный файл рядом с path; после записи без ошибок он атомарно заменяет path.
+
+    При fsync=True данные сбрасываются на диск до замены.
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, mode, **options) as f:
+        yield f
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def save_checkpoint(path, state):
+    """Атомарно записывает контрольную точку"""
+    state = dict(state, format_version=CHECKPOINT_FORMAT_VERSION)
+    with atomic_write(path, fsync=True, encoding='utf-8') as f:
+        json.dump(state, f, separators=(',', ':'))
+
+
+def load_checkpoint(path):
+    """Читает контрольную точку; ValueError, если формат не поддерживается"""
+    with open(path, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    if state.get('format_version') != CHECKPOINT_FORMAT_VERSION:
+        raise ValueError(f"Неподдерживаемая версия контрольной точки: {state.get('format_version')}")
+    return state
+
+
+class CheckpointJournal:
+    """Журнал, в который дописываются изменения растущих структур состояния.
+
+    Запись - заголовок RECORD (длина имени, длина данных), имя (ASCII) и
+    данные. Записи с одним именем при чтении склеиваются по порядку.
+    Журнал открывается с согласованного смещения: все, что дописано после
+    последней контрольной точки, отбрасывается.
+    """
+
+    RECORD = struct.Struct('<HQ')
+
+    def __init__(self, path, offset=0):
+        self.path = path
+        self._file = open(path, 'r+b' if offset else 'wb')
+        self._file.truncate(offset)
+        self._file.seek(offset)
+
+    def append(self, name, data):
+        if not data:
+            return
+        encoded = name.encode('ascii')
+        self._file.write(self.RECORD.pack(len(encoded), len(data)))
+        self._file.write(encoded)
+        self._file.write(data)
+
+    def sync(self):
+        """Сбрасывает журнал на диск и возвращает смещение для контрольной точки"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    @classmethod
+    def read(cls, path, offset):
+        """Данные записей до смещения offset: имя -> bytearray"""
+        chunks = {}
+        if not offset:
+            return chunks
+        with open(path, 'rb') as f:
+            while f.tell() < offset:
+                name_length, data_length = cls.RECORD.unpack(f.read(cls.RECORD.size))
+                name = f.read(name_length).decode('ascii')
+                data = f.read(data_length)
+                if len(data) != data_length:
+                    raise ValueError(f"Журнал контрольной точки {path} поврежден")
+                chunks.setdefault(name, bytearray()).extend(data)
+        return chunks
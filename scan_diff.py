@@ -0,0 +1,205 @@
+#python scan_diff.py --old "report_yesterday.csv" --new "report_today.csv" --output "scan_diff.csv" --top-n 20
+"""Сравнение двух отчетов сканера: что появилось, исчезло и изменилось.
+
+Строки отчетов сопоставляются по (Path, Name, Type) партиционированным
+хеш-соединением, чтобы не загружать отчеты целиком:
+1. оба отчета за один проход раскладываются во временные файлы-партиции
+   по хешу Path (строки одной директории попадают в одну партицию);
+2. для каждой партиции старого отчета строится словарь, и по нему
+   проверяются строки той же партиции нового отчета.
+В памяти одновременно находится только одна партиция старого отчета.
+
+Изменения размеров директорий точные: строки директорий содержат размер
+всего поддерева. Файлы сравниваются только те, что попали в отчеты
+(не меньше --min-size сканера), поэтому файл, переросший порог, будет
+показан как добавленный.
+"""
+import argparse
+import csv
+import heapq
+import os
+import tempfile
+import time
+import zlib
+
+from scan_output import is_parquet, open_report_text
+
+DIFF_COLUMNS = ['Status', 'Type', 'Path', 'Name', 'OldSize', 'NewSize', 'Delta']
+
+# Число партиций по умолчанию: размер словаря - примерно 1/64 старого отчета
+DEFAULT_PARTITIONS = 64
+
+
+def iter_report_rows(input_file):
+    """Возвращает (Path, Name, Type, Size) для всех строк отчета сканера (CSV, в том числе сжатого, или Parquet)"""
+    if is_parquet(input_file):
+        import pyarrow.parquet as pq
+        columns = ['Path', 'Name', 'Type', 'Size']
+        for batch in pq.ParquetFile(input_file).iter_batches(columns=columns):
+            for path, name, item_type, size in zip(*(batch.column(c).to_pylist() for c in columns)):
+                yield path or "", name, item_type, size
+        return
+
+    with open_report_text(input_file) as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        path_i, name_i, type_i, size_i = (header.index(c) for c in ('Path', 'Name', 'Type', 'Size'))
+        for row in reader:
+            yield row[path_i], row[name_i], row[type_i], int(row[size_i])
+
+
+def _partition(input_file, directory, prefix, partitions):
+    """Раскладывает строки отчета по файлам-партициям; возвращает их пути"""
+    paths = [os.path.join(directory, f"{prefix}_{i}.csv") for i in range(partitions)]
+    files = [open(path, 'w', newline='', encoding='utf-8', errors='surrogateescape') for path in paths]
+    try:
+        writers = [csv.writer(f) for f in files]
+        for path, name, item_type, size in iter_report_rows(input_file):
+            part = zlib.crc32(path.encode('utf-8', 'surrogateescape')) % partitions
+            writers[part].writerow((path, name, item_type, size))
+    finally:
+        for f in files:
+            f.close()
+    return paths
+
+
+def _read_partition(path):
+    with open(path, newline='', encoding='utf-8', errors='surrogateescape') as f:
+        for row_path, name, item_type, size in csv.reader(f):
+            yield row_path, name, item_type, int(size)
+
+
+class ScanDiff:
+    """Сравнение двух отчетов со статистикой и топами роста"""
+
+    def __init__(self, top_n=20, partitions=DEFAULT_PARTITIONS, temp_dir=None):
+        self.top_n = top_n
+        self.partitions = partitions
+        self.temp_dir = temp_dir
+        self.stats = {
+            'old_rows': 0,
+            'new_rows': 0,
+            'added_files': 0,
+            'removed_files': 0,
+            'resized_files': 0,
+            'added_dirs': 0,
+            'removed_dirs': 0,
+            'resized_dirs': 0,
+            'added_bytes': 0,
+            'removed_bytes': 0,
+        }
+        # Корень сканирования: строка директории с пустым Path
+        self.root = None
+        # Топы по изменению размера: кучи (delta, путь) ограниченного размера
+        self.top_dirs = []
+        self.top_files = []
+
+    def _push_top(self, heap, delta, item):
+        if len(heap) < self.top_n:
+            heapq.heappush(heap, (delta, item))
+        elif delta > heap[0][0]:
+            heapq.heapreplace(heap, (delta, item))
+
+    def _record(self, status, item_type, path, name, old_size, new_size):
+        kind = 'files' if item_type == 'file' else 'dirs'
+        self.stats[f"{status}_{kind}"] += 1
+        delta = new_size - old_size
+        if item_type == 'file':
+            if delta > 0:
+                self.stats['added_bytes'] += delta
+            else:
+                self.stats['removed_bytes'] -= delta
+        if path == "":
+            self.root = (name, old_size, new_size)
+        elif delta > 0:
+            self._push_top(self.top_dirs if item_type == 'dir' else self.top_files, delta,
+                           (status, path, name, old_size, new_size))
+        return (status, item_type, path, name, old_size, new_size, delta)
+
+    def iter_changes(self, old_file, new_file):
+        """Возвращает строки изменений в формате DIFF_COLUMNS"""
+        with tempfile.TemporaryDirectory(prefix='scan_diff_', dir=self.temp_dir) as tmp:
+            old_parts = _partition(old_file, tmp, 'old', self.partitions)
+            new_parts = _partition(new_file, tmp, 'new', self.partitions)
+
+            for old_part, new_part in zip(old_parts, new_parts):
+                old_rows = {}
+                for path, name, item_type, size in _read_partition(old_part):
+                    old_rows[(path, name, item_type)] = size
+                self.stats['old_rows'] += len(old_rows)
+                os.remove(old_part)
+
+                for path, name, item_type, size in _read_partition(new_part):
+                    self.stats['new_rows'] += 1
+                    old_size = old_rows.pop((path, name, item_type), None)
+                    if old_size is None:
+                        yield self._record('added', item_type, path, name, 0, size)
+                    elif old_size != size:
+                        yield self._record('resized', item_type, path, name, old_size, size)
+                os.remove(new_part)
+
+                for (path, name, item_type), size in old_rows.items():
+                    yield self._record('removed', item_type, path, name, size, 0)
+
+    def top(self, heap):
+        """Топ роста по убыванию: (delta, status, path, name, old_size, new_size)"""
+        return [(delta,) + item for delta, item in sorted(heap, reverse=True)]
+
+
+def write_diff_report(changes, output_file):
+    """Записывает изменения в CSV; возвращает число строк"""
+    count = 0
+    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(DIFF_COLUMNS)
+        for change in changes:
+            writer.writerow(change)
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Сравнение двух отчетов сканера: рост и изменения',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument('--old', required=True, help='Предыдущий отчет сканера (CSV, CSV.gz, CSV.zst или Parquet)')
+    parser.add_argument('--new', required=True, help='Новый отчет сканера (CSV, CSV.gz, CSV.zst или Parquet)')
+    parser.add_argument('--output', default='scan_diff.csv', help='Выходной CSV с изменениями')
+    parser.add_argument('--top-n', type=int, default=20, help='Количество элементов в топах роста')
+    parser.add_argument('--partitions', type=int, default=DEFAULT_PARTITIONS,
+                        help='Число партиций хеш-соединения (больше - меньше памяти)')
+    parser.add_argument('--temp-dir', help='Директория для временных партиций')
+    args = parser.parse_args()
+
+    diff = ScanDiff(top_n=args.top_n, partitions=args.partitions, temp_dir=args.temp_dir)
+    start_time = time.time()
+    changes = write_diff_report(diff.iter_changes(args.old, args.new), args.output)
+    elapsed = time.time() - start_time
+
+    stats = diff.stats
+    print(f"{'='*80}")
+    print(f"Сравнение завершено за {elapsed:.1f} секунд")
+    print(f"Строк в отчетах: {stats['old_rows']} -> {stats['new_rows']}, изменений: {changes}")
+    if diff.root is not None:
+        name, old_size, new_size = diff.root
+        print(f"Размер {name}: {old_size / 1024**3:.2f} ГБ -> {new_size / 1024**3:.2f} ГБ "
+              f"({(new_size - old_size) / 1024**3:+.2f} ГБ)")
+    print(f"Файлов добавлено: {stats['added_files']}, удалено: {stats['removed_files']}, "
+          f"изменено: {stats['resized_files']}")
+    print(f"Директорий добавлено: {stats['added_dirs']}, удалено: {stats['removed_dirs']}, "
+          f"изменено: {stats['resized_dirs']}")
+    print(f"Рост файлов из отчета: +{stats['added_bytes'] / 1024**3:.2f} ГБ, "
+          f"-{stats['removed_bytes'] / 1024**3:.2f} ГБ")
+    for title, heap in (('ДИРЕКТОРИЙ', diff.top_dirs), ('ФАЙЛОВ', diff.top_files)):
+        print(f"{'='*80}")
+        print(f"ТОП-{args.top_n} {title} ПО РОСТУ:")
+        for i, (delta, status, path, name, old_size, new_size) in enumerate(diff.top(heap), 1):
+            print(f"{i}. {os.path.join(path, name)} - +{delta / 1024**2:.2f} МБ "
+                  f"({old_size / 1024**2:.2f} -> {new_size / 1024**2:.2f} МБ, {status})")
+    print(f"{'='*80}")
+    print(f"Изменения сохранены в: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
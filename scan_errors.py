@@ -0,0 +1,143 @@
+"""Журнал ошибок сканирования с ограниченной стоимостью записи.
+
+На системных томах отказов в доступе бывают сотни тысяч, и полная запись
+каждого (traceback и сброс файла) заметно замедляет сканирование.
+ErrorLog поддерживает два режима:
+- full - как раньше: сообщение, тип, текст и traceback каждой ошибки;
+- aggregate - ошибки группируются по (вид, директория, тип, errno) и
+  только считаются. Полная запись с traceback делается для первых
+  samples ошибок каждого вида и типа, а затем не чаще одной за
+  sample_interval секунд. В конце сканирования пишется сводка групп по
+  убыванию числа ошибок с примером пути и текста.
+В обоих режимах файл сбрасывается на диск не чаще раза в flush_seconds
+секунд (и при контрольной точке), а не после каждой ошибки.
+"""
+import os
+import time
+import traceback
+
+ERROR_LOG_MODES = ('full', 'aggregate')
+
+# Больше групп не храним: новые группы объединяются по виду и типу ошибки
+MAX_GROUPS = 10000
+OTHER_DIRECTORIES = '*'
+
+SEPARATOR = "\n" + "-" * 80 + "\n\n"
+
+
+def error_type(exception):
+    """Тип ошибки для группировки: имя класса и errno, если есть"""
+    errno = getattr(exception, 'errno', None)
+    name = type(exception).__name__
+    return name if errno is None else f"{name}[errno {errno}]"
+
+
+class ErrorLog:
+    """Запись ошибок в открытый текстовый файл в режиме full или aggregate"""
+
+    def __init__(self, file, mode='full', samples=3, sample_interval=60.0, flush_seconds=5.0):
+        if mode not in ERROR_LOG_MODES:
+            raise ValueError(f"Неизвестный режим журнала ошибок: {mode}")
+        self._file = file
+        self.mode = mode
+        self.samples = samples
+        self.sample_interval = sample_interval
+        self.flush_seconds = flush_seconds
+        # (вид, директория, тип) -> [число, пример пути, пример текста]
+        self.groups = {}
+        # (вид, тип) -> [записано полностью, время последней полной записи]
+        self._sampled = {}
+        self.errors = 0
+        self.suppressed = 0
+        self._last_flush = time.monotonic()
+
+    def log(self, kind, path, exception=None):
+        """Учитывает ошибку вида kind ("Ошибка доступа к файлу") для пути path"""
+        self.errors += 1
+        if self.mode == 'full' or exception is None:
+            self._write_entry(kind, path, exception)
+            return
+        type_name = error_type(exception)
+        key = (kind, os.path.dirname(path), type_name)
+        group = self.groups.get(key)
+        if group is None:
+            if len(self.groups) >= MAX_GROUPS:
+                key = (kind, OTHER_DIRECTORIES, type_name)
+                group = self.groups.get(key)
+            if group is None:
+                group = self.groups[key] = [0, path, str(exception)]
+        group[0] += 1
+
+        now = time.monotonic()
+        sampled = self._sampled.get((kind, type_name))
+        if sampled is None:
+            sampled = self._sampled[(kind, type_name)] = [0, None]
+        if sampled[0] < self.samples or (self.sample_interval > 0
+                                         and now - sampled[1] >= self.sample_interval):
+            sampled[0] += 1
+            sampled[1] = now
+            self._write_entry(kind, path, exception)
+        else:
+            self.suppressed += 1
+            self._maybe_flush(now)
+
+    def _write_entry(self, kind, path, exception):
+        write = self._file.write
+        write(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {kind}: {path}\n")
+        if exception:
+            write(f"Error type: {type(exception).__name__}\n")
+            write(f"Message: {str(exception)}\n")
+            write("Traceback:\n")
+            write(''.join(traceback.format_exception(type(exception), exception, exception.__traceback__)))
+        write(SEPARATOR)
+        self._maybe_flush(time.monotonic())
+
+    def _maybe_flush(self, now):
+        if now - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        self._file.flush()
+        self._last_flush = time.monotonic()
+
+    def top_groups(self, count=None):
+        """Группы (число, вид, директория, тип, пример пути, пример текста) по убыванию числа"""
+        items = sorted(((group[0], kind, directory, type_name, group[1], group[2])
+                        for (kind, directory, type_name), group in self.groups.items()),
+                       key=lambda item: item[0], reverse=True)
+        return items if count is None else items[:count]
+
+    def write_summary(self):
+        """Дописывает в журнал сводку групп ошибок (режим aggregate)"""
+        if self.mode != 'aggregate' or not self.groups:
+            self.flush()
+            return
+        write = self._file.write
+        write("=" * 80 + "\n")
+        write(f"Error summary: {self.errors} errors in {len(self.groups)} groups, "
+              f"{self.suppressed} without traceback\n")
+        write("=" * 80 + "\n")
+        for count, kind, directory, type_name, path, message in self.top_groups():
+            write(f"{count:>10}  {type_name}  {kind}  in {directory}\n")
+            write(f"{'':>10}  example: {path}: {message}\n")
+        self.flush()
+
+    def to_state(self):
+        """Состояние для сохранения в JSON (контрольные точки)"""
+        return {
+            'errors': self.errors,
+            'suppressed': self.suppressed,
+            'groups': [[kind, directory, type_name, *group]
+                       for (kind, directory, type_name), group in self.groups.items()],
+            'sampled': [[kind, type_name, count] for (kind, type_name), (count, last) in self._sampled.items()],
+        }
+
+    def restore_state(self, state):
+        """Восстанавливает счетчики из результата to_state()"""
+        self.errors = state['errors']
+        self.suppressed = state['suppressed']
+        self.groups = {(kind, directory, type_name): [count, path, message]
+                       for kind, directory, type_name, count, path, message in state['groups']}
+        # Время последней полной записи не сохраняется: интервал отсчитывается заново
+        now = time.monotonic()
+        self._sampled = {(kind, type_name): [count, now] for kind, type_name, count in state['sampled']}
@@ -0,0 +1,138 @@
+"""Правила исключения для сканирования.
+
+Правила задаются в конфигурации и один раз компилируются в ScanFilter:
+- exclude - glob-шаблоны; шаблон без разделителя пути сравнивается с именем
+  ("node_modules", "*.tmp"), с разделителем - с полным путем ("/proc",
+  "*/.git/objects");
+- exclude_regex - регулярные выражения, которые ищутся в полном пути;
+- one_file_system - не переходить на другие файловые системы (st_dev
+  поддиректории отличается от st_dev начальной директории);
+- max_depth - не спускаться глубже заданного числа уровней (0 - только
+  начальная директория);
+- include_extensions / exclude_extensions - списки расширений файлов
+  (без точки, "" - файлы без расширения).
+
+Исключенная директория отбрасывается при чтении родителя, поэтому ее
+поддерево не читается совсем. Исключенные файлы не попадают ни в отчет,
+ни в размеры директорий.
+"""
+import fnmatch
+import os
+import re
+import threading
+
+# Имена в Windows не различают регистр
+_FLAGS = re.IGNORECASE if os.name == 'nt' else 0
+
+
+def _compile_globs(patterns):
+    if not patterns:
+        return None
+    return re.compile('|'.join(f"(?:{fnmatch.translate(pattern)})" for pattern in patterns), _FLAGS)
+
+
+def _normalize_extensions(extensions):
+    return frozenset(extension.lower().lstrip('.') for extension in extensions)
+
+
+def file_extension(name):
+    """Расширение файла без точки в нижнем регистре ("" - нет расширения)"""
+    return os.path.splitext(name)[1][1:].lower()
+
+
+class ScanFilter:
+    """Скомпилированные правила исключения для обхода от start_path"""
+
+    def __init__(self, start_path, exclude=(), exclude_regex=(), one_file_system=False, max_depth=None,
+                 include_extensions=(), exclude_extensions=()):
+        self.start_path = start_path
+        self.rules = {
+            'exclude': list(exclude),
+            'exclude_regex': list(exclude_regex),
+            'one_file_system': one_file_system,
+            'max_depth': max_depth,
+            'include_extensions': sorted(_normalize_extensions(include_extensions)),
+            'exclude_extensions': sorted(_normalize_extensions(exclude_extensions)),
+        }
+
+        separators = (os.sep, os.altsep) if os.altsep else (os.sep,)
+        # Шаблоны с разделителем сравниваются с путем, где разделитель всегда "/"
+        self._name_globs = _compile_globs([p for p in exclude if not any(s in p for s in separators)])
+        self._path_globs = _compile_globs([p.replace(os.sep, '/') for p in exclude
+                                           if any(s in p for s in separators)])
+        self._regex = re.compile('|'.join(f"(?:{pattern})" for pattern in exclude_regex), _FLAGS) \
+            if exclude_regex else None
+        self._include_extensions = _normalize_extensions(include_extensions) or None
+        self._exclude_extensions = _normalize_extensions(exclude_extensions)
+        self._max_depth = max_depth
+        self._root_dev = os.stat(start_path).st_dev if one_file_system else None
+        self._prefix_len = len(start_path.rstrip(''.join(separators)))
+        self._check_files = bool(self._name_globs or self._path_globs or self._regex
+                                 or self._include_extensions is not None or self._exclude_extensions)
+
+        self._lock = threading.Lock()
+        self.stats = {'pruned_dirs': 0, 'excluded_files': 0, 'excluded_bytes': 0}
+
+    @classmethod
+    def from_config(cls, start_path, config):
+        """Создает фильтр по ключам конфигурации; None, если правил нет"""
+        scan_filter = cls(
+            start_path,
+            exclude=config.get('exclude') or (),
+            exclude_regex=config.get('exclude_regex') or (),
+            one_file_system=config.get('one_file_system', False),
+            max_depth=config.get('max_depth'),
+            include_extensions=config.get('include_extensions') or (),
+            exclude_extensions=config.get('exclude_extensions') or (),
+        )
+        return scan_filter if scan_filter.active else None
+
+    @property
+    def active(self):
+        return self._check_files or self._root_dev is not None or self._max_depth is not None
+
+    def _path_excluded(self, name, path):
+        if self._name_globs is not None and self._name_globs.match(name):
+            return True
+        if self._path_globs is not None and self._path_globs.match(path.replace(os.sep, '/')):
+            return True
+        return self._regex is not None and self._regex.search(path) is not None
+
+    def exclude_dir(self, path, name):
+        """Нужно ли отбросить поддиректорию вместе с ее поддеревом"""
+        excluded = self._path_excluded(name, path)
+        if not excluded and self._max_depth is not None:
+            excluded = path.count(os.sep, self._prefix_len) > self._max_depth
+        if not excluded and self._root_dev is not None:
+            # lstat, а не DirEntry.stat(): в Windows тот не заполняет st_dev
+            try:
+                excluded = os.lstat(path).st_dev != self._root_dev
+            except OSError:
+                excluded = False
+        if excluded:
+            with self._lock:
+                self.stats['pruned_dirs'] += 1
+        return excluded
+
+    def exclude_file(self, root, name, st):
+        """Нужно ли исключить файл (по шаблонам и спискам расширений)"""
+        if not self._check_files:
+            return False
+        extension = file_extension(name)
+        excluded = (
+            (self._include_extensions is not None and extension not in self._include_extensions)
+            or extension in self._exclude_extensions
+            or ((self._name_globs is not None or self._path_globs is not None or self._regex is not None)
+                and self._path_excluded(name, os.path.join(root, name)))
+        )
+        if excluded:
+            with self._lock:
+                self.stats['excluded_files'] += 1
+                self.stats['excluded_bytes'] += st.st_size
+        return excluded
+
+    def apply(self, root, files, subdirs):
+        """Применяет правила к уже прочитанной директории (например, из снимка)"""
+        files = [(name, st) for name, st in files if not self.exclude_file(root, name, st)]
+        subdirs = [path for path in subdirs if not self.exclude_dir(path, os.path.basename(path))]
+        return files, subdirs
@@ -0,0 +1,167 @@
+"""Метрики сканирования: время по фазам, задержки stat и скорость по поддеревьям.
+
+ScanMetrics собирает:
+- время по фазам (суммарно по всем потокам, поэтому при нескольких потоках
+  обхода может превышать общее время): listing (чтение директорий без stat), stat, filter
+  (правила исключения), wait (ожидание следующей директории потоком
+  записи), write (передача строк в объект вывода), write_background
+  (форматирование и запись в файл фоновым потоком), error_log;
+- гистограмму задержек stat по степеням двойки в микросекундах;
+- по каждой директории верхнего уровня: директории, файлы, байты и время
+  чтения - чтобы находить медленные точки монтирования.
+Листинг выполняется в потоках обхода, поэтому данные одной директории
+накапливаются локально и добавляются под блокировкой один раз.
+
+Снимки метрик пишутся в файл JSON Lines: по одному объекту на строку,
+последний - с "final": true.
+"""
+import json
+import os
+import threading
+import time
+
+PHASES = ('listing', 'stat', 'filter', 'wait', 'write', 'write_background', 'error_log')
+
+# Верхняя граница корзин гистограммы stat: 2**26 мкс (~67 с)
+STAT_LATENCY_BUCKETS = 27
+
+
+def latency_bucket(seconds):
+    """Номер корзины гистограммы: задержка меньше 2**i мкс"""
+    micros = int(seconds * 1_000_000)
+    return min(micros.bit_length(), STAT_LATENCY_BUCKETS - 1)
+
+
+class ScanMetrics:
+    """Потокобезопасный накопитель метрик одного сканирования"""
+
+    def __init__(self, start_path):
+        self.start_path = start_path
+        self.start_time = time.time()
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.stat_latency = [0] * STAT_LATENCY_BUCKETS
+        self.top_dirs = {}
+        self._prefix_len = len(start_path.rstrip(os.sep))
+        self._lock = threading.Lock()
+
+    def top_level(self, path):
+        """Имя директории верхнего уровня, к которой относится path ("." - сам корень)"""
+        return path[self._prefix_len:].lstrip(os.sep).split(os.sep, 1)[0] or "."
+
+    def add_time(self, phase, seconds):
+        with self._lock:
+            self.phases[phase] += seconds
+
+    def set_time(self, phase, seconds):
+        """Задает время фазы, которое считается вне ScanMetrics (поток записи отчета)"""
+        with self._lock:
+            self.phases[phase] = seconds
+
+    def timed(self, iterable, phase):
+        """Итерирует iterable, добавляя время получения каждого элемента к фазе"""
+        iterator = iter(iterable)
+        clock = time.perf_counter
+        try:
+            while True:
+                started = clock()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                self.add_time(phase, clock() - started)
+                yield item
+        finally:
+            # Закрываем исходный генератор сразу, а не при сборке мусора
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                close()
+
+    def record_listing(self, root, elapsed, stat_latencies, filter_seconds, stat_seconds=None):
+        """Учитывает чтение одной директории (elapsed - полное время list_dir).
+
+        stat_seconds - время ожидания stat'ов, если они выполнялись
+        параллельно (асинхронный режим): сумма задержек тогда больше
+        реального времени. По умолчанию - сумма stat_latencies.
+        """
+        if stat_seconds is None:
+            stat_seconds = sum(stat_latencies)
+        buckets = [latency_bucket(latency) for latency in stat_latencies]
+        top = self.top_level(root)
+        with self._lock:
+            self.phases['listing'] += elapsed - stat_seconds - filter_seconds
+            self.phases['stat'] += stat_seconds
+            self.phases['filter'] += filter_seconds
+            for bucket in buckets:
+                self.stat_latency[bucket] += 1
+            entry = self.top_dirs.get(top)
+            if entry is None:
+                entry = self.top_dirs[top] = {'dirs': 0, 'files': 0, 'bytes': 0, 'seconds': 0.0}
+            entry['seconds'] += elapsed
+
+    def record_dir(self, root, files_count, files_size):
+        """Учитывает обработанную директорию и ее файлы"""
+        top = self.top_level(root)
+        with self._lock:
+            entry = self.top_dirs.get(top)
+            if entry is None:
+                entry = self.top_dirs[top] = {'dirs': 0, 'files': 0, 'bytes': 0, 'seconds': 0.0}
+            entry['dirs'] += 1
+            entry['files'] += files_count
+            entry['bytes'] += files_size
+
+    def snapshot(self, stats=None, final=False):
+        """Текущее состояние метрик в виде словаря для JSON"""
+        elapsed = time.time() - self.start_time
+        with self._lock:
+            top_dirs = {
+                name: dict(entry, files_per_second=entry['files'] / entry['seconds'] if entry['seconds'] else None)
+                for name, entry in self.top_dirs.items()
+            }
+            record = {
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'elapsed': round(elapsed, 3),
+                'final': final,
+                'phases': {phase: round(seconds, 6) for phase, seconds in self.phases.items()},
+                # Ключ - верхняя граница корзины в микросекундах (не включая ее)
+                'stat_latency_us': {str(2 ** i): count
+                                    for i, count in enumerate(self.stat_latency) if count},
+                'top_dirs': top_dirs,
+            }
+        if stats is not None:
+            record['stats'] = {key: value for key, value in stats.items() if key != 'start_time'}
+        return record
+
+    def slowest_top_dirs(self, count=5):
+        """Директории верхнего уровня с наибольшим временем чтения"""
+        with self._lock:
+            items = sorted(self.top_dirs.items(), key=lambda item: item[1]['seconds'], reverse=True)
+        return items[:count]
+
+
+class MetricsWriter:
+    """Периодическая запись снимков метрик в файл JSON Lines"""
+
+    def __init__(self, path, metrics, interval=10, append=False):
+        self.metrics = metrics
+        self.interval = interval
+        self._file = open(path, 'a' if append else 'w', encoding='utf-8')
+        self._last_write = time.time()
+
+    def maybe_write(self, stats):
+        if time.time() - self._last_write >= self.interval:
+            self.write(stats)
+
+    def write(self, stats, final=False):
+        self._file.write(json.dumps(self.metrics.snapshot(stats, final), ensure_ascii=False) + "\n")
+        self._file.flush()
+        self._last_write = time.time()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -0,0 +1,502 @@
+"""Форматы вывода результатов сканирования.
+
+Сканер пишет строки отчета через объект вывода с методами write_row,
+flush и close. Поддерживаются CSV (по умолчанию) и Parquet (нужен пакет
+pyarrow): в Parquet размер хранится как int64, даты - как timestamp,
+а колонки Path, Type и Extension кодируются словарем.
+
+Для файлов и директорий пишутся два размера: видимый (Size) и занятое на
+диске место (DiskSize), которое учитывает разреженные файлы.
+
+write_row только добавляет строку в пакет; заполненные пакеты
+форматируются и пишутся фоновым потоком, поэтому сканер не ждет диск.
+Буфер файла сбрасывается по объему записанных данных или по времени
+(flush_seconds <= 0 - только по объему).
+
+CSV можно сжимать потоково (gzip или zstd - нужен пакет zstandard): сжатие
+выполняется тем же фоновым потоком. На каждой контрольной точке текущий
+член gzip (кадр zstd) завершается, поэтому отчет можно обрезать по
+сохраненному смещению и продолжить новым членом. open_report открывает
+отчет для чтения с распаковкой по сигнатуре файла.
+"""
+import csv
+import gzip
+import io
+import os
+import queue
+import threading
+import time
+
+# Size - видимый размер (st_size), DiskSize - занятое на диске место (st_blocks * 512)
+REPORT_COLUMNS = ['Path', 'Name', 'Type', 'Size', 'Extension', 'DateTimeCreate', 'DateTimeLastModification',
+                  'DiskSize']
+
+# Параметры записи по умолчанию
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_FLUSH_BYTES = 8 * 1024 * 1024
+DEFAULT_FLUSH_SECONDS = 5.0
+
+# Сколько пакетов может ждать записи, прежде чем сканер остановится на write_row
+MAX_QUEUED_BATCHES = 8
+
+# 'text' - дата в локальном времени, как раньше; 'epoch' - целые секунды эпохи
+TIMESTAMP_FORMATS = ('text', 'epoch')
+
+# Сжатие отчета; 'auto' - по расширению файла (.gz, .zst)
+COMPRESSIONS = ('none', 'gzip', 'zstd')
+COMPRESSION_EXTENSIONS = {'.gz': 'gzip', '.gzip': 'gzip', '.zst': 'zstd', '.zstd': 'zstd'}
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+PARQUET_MAGIC = b'PAR1'
+
+
+def format_timestamp(timestamp):
+    """Форматирует время эпохи так же, как исторически в CSV-отчете"""
+    if timestamp is None:
+        return ""
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))
+
+
+class TimestampFormatter:
+    """format_timestamp с кэшем.
+
+    Даты файлов сильно повторяются (распаковка архива, копирование), поэтому
+    готовые строки кэшируются по секундам, а localtime и strftime
+    вызываются один раз на минуту: секунды подставляются в готовый префикс.
+    """
+
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self._seconds = {}
+        self._minutes = {}
+
+    def __call__(self, timestamp):
+        if timestamp is None:
+            return ""
+        if timestamp < 0:
+            return format_timestamp(timestamp)
+        seconds = int(timestamp)
+        text = self._seconds.get(seconds)
+        if text is None:
+            if len(self._seconds) >= self.max_entries:
+                self._seconds.clear()
+                self._minutes.clear()
+            text = self._seconds[seconds] = self._format(seconds)
+        return text
+
+    def _format(self, seconds):
+        minute, second = divmod(seconds, 60)
+        cached = self._minutes.get(minute)
+        if cached is None:
+            local = time.localtime(minute * 60)
+            cached = self._minutes[minute] = (time.strftime('%Y-%m-%d %H:%M:', local), local.tm_sec)
+        prefix, base_second = cached
+        if base_second + second >= 60:
+            # Смещение пояса не кратно минуте (старые даты) - считаем без кэша
+            return format_timestamp(seconds)
+        return f"{prefix}{base_second + second:02d}"
+
+
+class CompressedStream:
+    """Потоковое сжатие в открытый двоичный файл.
+
+    end_frame завершает текущий член gzip (кадр zstd): данные до
+    этого места образуют корректный сжатый файл. Методы вызываются из
+    потока записи и из потока сканера (tell), поэтому защищены блокировкой.
+    """
+
+    def __init__(self, raw, compression, level=None):
+        if compression not in ('gzip', 'zstd'):
+            raise ValueError(f"Неизвестное сжатие: {compression}")
+        self._raw = raw
+        self.compression = compression
+        self._lock = threading.Lock()
+        self._stream = None
+        if compression == 'zstd':
+            try:
+                import zstandard
+            except ImportError as e:
+                raise ImportError("Для сжатия zstd установите пакет zstandard") from e
+            self._zstd = zstandard
+            self._compressor = zstandard.ZstdCompressor(level=level or 3)
+        else:
+            self._level = level or 6
+
+    def _open_frame(self):
+        if self.compression == 'gzip':
+            # mtime=0 и пустое имя: одинаковые данные дают одинаковый файл
+            return gzip.GzipFile(filename='', mode='wb', fileobj=self._raw, compresslevel=self._level, mtime=0)
+        return self._compressor.stream_writer(self._raw, closefd=False)
+
+    def write(self, data):
+        with self._lock:
+            if self._stream is None:
+                self._stream = self._open_frame()
+            self._stream.write(data)
+
+    def flush(self):
+        with self._lock:
+            if self._stream is not None:
+                if self.compression == 'gzip':
+                    self._stream.flush()
+                else:
+                    self._stream.flush(self._zstd.FLUSH_BLOCK)
+            self._raw.flush()
+
+    def end_frame(self):
+        with self._lock:
+            if self._stream is not None:
+                # GzipFile и stream_writer(closefd=False) не закрывают исходный файл
+                self._stream.close()
+                self._stream = None
+            self._raw.flush()
+
+    def tell(self):
+        """Смещение в сжатом файле после завершения текущего кадра"""
+        self.end_frame()
+        return self._raw.tell()
+
+    def close(self):
+        try:
+            self.end_frame()
+        finally:
+            self._raw.close()
+
+
+def escape_surrogates(value):
+    """Имя с недекодируемыми байтами (суррогаты из surrogateescape) -> строка UTF-8 с \\xNN"""
+    if value is None:
+        return None
+    return value.encode('utf-8', 'surrogateescape').decode('utf-8', 'backslashreplace')
+
+
+class ReportOutput:
+    """Базовый класс вывода: строки отчета передаются с датами в секундах эпохи.
+
+    Подклассы реализуют _write_rows (запись пакета, возвращает число байт),
+    _flush_file, _tell и _close_file; первые два вызываются из потока записи.
+    """
+
+    # Можно ли продолжить запись с сохраненного смещения (контрольные точки)
+    supports_resume = False
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, flush_bytes=DEFAULT_FLUSH_BYTES,
+                 flush_seconds=DEFAULT_FLUSH_SECONDS):
+        self.batch_size = max(1, batch_size)
+        self.flush_bytes = flush_bytes
+        self.flush_seconds = flush_seconds
+        # Время форматирования и записи пакетов в потоке записи (для метрик)
+        self.write_seconds = 0.0
+        self._rows = []
+        self._queue = queue.Queue(maxsize=MAX_QUEUED_BATCHES)
+        self._error = None
+        self._unflushed_bytes = 0
+        self._last_flush = time.monotonic()
+        self._thread = threading.Thread(target=self._writer_loop, name='report-writer', daemon=True)
+        self._thread.start()
+
+    def write_row(self, path, name, item_type, size, extension="", creation_time=None, modification_time=None,
+                  disk_size=None):
+        self._rows.append((path, name, item_type, size, extension, creation_time, modification_time, disk_size))
+        if len(self._rows) >= self.batch_size:
+            self._submit()
+
+    def _submit(self):
+        if self._rows:
+            self._queue.put(self._rows)
+            self._rows = []
+        self._raise_writer_error()
+
+    def _raise_writer_error(self):
+        # Ошибка потока записи передается сканеру при следующем обращении
+        error = self._error
+        if error is not None:
+            self._error = None
+            raise error
+
+    def _writer_loop(self):
+        # flush_seconds <= 0 отключает сброс по времени: ждем строки без таймаута,
+        # иначе get(timeout=0) крутится в цикле и занимает процессор
+        timeout = self.flush_seconds if self.flush_seconds > 0 else None
+        while True:
+            try:
+                rows = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                # Новых строк давно нет: сбрасываем на диск то, что уже записано
+                if self._unflushed_bytes:
+                    self._flush_now()
+                continue
+            try:
+                if rows is None:
+                    return
+                started = time.perf_counter()
+                self._unflushed_bytes += self._write_rows(rows)
+                if (self._unflushed_bytes >= self.flush_bytes
+                        or (timeout is not None and time.monotonic() - self._last_flush >= timeout)):
+                    self._flush_now()
+                self.write_seconds += time.perf_counter() - started
+            except Exception as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _flush_now(self):
+        self._flush_file()
+        self._unflushed_bytes = 0
+        self._last_flush = time.monotonic()
+
+    def _drain(self):
+        """Дожидается записи всех переданных строк"""
+        self._submit()
+        self._queue.join()
+        self._raise_writer_error()
+
+    def flush(self):
+        self._drain()
+        self._flush_now()
+
+    def tell(self):
+        """Смещение в байтах, до которого данные записаны в файл"""
+        self.flush()
+        return self._tell()
+
+    def close(self):
+        try:
+            self._drain()
+        finally:
+            self._queue.put(None)
+            self._thread.join()
+            self._close_file()
+
+    def _write_rows(self, rows):
+        raise NotImplementedError
+
+    def _flush_file(self):
+        pass
+
+    def _tell(self):
+        raise NotImplementedError
+
+    def _close_file(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class CsvOutput(ReportOutput):
+    """Вывод в CSV: размеры записываются текстом, даты - текстом или секундами эпохи.
+
+    compression - 'none', 'gzip' или 'zstd'; compression_level - уровень
+    сжатия (None - по умолчанию: 6 для gzip, 3 для zstd).
+    """
+
+    supports_resume = True
+
+    def __init__(self, path, resume_offset=None, timestamp_format='text', compression='none',
+                 compression_level=None, **options):
+        if timestamp_format not in TIMESTAMP_FORMATS:
+            raise ValueError(f"Неизвестный формат дат: {timestamp_format}")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Неизвестное сжатие: {compression}")
+        self.path = path
+        self._format_time = TimestampFormatter() if timestamp_format == 'text' else self._epoch
+        # Пакет форматируется в строку и пишется одним вызовом в двоичный файл
+        if resume_offset is None:
+            self._file = open(path, 'wb')
+        else:
+            # Отбрасываем строки, записанные после контрольной точки
+            self._file = open(path, 'r+b')
+            self._file.truncate(resume_offset)
+            self._file.seek(resume_offset)
+        if compression != 'none':
+            try:
+                self._file = CompressedStream(self._file, compression, compression_level)
+            except Exception:
+                self._file.close()
+                raise
+        if resume_offset is None:
+            self._file.write(self._encode([REPORT_COLUMNS]))
+        super().__init__(**options)
+
+    @staticmethod
+    def _epoch(timestamp):
+        return "" if timestamp is None else int(timestamp)
+
+    @staticmethod
+    def _encode(rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        # Имена, не представимые в UTF-8 (недекодируемые байты в Linux), записываются
+        # с экранированием \udcNN: ошибка одной строки не должна терять весь пакет
+        return buffer.getvalue().encode('utf-8', 'backslashreplace')
+
+    def _write_rows(self, rows):
+        format_time = self._format_time
+        data = self._encode([
+            (path, name, item_type, size, extension,
+             format_time(creation_time), format_time(modification_time),
+             "" if disk_size is None else disk_size)
+            for path, name, item_type, size, extension, creation_time, modification_time, disk_size in rows
+        ])
+        self._file.write(data)
+        return len(data)
+
+    def _flush_file(self):
+        self._file.flush()
+
+    def _tell(self):
+        return self._file.tell()
+
+    def _close_file(self):
+        self._file.close()
+
+
+class ParquetOutput(ReportOutput):
+    """Вывод в Parquet: строки пишутся пакетами (record batch) не меньше MIN_BATCH_SIZE"""
+
+    MIN_BATCH_SIZE = 65536
+
+    def __init__(self, path, batch_size=MIN_BATCH_SIZE, compression='none', compression_level=None, **options):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Для вывода в Parquet установите пакет pyarrow") from e
+
+        self.path = path
+        self._pa = pa
+        self._schema = pa.schema([
+            ('Path', pa.dictionary(pa.int32(), pa.string())),
+            ('Name', pa.string()),
+            ('Type', pa.dictionary(pa.int8(), pa.string())),
+            ('Size', pa.int64()),
+            ('Extension', pa.dictionary(pa.int32(), pa.string())),
+            ('DateTimeCreate', pa.timestamp('us', tz='UTC')),
+            ('DateTimeLastModification', pa.timestamp('us', tz='UTC')),
+            ('DiskSize', pa.int64()),
+        ])
+        # Колонки Parquet сжимаются самим pyarrow: gzip и zstd передаются ему,
+        # без явного сжатия остается сжатие pyarrow по умолчанию
+        parquet_options = {}
+        if compression != 'none':
+            parquet_options = {'compression': compression, 'compression_level': compression_level}
+        self._writer = pq.ParquetWriter(path, self._schema, **parquet_options)
+        # Маленькие record batch раздувают метаданные файла
+        super().__init__(batch_size=max(batch_size, self.MIN_BATCH_SIZE), **options)
+
+    def _write_rows(self, rows):
+        pa = self._pa
+        path, name, item_type, size, extension, creation_time, modification_time, disk_size = zip(*rows)
+        extension = [value or None for value in extension]
+        try:
+            text_columns = [pa.array(column, type=pa.string()) for column in (path, name, extension)]
+        except UnicodeEncodeError:
+            # Недекодируемые имена экранируются так же, как в CSV; остальной пакет не теряется
+            path, name, extension = ([escape_surrogates(value) for value in column]
+                                     for column in (path, name, extension))
+            text_columns = [pa.array(column, type=pa.string()) for column in (path, name, extension)]
+        path, name, extension = text_columns
+        columns = (
+            path, name, item_type, size,
+            extension,
+            [None if value is None else int(value * 1_000_000) for value in creation_time],
+            [None if value is None else int(value * 1_000_000) for value in modification_time],
+            disk_size,
+        )
+        arrays = []
+        for column, field in zip(columns, self._schema):
+            if pa.types.is_dictionary(field.type):
+                if not isinstance(column, pa.Array):
+                    column = pa.array(column, type=field.type.value_type)
+                array = column.dictionary_encode().cast(field.type)
+            elif isinstance(column, pa.Array):
+                array = column
+            else:
+                array = pa.array(column, type=field.type)
+            arrays.append(array)
+        self._writer.write_batch(pa.record_batch(arrays, schema=self._schema))
+        return 0
+
+    def _close_file(self):
+        # Файл Parquet читаем только после записи футера
+        self._writer.close()
+
+
+OUTPUT_FORMATS = {
+    'csv': CsvOutput,
+    'parquet': ParquetOutput,
+}
+
+
+def detect_format(path):
+    """Определяет формат отчета по расширению файла"""
+    if os.path.splitext(path)[1].lower() in ('.parquet', '.pq'):
+        return 'parquet'
+    return 'csv'
+
+
+def detect_compression(path):
+    """Определяет сжатие отчета по расширению файла"""
+    return COMPRESSION_EXTENSIONS.get(os.path.splitext(path)[1].lower(), 'none')
+
+
+def open_output(path, output_format='auto', resume_offset=None, compression='auto', compression_level=None,
+                **options):
+    """Создает объект вывода указанного формата ('auto' - по расширению файла).
+
+    resume_offset - продолжить существующий отчет с этого смещения в байтах.
+    compression - сжатие из COMPRESSIONS или 'auto' (по расширению файла).
+    options - параметры записи: batch_size, flush_bytes, flush_seconds и
+    timestamp_format (только для CSV).
+    """
+    if output_format == 'auto':
+        output_format = detect_format(path)
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Неизвестный формат вывода: {output_format}")
+    if compression == 'auto':
+        compression = detect_compression(path)
+    output_class = OUTPUT_FORMATS[output_format]
+    if output_class is not CsvOutput:
+        options.pop('timestamp_format', None)
+    options.update(compression=compression, compression_level=compression_level)
+    if resume_offset is None:
+        return output_class(path, **options)
+    if not output_class.supports_resume:
+        raise ValueError(f"Формат {output_format} не поддерживает продолжение сканирования")
+    return output_class(path, resume_offset=resume_offset, **options)
+
+
+def is_parquet(path):
+    """Проверяет по сигнатуре, что отчет записан в Parquet"""
+    with open(path, 'rb') as f:
+        return f.read(4) == PARQUET_MAGIC
+
+
+def open_report(path):
+    """Открывает отчет CSV для чтения в двоичном режиме с распаковкой gzip или zstd.
+
+    Сжатие определяется по сигнатуре, а не по расширению; отчет, продолженный
+    с контрольной точки, состоит из нескольких членов gzip (кадров zstd).
+    """
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+    if magic.startswith(GZIP_MAGIC):
+        return gzip.open(path, 'rb')
+    if magic == ZSTD_MAGIC:
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError("Для чтения отчета, сжатого zstd, установите пакет zstandard") from e
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), read_across_frames=True,
+                                                          closefd=True)
+    return open(path, 'rb')
+
+
+def open_report_text(path, errors='strict'):
+    """Открывает отчет CSV для чтения как текст (для csv.reader), с распаковкой"""
+    return io.TextIOWrapper(open_report(path), encoding='utf-8', errors=errors, newline='')
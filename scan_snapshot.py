@@ -0,0 +1,212 @@
+"""Снимок дерева каталогов для инкрементального пересканирования.
+
+Снимок - файл SQLite рядом с CSV-отчетом. Для каждой директории в нем
+хранятся устройство, inode и mtime директории и ее содержимое: атрибуты
+файлов и имена поддиректорий. При следующем запуске директория, у которой
+inode и mtime не изменились, не перечитывается: файлы и поддиректории
+берутся из снимка, а спуск в поддиректории продолжается как обычно (их
+mtime проверяется отдельно). Размеры директорий не хранятся: они
+складываются из атрибутов файлов так же, как после чтения.
+
+Новый снимок пишется во временный файл и фиксируется на диске при каждой
+контрольной точке сканирования. При продолжении (--resume) он открывается
+снова, поэтому директории, записанные до прерывания, в нем сохраняются.
+Директории, прочитанные, но еще не записанные в отчет к контрольной
+точке, в снимок не попадут (их stat не сохраняется) и при следующем
+запуске будут прочитаны заново.
+
+mtime директории меняется только при добавлении, удалении и переименовании
+записей, поэтому изменение содержимого файла "на месте" (дозапись в лог)
+в неизмененной директории инкрементальный режим не заметит.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+SNAPSHOT_FORMAT_VERSION = "2"
+
+# Директории, измененные незадолго до предыдущего сканирования, не
+# используются повторно: изменение в пределах того же тика времени
+# могло не отразиться в mtime
+RACY_WINDOW_NS = 2 * 10 ** 9
+
+
+def encode_files(files):
+    """Упаковывает список (имя, stat_result) в JSON-строку"""
+    return json.dumps([
+        [name, st.st_mode, st.st_ino, st.st_dev, st.st_nlink, st.st_size,
+         st.st_mtime, st.st_ctime, getattr(st, 'st_blocks', None)]
+        for name, st in files
+    ], separators=(',', ':'))
+
+
+def decode_files(data):
+    """Восстанавливает список (имя, stat_result) из JSON-строки"""
+    files = []
+    for name, mode, ino, dev, nlink, size, mtime, ctime, blocks in json.loads(data):
+        extra = {'st_mtime': mtime, 'st_ctime': ctime}
+        if blocks is not None:
+            extra['st_blocks'] = blocks
+        st = os.stat_result((mode, ino, dev, nlink, 0, 0, size, 0, int(mtime), int(ctime)), extra)
+        files.append((name, st))
+    return files
+
+
+class ScanSnapshot:
+    """Предыдущий снимок (только чтение) и новый снимок (запись во временный файл).
+
+    lookup/remember вызываются из потоков сканирования, record/checkpoint/commit -
+    из потока, который пишет отчет. При resume=True продолжается новый снимок,
+    сохраненный последней контрольной точкой.
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.tmp_path = path + ".tmp"
+        self.reused_dirs = 0
+        self.started_ns = time.time_ns()
+        self._lock = threading.Lock()
+        self._pending = {}
+        # Временный файл сохраняется при прерывании, если его ждет контрольная точка
+        self._keep = False
+
+        self._previous = None
+        self._previous_started_ns = 0
+        if os.path.exists(path):
+            try:
+                self._previous = sqlite3.connect(path, check_same_thread=False)
+                meta = dict(self._previous.execute("SELECT key, value FROM meta"))
+                if meta.get('format_version') != SNAPSHOT_FORMAT_VERSION:
+                    raise sqlite3.DatabaseError("несовместимая версия снимка")
+                self._previous_started_ns = int(meta['started_ns'])
+            except (sqlite3.Error, KeyError, ValueError) as e:
+                print(f"Снимок {path} не используется: {str(e)}")
+                if self._previous is not None:
+                    self._previous.close()
+                self._previous = None
+
+        self._new = None
+        if resume and os.path.exists(self.tmp_path):
+            self._new = self._continue_new()
+        if self._new is None:
+            self._create_new()
+
+    def _connect_new(self):
+        connection = sqlite3.connect(self.tmp_path)
+        # Журнал в памяти: откат при прерывании возвращает файл к последней контрольной точке
+        connection.execute("PRAGMA journal_mode=MEMORY")
+        connection.execute("PRAGMA synchronous=OFF")
+        return connection
+
+    def _continue_new(self):
+        connection = None
+        try:
+            connection = self._connect_new()
+            if connection.execute("PRAGMA quick_check").fetchone()[0] != 'ok':
+                raise sqlite3.DatabaseError("файл поврежден")
+            meta = dict(connection.execute("SELECT key, value FROM meta"))
+            if meta.get('format_version') != SNAPSHOT_FORMAT_VERSION:
+                raise sqlite3.DatabaseError("несовместимая версия снимка")
+            # Время начала - от прерванного запуска: его директории прочитаны после него
+            self.started_ns = int(meta['started_ns'])
+        except (sqlite3.Error, KeyError, ValueError) as e:
+            print(f"Новый снимок {self.tmp_path} не продолжается: {str(e)}")
+            if connection is not None:
+                connection.close()
+            return None
+        self._keep = True
+        return connection
+
+    def _create_new(self):
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+        self._new = self._connect_new()
+        self._new.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._new.execute(
+            "CREATE TABLE dirs (path TEXT PRIMARY KEY, dev INTEGER, ino INTEGER, "
+            "mtime_ns INTEGER, files TEXT, subdirs TEXT)"
+        )
+        self._new.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ('format_version', SNAPSHOT_FORMAT_VERSION),
+            ('started_ns', str(self.started_ns)),
+        ])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.close()
+        return False
+
+    def lookup(self, root, dir_stat):
+        """Возвращает (files, subdirs) из предыдущего снимка или None, если директория изменилась"""
+        if self._previous is None:
+            return None
+        with self._lock:
+            row = self._previous.execute(
+                "SELECT dev, ino, mtime_ns, files, subdirs FROM dirs WHERE path = ?", (root,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        dev, ino, mtime_ns, files_data, subdirs_data = row
+        if (dev, ino, mtime_ns) != (dir_stat.st_dev, dir_stat.st_ino, dir_stat.st_mtime_ns):
+            return None
+        if mtime_ns >= self._previous_started_ns - RACY_WINDOW_NS:
+            return None
+
+        with self._lock:
+            self.reused_dirs += 1
+            self._pending[root] = (dir_stat, files_data, subdirs_data)
+        subdirs = [os.path.join(root, name) for name in json.loads(subdirs_data)]
+        return decode_files(files_data), subdirs
+
+    def remember(self, root, dir_stat, files, subdirs):
+        """Запоминает прочитанную директорию до того, как она будет записана в отчет"""
+        files_data = encode_files(files)
+        subdirs_data = json.dumps([os.path.basename(path) for path in subdirs], separators=(',', ':'))
+        with self._lock:
+            self._pending[root] = (dir_stat, files_data, subdirs_data)
+
+    def record(self, root):
+        """Сохраняет записанную в отчет директорию в новый снимок"""
+        with self._lock:
+            pending = self._pending.pop(root, None)
+        if pending is None:
+            return
+        dir_stat, files_data, subdirs_data = pending
+        self._new.execute(
+            "INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?, ?, ?)",
+            (root, dir_stat.st_dev, dir_stat.st_ino, dir_stat.st_mtime_ns, files_data, subdirs_data)
+        )
+
+    def checkpoint(self):
+        """Фиксирует записанные директории вместе с контрольной точкой сканирования"""
+        self._new.commit()
+        self._keep = True
+
+    def commit(self):
+        """Атомарно заменяет предыдущий снимок новым"""
+        self._new.commit()
+        self._new.close()
+        if self._previous is not None:
+            self._previous.close()
+            self._previous = None
+        os.replace(self.tmp_path, self.path)
+
+    def close(self):
+        """Закрывает снимки без сохранения (сканирование прервано).
+
+        Новый снимок, зафиксированный контрольной точкой, остается для --resume.
+        """
+        self._new.close()
+        if self._previous is not None:
+            self._previous.close()
+            self._previous = None
+        if not self._keep and os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
@@ -0,0 +1,91 @@
+"""Топ-N самых больших файлов и директорий, который ведется во время сканирования.
+
+Для каждого топа хранится куча минимумов из top_n элементов: новый
+элемент сравнивается с наименьшим в куче и в подавляющем большинстве
+случаев сразу отбрасывается, поэтому учет стоит одно сравнение на файл.
+Топ не зависит от порога --min-size: он считается по всем файлам, даже
+если строки файлов в отчет не пишутся.
+
+Итог сохраняется в небольшой JSON-файл (по умолчанию <output>.top.json),
+который во время сканирования периодически перезаписывается.
+"""
+import heapq
+import json
+import time
+
+from scan_checkpoint import atomic_write
+
+
+class ScanTop:
+    """Кучи топ-N файлов и директорий по видимому размеру"""
+
+    def __init__(self, top_n=20):
+        self.top_n = top_n
+        # Элементы: (size, path, name, disk_size, mtime) и (size, path, name, disk_size)
+        self.files = []
+        self.dirs = []
+
+    def _push(self, heap, item):
+        if len(heap) < self.top_n:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+
+    def add_file(self, size, path, name, disk_size, mtime):
+        files = self.files
+        if len(files) >= self.top_n and size < files[0][0]:
+            return
+        self._push(files, (size, path, name, disk_size, mtime))
+
+    def add_dir(self, size, path, name, disk_size):
+        dirs = self.dirs
+        if len(dirs) >= self.top_n and size < dirs[0][0]:
+            return
+        self._push(dirs, (size, path, name, disk_size))
+
+    def largest_file(self):
+        """Самый большой файл на данный момент или None"""
+        return max(self.files) if self.files else None
+
+    def top_files(self):
+        return sorted(self.files, reverse=True)
+
+    def top_dirs(self):
+        return sorted(self.dirs, reverse=True)
+
+    def to_state(self):
+        """Состояние для сохранения в JSON (контрольные точки)"""
+        return {'files': self.files, 'dirs': self.dirs}
+
+    @classmethod
+    def from_state(cls, state, top_n):
+        top = cls(top_n)
+        for item in state['files']:
+            top._push(top.files, tuple(item))
+        for item in state['dirs']:
+            top._push(top.dirs, tuple(item))
+        return top
+
+    def summary(self, start_path, stats, final=False):
+        """Словарь для JSON-файла с топами"""
+        return {
+            'start_path': start_path,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'final': final,
+            'stats': {key: value for key, value in stats.items() if key != 'start_time'},
+            'top_files': [
+                {'path': path, 'name': name, 'size': size, 'disk_size': disk_size,
+                 'modified': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(mtime))}
+                for size, path, name, disk_size, mtime in self.top_files()
+            ],
+            'top_dirs': [
+                {'path': path, 'name': name, 'size': size, 'disk_size': disk_size}
+                for size, path, name, disk_size in self.top_dirs()
+            ],
+        }
+
+    def write_summary(self, path, start_path, stats, final=False):
+        """Атомарно записывает топы в JSON-файл"""
+        # Недекодируемые имена (суррогаты) записываются как экранирование JSON \udcXX
+        with atomic_write(path, encoding='utf-8', errors='backslashreplace') as f:
+            json.dump(self.summary(start_path, stats, final), f, ensure_ascii=False, indent=2)
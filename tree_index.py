@@ -0,0 +1,297 @@
+#python tree_index.py --index "large_files_report.csv.tree" --path "C:\Users" --top-n 20
+"""Индекс дерева директорий для быстрых запросов без загрузки отчета.
+
+Сканер с --tree-index строит индекс по ходу обхода и сохраняет его рядом
+с отчетом. Для каждой директории хранятся итоги по ее поддереву: размер,
+место на диске, число файлов и поддиректорий, время последнего изменения
+файла. Дочерние директории хранятся списками смежности (CSR): для узла i
+это children[child_start[i]:child_start[i + 1]], отсортированные по
+убыванию размера, поэтому топ-N детей - это первые N элементов.
+Имена лежат в общей таблице строк (UTF-8) со смещениями name_offsets.
+
+Формат файла: заголовок HEADER и массивы по 8 байт на элемент (little
+endian) в порядке ARRAYS, затем таблица строк. Файл открывается через
+mmap, и запрос читает только нужные узлы.
+"""
+import argparse
+import heapq
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+
+from scan_checkpoint import atomic_write
+
+MAGIC = b'DSTREE\x00\x01'
+TREE_INDEX_VERSION = 1
+
+# magic, версия, число директорий, длина массива children, длина таблицы строк
+HEADER = struct.Struct('<8sQQQQ')
+
+# Имя массива, тип элемента, длина: 'n' - по числу директорий, 'n+1' - смещения, 'c' - дети
+ARRAYS = (
+    ('size', 'q', 'n'),
+    ('disk_size', 'q', 'n'),
+    ('files', 'q', 'n'),
+    ('dirs', 'q', 'n'),
+    ('max_mtime', 'd', 'n'),
+    ('parent', 'q', 'n'),
+    ('child_start', 'q', 'n+1'),
+    ('children', 'q', 'c'),
+    ('name_offsets', 'q', 'n+1'),
+)
+
+# Префикс имен записей индекса в журнале контрольных точек
+JOURNAL_PREFIX = 'tree.'
+
+# Колонки, по которым можно сортировать детей в запросе
+SORT_KEYS = ('size', 'disk_size', 'files', 'dirs', 'max_mtime')
+
+
+def _encode_name(name):
+    # surrogateescape сохраняет имена, не декодируемые в текущей кодировке
+    return name.encode('utf-8', 'surrogateescape')
+
+
+class TreeIndexBuilder:
+    """Накапливает индекс по директориям, которые приходят снизу вверх.
+
+    Директория добавляется после всех своих поддиректорий; их итоги
+    суммируются в итоги родителя. Номер директории - порядок добавления,
+    корень добавляется последним.
+    """
+
+    def __init__(self):
+        self.size = array('q')
+        self.disk_size = array('q')
+        self.files = array('q')
+        self.dirs = array('q')
+        self.max_mtime = array('d')
+        self.child_start = array('q', [0])
+        self.children = array('q')
+        self.name_offsets = array('q', [0])
+        self.names = bytearray()
+        # Добавленные директории, родитель которых еще не добавлен: путь -> номер
+        self._awaiting = {}
+        # Длины массивов, уже записанных в журнал контрольных точек
+        self._journaled = {}
+
+    def __len__(self):
+        return len(self.size)
+
+    def add(self, path, name, size, disk_size, files_count, max_mtime, subdirs):
+        """Добавляет директорию; files_count и max_mtime - по ее собственным файлам"""
+        dirs_count = 0
+        child_ids = []
+        for subdir in subdirs:
+            child = self._awaiting.pop(subdir, None)
+            if child is None:
+                continue
+            child_ids.append(child)
+            files_count += self.files[child]
+            dirs_count += self.dirs[child] + 1
+            max_mtime = max(max_mtime, self.max_mtime[child])
+        child_ids.sort(key=self.size.__getitem__, reverse=True)
+
+        node = len(self.size)
+        self.size.append(size)
+        self.disk_size.append(disk_size)
+        self.files.append(files_count)
+        self.dirs.append(dirs_count)
+        self.max_mtime.append(max_mtime)
+        self.children.extend(child_ids)
+        self.child_start.append(len(self.children))
+        self.names += _encode_name(name)
+        self.name_offsets.append(len(self.names))
+        self._awaiting[path] = node
+        return node
+
+    def _parents(self):
+        parent = array('q', [-1]) * len(self.size)
+        for node in range(len(self.size)):
+            for child in self.children[self.child_start[node]:self.child_start[node + 1]]:
+                parent[child] = node
+        return parent
+
+    def write(self, path):
+        """Атомарно сохраняет индекс в файл"""
+        arrays = dict(
+            size=self.size, disk_size=self.disk_size, files=self.files, dirs=self.dirs,
+            max_mtime=self.max_mtime, parent=self._parents(), child_start=self.child_start,
+            children=self.children, name_offsets=self.name_offsets,
+        )
+        with atomic_write(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, TREE_INDEX_VERSION, len(self.size), len(self.children), len(self.names)))
+            for name, typecode, length in ARRAYS:
+                values = arrays[name]
+                if sys.byteorder != 'little':
+                    values = array(typecode, values)
+                    values.byteswap()
+                values.tofile(f)
+            f.write(self.names)
+
+    def _journal_arrays(self):
+        for name, typecode, length in ARRAYS:
+            if name != 'parent':
+                yield name, getattr(self, name)
+        yield 'names', self.names
+
+    def journal_changes(self):
+        """Добавленное с прошлого вызова: пары (имя записи, байты) для журнала контрольных точек.
+
+        Массивы только растут, поэтому в журнал идут их хвосты.
+        """
+        changes = []
+        for name, values in self._journal_arrays():
+            start = self._journaled.get(name, 0)
+            changes.append((JOURNAL_PREFIX + name, bytes(values[start:])))
+            self._journaled[name] = len(values)
+        return changes
+
+    def to_state(self):
+        """Часть состояния, которая не пишется в журнал (для JSON контрольной точки)"""
+        return {'awaiting': self._awaiting}
+
+    @classmethod
+    def from_state(cls, state, chunks):
+        """Восстанавливает построитель из to_state() и склеенных записей журнала"""
+        builder = cls()
+        for name, typecode, length in ARRAYS:
+            if name != 'parent':
+                setattr(builder, name, array(typecode, chunks.get(JOURNAL_PREFIX + name, b'')))
+        builder.names = bytearray(chunks.get(JOURNAL_PREFIX + 'names', b''))
+        builder._awaiting = dict(state['awaiting'])
+        builder._journaled = {name: len(values) for name, values in builder._journal_arrays()}
+        return builder
+
+
+class TreeIndex:
+    """Индекс дерева, открытый через mmap (только чтение)"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, children_count, names_length = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != TREE_INDEX_VERSION:
+            self._mmap.close()
+            raise ValueError(f"{path} не является индексом дерева поддерживаемой версии")
+
+        self.count = count
+        view = memoryview(self._mmap)
+        self._views = [view]
+        offset = HEADER.size
+        lengths = {'n': count, 'n+1': count + 1, 'c': children_count}
+        for name, typecode, length in ARRAYS:
+            nbytes = 8 * lengths[length]
+            array_view = view[offset:offset + nbytes].cast(typecode)
+            self._views.append(array_view)
+            setattr(self, name, array_view)
+            offset += nbytes
+        self._names = view[offset:offset + names_length]
+        self._views.append(self._names)
+
+    @property
+    def root(self):
+        return self.count - 1
+
+    def name(self, node):
+        start, end = self.name_offsets[node], self.name_offsets[node + 1]
+        return bytes(self._names[start:end]).decode('utf-8', 'surrogateescape')
+
+    def full_path(self, node):
+        parts = []
+        while node != self.root:
+            parts.append(self.name(node))
+            node = self.parent[node]
+        return os.path.join(self.name(self.root), *reversed(parts))
+
+    def child_ids(self, node):
+        """Дети узла по убыванию размера"""
+        return self.children[self.child_start[node]:self.child_start[node + 1]]
+
+    def find(self, path):
+        """Номер директории по полному пути; KeyError, если ее нет в индексе"""
+        root_path = self.name(self.root)
+        if os.path.normcase(path.rstrip(os.sep) or path) == os.path.normcase(root_path.rstrip(os.sep) or root_path):
+            return self.root
+        prefix = root_path if root_path.endswith(os.sep) else root_path + os.sep
+        if not os.path.normcase(path).startswith(os.path.normcase(prefix)):
+            raise KeyError(path)
+
+        node = self.root
+        for part in path[len(prefix):].split(os.sep):
+            if not part:
+                continue
+            encoded = _encode_name(part)
+            for child in self.child_ids(node):
+                start, end = self.name_offsets[child], self.name_offsets[child + 1]
+                if self._names[start:end] == encoded:
+                    node = child
+                    break
+            else:
+                raise KeyError(path)
+        return node
+
+    def totals(self, node):
+        """Итоги по поддереву директории"""
+        return {key: getattr(self, key)[node] for key in SORT_KEYS}
+
+    def top_children(self, node, top_n=20, key='size'):
+        """Топ-N поддиректорий по выбранной колонке"""
+        children = self.child_ids(node)
+        if key == 'size':
+            return list(children[:top_n])
+        values = getattr(self, key)
+        return heapq.nlargest(top_n, children, key=values.__getitem__)
+
+    def close(self):
+        for view in reversed(self._views):
+            view.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def _format_row(index, node, label):
+    totals = index.totals(node)
+    mtime = time.strftime('%Y-%m-%d %H:%M', time.localtime(totals['max_mtime'])) if totals['max_mtime'] else "-"
+    return (f"{totals['size'] / 1024**2:>12.1f} {totals['disk_size'] / 1024**2:>12.1f} "
+            f"{totals['files']:>10} {totals['dirs']:>8}  {mtime:<16}  {label}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Запросы к индексу дерева директорий',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument('--index', required=True, help='Файл индекса (создается сканером с --tree-index)')
+    parser.add_argument('--path', help='Директория для запроса (по умолчанию - корень сканирования)')
+    parser.add_argument('--top-n', type=int, default=20, help='Количество поддиректорий в топе')
+    parser.add_argument('--sort', default='size', choices=SORT_KEYS, help='Колонка для сортировки поддиректорий')
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    with TreeIndex(args.index) as index:
+        try:
+            node = index.find(args.path) if args.path else index.root
+        except KeyError:
+            parser.exit(1, f"Директория не найдена в индексе: {args.path}\n")
+
+        print(f"{'Размер, МБ':>12} {'На диске, МБ':>12} {'Файлов':>10} {'Папок':>8}  {'Изменен':<16}  Путь")
+        print(_format_row(index, node, index.full_path(node)))
+        print("-" * 80)
+        for child in index.top_children(node, args.top_n, args.sort):
+            print(_format_row(index, child, index.name(child)))
+    print(f"\nЗапрос выполнен за {(time.perf_counter() - start_time) * 1000:.1f} мс")
+
+
+if __name__ == "__main__":
+    main()